@@ -0,0 +1,170 @@
+"""
+日志分片的增量写入
+清单中为每个指标记录水位线 (已写入的最新时间戳及该秒内的文件名)，
+每次只读取水位线之后的新分片，写入一个增量段文件并更新清单，
+处理成本只与新分片数量有关；段数达到阈值时合并回主文件。
+
+--follow 模式按固定间隔轮询指标目录 (只列目录、不读取已写入的分片)，保持存储持续更新。
+
+用法:
+    python ingest.py ../../log_data
+    python ingest.py ../../log_data --follow --interval 5
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+from log_store import (DEFAULT_STORE_NAME, METRIC_VARIABLES, Shard, build_series, consolidate, discover_shards,
+                       file_entries, load_manifest, load_shard, manifest_path, open_store,
+                       remove_unlisted_segments, save_manifest, save_segment, save_store, watermark)
+
+# 段文件数量达到该值时合并回主文件
+DEFAULT_COMPACT_THRESHOLD = 32
+
+# 修改时间在该秒数以内的分片可能仍在写入，留到下一轮
+DEFAULT_SETTLE_SECONDS = 1.0
+
+
+def pending_shards(log_dir: str, manifest: Dict, metrics: Iterable[str] = None) -> Dict[str, List[Shard]]:
+    """水位线之后的新分片 (按时间排序)"""
+    result = {}
+    for metric, shards in discover_shards(log_dir, metrics).items():
+        mark = manifest['metrics'].get(metric, {}).get('watermark')
+        if mark is None:
+            result[metric] = shards
+            continue
+        latest = mark['timestamp']
+        seen = set(mark['files'])
+        result[metric] = [s for s in shards
+                          if str(s.timestamp) > latest or (str(s.timestamp) == latest and s.name not in seen)]
+    return result
+
+
+def _load_ready(shards: List[Shard], settle_seconds: float, pool: ThreadPoolExecutor):
+    """
+    读取可以写入的分片: 遇到仍在写入 (修改时间过近) 或读取失败的分片时停止，
+    其后的分片留到下一轮，保证每个指标的分片按时间顺序写入
+    """
+    now = time.time()
+    ready = []
+    for shard in shards:
+        try:
+            if now - os.stat(shard.path).st_mtime < settle_seconds:
+                break
+        except OSError:
+            break
+        ready.append(shard)
+    futures = [pool.submit(load_shard, s) for s in ready]
+    loaded, frames = [], []
+    for shard, future in zip(ready, futures):
+        try:
+            frames.append(future.result())
+        except Exception as e:
+            print(f"读取分片失败，稍后重试: {shard.path} ({type(e).__name__}: {e})")
+            break
+        loaded.append(shard)
+    return loaded, frames
+
+
+def compact(store_file: str) -> Dict:
+    """把所有增量段合并回主文件"""
+    manifest = load_manifest(store_file)
+    if not manifest.get('segments'):
+        return manifest
+    series_by_metric = open_store(store_file)
+    manifest['segments'] = []
+    save_store(store_file, series_by_metric, manifest)
+    remove_unlisted_segments(store_file, manifest)
+    return manifest
+
+
+def ingest(log_dir: str, store_file: str = None, metrics: Iterable[str] = None, workers: int = 8,
+           compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+           settle_seconds: float = DEFAULT_SETTLE_SECONDS) -> Dict[str, int]:
+    """
+    把水位线之后的新分片写入存储，存储不存在时做一次全量合并
+
+    Returns:
+        各指标本次写入的分片数
+    """
+    if store_file is None:
+        store_file = os.path.join(log_dir, DEFAULT_STORE_NAME)
+    if not os.path.exists(manifest_path(store_file)):
+        manifest = consolidate(log_dir, store_file, metrics, workers)
+        return {metric: entry['num_shards'] for metric, entry in manifest['metrics'].items()}
+
+    manifest = load_manifest(store_file)
+    pending = pending_shards(log_dir, manifest, metrics)
+    new_series = {}
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for metric, shards in pending.items():
+            loaded, frames = _load_ready(shards, settle_seconds, pool)
+            if not loaded:
+                continue
+            new_series[metric] = build_series(metric, loaded, frames)
+            counts[metric] = len(loaded)
+
+            entry = manifest['metrics'].setdefault(metric, {
+                'num_shards': 0, 'first_timestamp': str(loaded[0].timestamp),
+                'variables': METRIC_VARIABLES.get(metric, list(new_series[metric].variables)), 'files': []})
+            entry['num_shards'] += len(loaded)
+            entry['last_timestamp'] = str(loaded[-1].timestamp)
+            entry['files'].extend(file_entries(loaded))
+            entry['watermark'] = watermark(entry['files'])
+    if not new_series:
+        return counts
+
+    # 先写段文件再写清单: 清单更新前崩溃只会留下未列出的段文件，下次合并时清理
+    segments = manifest.setdefault('segments', [])
+    index = int(segments[-1].rsplit('-', 1)[1].split('.')[0]) + 1 if segments else 1
+    segments.append(save_segment(store_file, index, new_series))
+    save_manifest(store_file, manifest)
+
+    if len(segments) >= compact_threshold:
+        compact(store_file)
+    return counts
+
+
+def follow(log_dir: str, store_file: str = None, metrics: Iterable[str] = None, interval: float = 5.0,
+           **kwargs):
+    """按interval秒轮询并增量写入，Ctrl+C退出"""
+    print(f"监视 '{log_dir}' (每{interval}s轮询)，Ctrl+C退出")
+    try:
+        while True:
+            counts = ingest(log_dir, store_file, metrics, **kwargs)
+            if counts:
+                summary = ', '.join(f"{metric}+{count}" for metric, count in counts.items())
+                print(f"[{time.strftime('%H:%M:%S')}] 新分片: {summary}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("停止监视")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增量写入新的日志分片')
+    parser.add_argument('log_dir', help='日志目录 (包含bler / delay / goodput等子目录)')
+    parser.add_argument('-o', '--output', default=None, help=f'存储文件，默认为 <log_dir>/{DEFAULT_STORE_NAME}')
+    parser.add_argument('-m', '--metrics', nargs='+', default=None, help='只处理指定指标')
+    parser.add_argument('-j', '--workers', type=int, default=8, help='读取线程数')
+    parser.add_argument('--follow', action='store_true', help='持续轮询新分片')
+    parser.add_argument('--interval', type=float, default=5.0, help='轮询间隔 (秒)')
+    parser.add_argument('--compact', action='store_true', help='只把增量段合并回主文件')
+    args = parser.parse_args()
+
+    store_file = args.output or os.path.join(args.log_dir, DEFAULT_STORE_NAME)
+    if args.compact:
+        compact(store_file)
+        print(f"已合并: '{store_file}'")
+    elif args.follow:
+        follow(args.log_dir, store_file, args.metrics, args.interval, workers=args.workers)
+    else:
+        counts = ingest(args.log_dir, store_file, args.metrics, args.workers)
+        total = sum(counts.values())
+        print(f"写入 {total} 个新分片" + (f": {counts}" if counts else ""))
+
+
+if __name__ == '__main__':
+    main()
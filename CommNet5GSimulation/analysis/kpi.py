@@ -0,0 +1,378 @@
+"""
+基于合并日志存储 (log_store) 的KPI汇总
+把各指标分片展开为逐样本长表 (KPI, 运行, 统计步, UE, 链路, 值)，用排序分组一次性计算:
+- ue: 每个 (KPI, 运行, UE, 链路) 的样本数、均值、最小/最大值及分位数
+- bler: 每个 (运行, UE) 由误块数/总块数累计得到的上下行BLER及其比值 (上行/下行)
+- rolling: 每个 (KPI, 运行, UE, 链路) 按统计步的滑动平均
+- runs: 各仿真运行的起止时间、统计步数及UE数
+
+汇总表写入 <存储>.kpi.npz 并记录清单指纹 (各指标分片数、水位线及增量段)，
+只有写入新分片 (ingest / consolidate) 后指纹变化时才重新计算；
+同一进程内的查询直接使用内存中的表，清单未修改时只需一次stat。
+
+分片中的行: 第1行下行、第2行上行 (hNRAppDelayNoVisualizer.m 中 DownlinkIdx=1, UplinkIdx=2)；
+goodput / throughput 的最后两列为小区级统计 (小区总量、峰值速率)，不属于UE。
+分片不包含运行编号，按时间间隔划分: 相邻分片间隔超过gap_seconds视为新的一次运行。
+
+用法:
+    python kpi.py ../../log_data/log_store.npz
+    python kpi.py ../../log_data/log_store.npz --kpi delay --link dl --run 2
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from log_store import DEFAULT_STORE_NAME, MetricSeries, load_manifest, manifest_path, open_store
+
+# KPI名称 -> (指标, 变量)，表中的kpi列为该列表中的下标
+KPI_SOURCES = {
+    'delay': ('delay', 'delayData'),
+    'goodput': ('goodput', 'goodput'),
+    'throughput': ('throughput', 'throughput'),
+    'resourceshare': ('resourceshare', 'resourceshare'),
+    'bufferstatus': ('bufferstatus', 'bufferstatus'),
+    'bler': ('bler', 'blerData'),
+}
+KPI_NAMES = list(KPI_SOURCES)
+
+# 链路编码 (分片矩阵的行下标)
+LINKS = ['dl', 'ul']
+DOWNLINK, UPLINK = 0, 1
+
+# 各指标末尾的小区级统计列数
+CELL_COLUMNS = {'goodput': 2, 'throughput': 2}
+
+# 误块数 / 总块数 (每个分片为 UE数 × 1)
+BLER_COUNTS = {
+    'dl': ('dlblerinfo', 'dlBLERInfo_1', 'dlBLERInfo_2'),
+    'ul': ('ulblerinfo', 'ulBLERInfo_1', 'ulBLERInfo_2'),
+}
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+DEFAULT_WINDOW = 3
+DEFAULT_GAP_SECONDS = 300
+KPI_CACHE_VERSION = 1
+
+
+def kpi_cache_path(store_file: str) -> str:
+    return os.path.splitext(store_file)[0] + '.kpi.npz'
+
+
+def split_runs(timestamps: Iterable[np.ndarray], gap_seconds: float = DEFAULT_GAP_SECONDS) -> np.ndarray:
+    """
+    所有指标的分片时间戳合并排序后，按间隔超过gap_seconds处切分
+    返回各运行的起始时间 (datetime64[s])，配合np.searchsorted得到分片所属运行
+    """
+    merged = np.unique(np.concatenate([np.asarray(t, dtype='datetime64[s]') for t in timestamps] or
+                                      [np.zeros(0, dtype='datetime64[s]')]))
+    if len(merged) == 0:
+        return merged
+    gaps = np.diff(merged).astype(np.int64)
+    return merged[np.concatenate([[0], np.flatnonzero(gaps > gap_seconds) + 1])]
+
+
+def _run_of(timestamp: np.ndarray, run_starts: np.ndarray) -> np.ndarray:
+    return np.searchsorted(run_starts, timestamp, side='right') - 1
+
+
+def expand_series(series: MetricSeries, variable: str, run_starts: np.ndarray,
+                  cell_columns: int = 0) -> Dict[str, np.ndarray]:
+    """
+    CSR存储的分片矩阵 -> 逐元素长表 (run, step, ue, link, value)
+    link为矩阵行下标、ue为列下标；丢弃末尾cell_columns列及NaN
+    """
+    columns = series.variables[variable]
+    shape, offsets, data = columns['shape'], columns['offsets'], columns['data']
+    shard = np.repeat(np.arange(len(shape)), np.diff(offsets))
+    local = np.arange(len(data)) - offsets[shard]
+    num_cols = shape[shard, 1]
+    link, ue = np.divmod(local, np.maximum(num_cols, 1))
+
+    run = _run_of(series.timestamp, run_starts)
+    # 运行内的统计步: 分片在所属运行中的序号
+    first_in_run = np.searchsorted(run, run, side='left')
+    step = np.arange(len(run)) - first_in_run
+
+    keep = (ue < num_cols - cell_columns) & ~np.isnan(data)
+    shard = shard[keep]
+    return {'run': run[shard], 'step': step[shard], 'ue': ue[keep], 'link': link[keep], 'value': data[keep]}
+
+
+def _group_starts(keys: Sequence[np.ndarray]) -> np.ndarray:
+    """已排序的键列 -> 各组的起始下标"""
+    n = len(keys[0])
+    change = np.zeros(n, dtype=bool)
+    if n:
+        change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+def group_stats(keys: Dict[str, np.ndarray], values: np.ndarray,
+                percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, np.ndarray]:
+    """
+    按keys分组统计values: count / mean / min / max / p<q>
+    组内按值排序后用下标直接插值得到分位数 (与np.percentile的linear方法一致)，不逐组循环
+    """
+    names = list(keys)
+    order = np.lexsort([values] + [keys[name] for name in reversed(names)])
+    sorted_keys = [keys[name][order] for name in names]
+    sorted_values = values[order]
+    starts = _group_starts(sorted_keys)
+    counts = np.diff(np.append(starts, len(order)))
+
+    table = {name: key[starts] for name, key in zip(names, sorted_keys)}
+    table['count'] = counts
+    if len(starts) == 0:
+        for column in ['mean', 'min', 'max'] + [f"p{q:g}" for q in percentiles]:
+            table[column] = np.zeros(0)
+        return table
+    table['mean'] = np.add.reduceat(sorted_values, starts) / counts
+    table['min'] = sorted_values[starts]
+    table['max'] = sorted_values[starts + counts - 1]
+    for q in percentiles:
+        position = (counts - 1) * (q / 100.0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, counts - 1)
+        fraction = position - low
+        table[f"p{q:g}"] = (sorted_values[starts + low] * (1 - fraction) + sorted_values[starts + high] * fraction)
+    return table
+
+
+def rolling_mean(samples: Dict[str, np.ndarray], window: int) -> Dict[str, np.ndarray]:
+    """每个 (kpi, run, ue, link) 内按统计步的滑动平均 (窗口不足时使用已有的样本)"""
+    group_names = ['kpi', 'run', 'ue', 'link']
+    order = np.lexsort([samples['step']] + [samples[name] for name in reversed(group_names)])
+    table = {name: samples[name][order] for name in group_names + ['step']}
+    values = samples['value'][order]
+    if len(values) == 0:
+        table['value'] = values
+        return table
+
+    starts = _group_starts([table[name] for name in group_names])
+    group_start = np.repeat(starts, np.diff(np.append(starts, len(values))))
+    index = np.arange(len(values))
+    window_start = np.maximum(group_start, index - window + 1)
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    table['value'] = (cumulative[index + 1] - cumulative[window_start]) / (index + 1 - window_start)
+    return table
+
+
+def bler_table(store: Dict[str, MetricSeries], run_starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """每个 (运行, UE) 的上下行累计误块数、总块数及BLER (误块数之和 / 总块数之和)"""
+    counts = {}
+    for link, (metric, errors_name, total_name) in BLER_COUNTS.items():
+        if metric not in store:
+            continue
+        for kind, variable in (('errors', errors_name), ('total', total_name)):
+            expanded = expand_series(store[metric], variable, run_starts)
+            # BLERInfo为 UE数 × 1，矩阵行下标即UE
+            counts[kind, link] = (expanded['run'], expanded['link'], expanded['value'])
+
+    runs = np.concatenate([c[0] for c in counts.values()] or [np.zeros(0, dtype=np.int64)])
+    ues = np.concatenate([c[1] for c in counts.values()] or [np.zeros(0, dtype=np.int64)])
+    stride = int(ues.max(initial=-1)) + 1
+    keys = np.unique(runs * stride + ues)
+    table = {'run': keys // max(stride, 1), 'ue': keys % max(stride, 1)}
+    for link in LINKS:
+        for kind in ('errors', 'total'):
+            if (kind, link) in counts:
+                run, ue, value = counts[kind, link]
+                index = np.searchsorted(keys, run * stride + ue)
+                table[f"{kind}_{link}"] = np.bincount(index, weights=value, minlength=len(keys))
+            else:
+                table[f"{kind}_{link}"] = np.zeros(len(keys))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table[f"bler_{link}"] = table[f"errors_{link}"] / table[f"total_{link}"]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table['ul_dl_ratio'] = table['bler_ul'] / table['bler_dl']
+    return table
+
+
+def compute_tables(store: Dict[str, MetricSeries], percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                   window: int = DEFAULT_WINDOW, gap_seconds: float = DEFAULT_GAP_SECONDS
+                   ) -> Dict[str, Dict[str, np.ndarray]]:
+    """从日志存储计算全部汇总表"""
+    run_starts = split_runs([series.timestamp for series in store.values()], gap_seconds)
+
+    parts = []
+    for code, (kpi, (metric, variable)) in enumerate(KPI_SOURCES.items()):
+        if metric not in store or variable not in store[metric].variables:
+            continue
+        expanded = expand_series(store[metric], variable, run_starts, CELL_COLUMNS.get(metric, 0))
+        expanded['kpi'] = np.full(len(expanded['value']), code, dtype=np.int64)
+        parts.append(expanded)
+    columns = ['kpi', 'run', 'step', 'ue', 'link', 'value']
+    samples = {name: (np.concatenate([p[name] for p in parts]) if parts else np.zeros(0)) for name in columns}
+
+    ue = group_stats({name: samples[name] for name in ('kpi', 'run', 'ue', 'link')}, samples['value'], percentiles)
+
+    # 各运行的时间范围、统计步数及UE数
+    run_ids = np.arange(len(run_starts))
+    timestamps = np.unique(np.concatenate([s.timestamp for s in store.values()] or [np.zeros(0, 'datetime64[s]')]))
+    run_of_timestamp = _run_of(timestamps, run_starts)
+    # 各指标同一步的分片时间戳可能相差1秒，步数和UE数取自样本中的最大下标
+    num_steps = np.zeros(len(run_starts), dtype=np.int64)
+    num_ues = np.zeros(len(run_starts), dtype=np.int64)
+    np.maximum.at(num_steps, samples['run'].astype(np.int64), samples['step'].astype(np.int64) + 1)
+    np.maximum.at(num_ues, samples['run'].astype(np.int64), samples['ue'].astype(np.int64) + 1)
+    runs = {'run': run_ids, 'start': run_starts,
+            'end': timestamps[np.searchsorted(run_of_timestamp, run_ids, side='right') - 1],
+            'num_steps': num_steps,
+            'num_ues': num_ues}
+
+    return {
+        'runs': runs,
+        'samples': samples,
+        'ue': ue,
+        'bler': bler_table(store, run_starts),
+        'rolling': rolling_mean(samples, window),
+    }
+
+
+def store_fingerprint(manifest: Dict, **params) -> str:
+    """清单中决定汇总结果的内容 (各指标分片数、水位线、增量段) 与计算参数的摘要"""
+    content = {
+        'version': KPI_CACHE_VERSION,
+        'segments': manifest.get('segments', []),
+        'metrics': {metric: [entry['num_shards'], entry.get('watermark')]
+                    for metric, entry in sorted(manifest['metrics'].items())},
+        'params': params,
+    }
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def save_tables(cache_file: str, tables: Dict[str, Dict[str, np.ndarray]], fingerprint: str):
+    arrays = {f"{table}/{column}": values for table, columns in tables.items() for column, values in columns.items()}
+    arrays['fingerprint'] = np.array(fingerprint)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, **arrays)
+    os.replace(tmp_file, cache_file)
+
+
+def load_tables(cache_file: str, fingerprint: str) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+    """读取缓存的汇总表，文件不存在或指纹不一致时返回None"""
+    try:
+        with np.load(cache_file, allow_pickle=False) as npz:
+            if str(npz['fingerprint']) != fingerprint:
+                return None
+            tables = {}
+            for key in npz.files:
+                if key == 'fingerprint':
+                    continue
+                table, column = key.split('/', 1)
+                tables.setdefault(table, {})[column] = npz[key]
+            return tables
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class KPIStore:
+    """
+    KPI汇总表的查询入口
+    首次访问时读取磁盘缓存 (指纹一致) 或重新计算并写入缓存；之后清单文件未修改时直接返回内存中的表
+    """
+
+    def __init__(self, store_file: str, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                 window: int = DEFAULT_WINDOW, gap_seconds: float = DEFAULT_GAP_SECONDS):
+        self.store_file = store_file
+        self.cache_file = kpi_cache_path(store_file)
+        self.params = {'percentiles': list(percentiles), 'window': window, 'gap_seconds': gap_seconds}
+        self._tables: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+        self._manifest_mtime = None
+
+    def refresh(self, force: bool = False) -> Dict[str, Dict[str, np.ndarray]]:
+        """清单变化时重新加载或计算汇总表，返回全部表"""
+        mtime = os.stat(manifest_path(self.store_file)).st_mtime_ns
+        if self._tables is not None and mtime == self._manifest_mtime and not force:
+            return self._tables
+
+        fingerprint = store_fingerprint(load_manifest(self.store_file), **self.params)
+        tables = None if force else load_tables(self.cache_file, fingerprint)
+        if tables is None:
+            tables = compute_tables(open_store(self.store_file), self.params['percentiles'],
+                                    self.params['window'], self.params['gap_seconds'])
+            save_tables(self.cache_file, tables, fingerprint)
+        self._tables = tables
+        self._manifest_mtime = mtime
+        return tables
+
+    def table(self, name: str) -> Dict[str, np.ndarray]:
+        return self.refresh()[name]
+
+    def query(self, kpi: str, table: str = 'ue', run: int = None, ue: int = None,
+              link: str = None) -> Dict[str, np.ndarray]:
+        """按KPI、运行、UE、链路筛选ue / rolling / samples表"""
+        columns = self.table(table)
+        mask = columns['kpi'] == KPI_NAMES.index(kpi)
+        if run is not None:
+            mask &= columns['run'] == run
+        if ue is not None:
+            mask &= columns['ue'] == ue
+        if link is not None:
+            mask &= columns['link'] == LINKS.index(link)
+        return {name: values[mask] for name, values in columns.items()}
+
+    def group_percentiles(self, kpi: str, labels: np.ndarray, run: int = None, link: str = None,
+                          percentiles: Sequence[float] = None) -> Dict[str, np.ndarray]:
+        """
+        按UE分组 (例如切片类型) 统计某KPI的分位数
+        labels[i]为第i个UE所属的组 (整数编码)，超出labels长度的UE不参与统计
+        """
+        samples = self.query(kpi, 'samples', run=run, link=link)
+        labels = np.asarray(labels)
+        ue = samples['ue'].astype(np.int64)
+        valid = ue < len(labels)
+        keys = {'group': labels[ue[valid]], 'link': samples['link'][valid]}
+        return group_stats(keys, samples['value'][valid], percentiles or self.params['percentiles'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志KPI汇总')
+    parser.add_argument('store', nargs='?', default=os.path.join('..', '..', 'log_data', DEFAULT_STORE_NAME),
+                        help='合并存储文件 (log_store.py生成)')
+    parser.add_argument('--kpi', choices=KPI_NAMES, default=None, help='只显示某个KPI的逐UE统计')
+    parser.add_argument('--run', type=int, default=None, help='运行编号')
+    parser.add_argument('--link', choices=LINKS, default=None, help='链路')
+    parser.add_argument('--rebuild', action='store_true', help='忽略缓存重新计算')
+    args = parser.parse_args()
+
+    kpis = KPIStore(args.store)
+    start = time.perf_counter()
+    tables = kpis.refresh(force=args.rebuild)
+    print(f"汇总表就绪 ({(time.perf_counter() - start) * 1000:.1f}ms)，缓存: '{kpis.cache_file}'")
+
+    runs = tables['runs']
+    for i in range(len(runs['run'])):
+        print(f"  运行{i}: {runs['start'][i]} ~ {runs['end'][i]}, {runs['num_steps'][i]}步, {runs['num_ues'][i]}个UE")
+
+    if args.kpi is None:
+        bler = tables['bler']
+        for run in np.unique(bler['run']):
+            mask = bler['run'] == run
+            with np.errstate(invalid='ignore', divide='ignore'):
+                dl = bler['errors_dl'][mask].sum() / bler['total_dl'][mask].sum()
+                ul = bler['errors_ul'][mask].sum() / bler['total_ul'][mask].sum()
+            print(f"  运行{run} BLER: 下行 {dl:.4f}, 上行 {ul:.4f}")
+        return
+
+    start = time.perf_counter()
+    result = kpis.query(args.kpi, run=args.run, link=args.link)
+    elapsed = (time.perf_counter() - start) * 1000
+    percentile_columns = [f"p{q:g}" for q in kpis.params['percentiles']]
+    print(f"{args.kpi}: {len(result['ue'])}行 (查询 {elapsed:.2f}ms)")
+    print('run  ue  link  count      mean  ' + '  '.join(f"{c:>8}" for c in percentile_columns))
+    for i in range(len(result['ue'])):
+        values = '  '.join(f"{result[c][i]:8.3f}" for c in percentile_columns)
+        print(f"{result['run'][i]:3d} {result['ue'][i]:3d}  {LINKS[result['link'][i]]:>4} "
+              f"{result['count'][i]:6d} {result['mean'][i]:9.3f}  {values}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""
+仿真日志分片 (log_data/<指标>/*_part_YYYY-MM-DD_HHMMSS.mat) 的读取与合并存储
+
+每个指标目录下有大量按时间戳命名的.mat分片，每个分片保存一个时刻的指标矩阵
+(例如 blerData 为 2×UE数，第1行下行、第2行上行)，不同仿真运行的UE数可能不同。
+这里按指标发现分片、用线程池并行读取、按时间排序后拼接，
+写入单个npz列式存储文件并附带JSON清单 (manifest)，之后的分析只需打开一个文件。
+
+存储布局 (每个指标、每个变量):
+    <指标>/timestamp       各分片时间戳 (datetime64[s])
+    <指标>/file            各分片文件名
+    <指标>/<变量>/data     所有分片矩阵按行优先展开后拼接 (float64)
+    <指标>/<变量>/offsets  第i个分片的数据为 data[offsets[i]:offsets[i+1]]
+    <指标>/<变量>/shape    第i个分片矩阵的形状 (行数, 列数)
+
+增量写入 (ingest.py) 的新分片保存在段文件 log_store.seg-<序号>.npz 中，布局相同，
+清单的segments列出所有段，open_store按顺序拼接；段数过多时合并 (compact) 回主文件。
+
+用法:
+    python log_store.py ../../log_data
+    python log_store.py ../../log_data -o merged.npz -m bler delay -j 16
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy.io import loadmat
+
+# 各指标目录下分片保存的变量 (与beforeFiles/hNRAppDelayNoVisualizer.m中的save一致)
+METRIC_VARIABLES = {
+    'bler': ['blerData'],
+    'delay': ['delayData'],
+    'goodput': ['goodput'],
+    'throughput': ['throughput'],
+    'bufferstatus': ['bufferstatus'],
+    'resourceshare': ['resourceshare'],
+    'dlblerinfo': ['dlBLERInfo_1', 'dlBLERInfo_2'],
+    'ulblerinfo': ['ulBLERInfo_1', 'ulBLERInfo_2'],
+}
+
+# 分片文件名中的时间戳，例如 bler_part_2024-04-24_100253.mat
+SHARD_PATTERN = re.compile(r'_part_(\d{4})-(\d{2})-(\d{2})_(\d{2})(\d{2})(\d{2})\.mat$')
+
+DEFAULT_STORE_NAME = 'log_store.npz'
+MANIFEST_SUFFIX = '.manifest.json'
+STORE_VERSION = 1
+
+
+@dataclass
+class Shard:
+    """一个日志分片文件"""
+    metric: str
+    path: str
+    timestamp: np.datetime64
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+@dataclass
+class MetricSeries:
+    """一个指标按时间排序的全部分片，变量以 (data, offsets, shape) 的CSR形式存储"""
+    metric: str
+    timestamp: np.ndarray
+    file: np.ndarray
+    variables: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def frame(self, i: int, variable: str = None) -> np.ndarray:
+        """第i个分片的矩阵"""
+        columns = self.variables[variable or self.default_variable]
+        start, end = columns['offsets'][i], columns['offsets'][i + 1]
+        return columns['data'][start:end].reshape(columns['shape'][i])
+
+    @property
+    def default_variable(self) -> str:
+        return next(iter(self.variables))
+
+    def stack(self, variable: str = None) -> np.ndarray:
+        """
+        所有分片堆叠为 (分片数, 最大行数, 最大列数) 的数组，列数不足的分片以NaN填充
+        """
+        columns = self.variables[variable or self.default_variable]
+        shape = columns['shape']
+        if len(shape) == 0:
+            return np.zeros((0, 0, 0))
+        out = np.full((len(shape), int(shape[:, 0].max()), int(shape[:, 1].max())), np.nan)
+        for i in range(len(shape)):
+            rows, cols = shape[i]
+            out[i, :rows, :cols] = self.frame(i, variable)
+        return out
+
+
+def concat_series(first: MetricSeries, second: MetricSeries) -> MetricSeries:
+    """按时间顺序拼接同一指标的两段序列 (second在first之后)"""
+    series = MetricSeries(first.metric, np.concatenate([first.timestamp, second.timestamp]),
+                          np.concatenate([first.file, second.file]))
+    for name in dict.fromkeys(list(first.variables) + list(second.variables)):
+        parts = []
+        for part in (first, second):
+            if name in part.variables:
+                parts.append(part.variables[name])
+            else:
+                # 某一段中没有该变量时补0×0矩阵
+                parts.append({'data': np.zeros(0), 'offsets': np.zeros(len(part) + 1, dtype=np.int64),
+                              'shape': np.zeros((len(part), 2), dtype=np.int64)})
+        a, b = parts
+        series.variables[name] = {
+            'data': np.concatenate([a['data'], b['data']]),
+            'offsets': np.concatenate([a['offsets'], b['offsets'][1:] + a['offsets'][-1]]),
+            'shape': np.concatenate([a['shape'], b['shape']]),
+        }
+    return series
+
+
+def parse_timestamp(path: str) -> Optional[np.datetime64]:
+    """从分片文件名解析时间戳，不符合命名规则时返回None"""
+    match = SHARD_PATTERN.search(os.path.basename(path))
+    if match is None:
+        return None
+    year, month, day, hour, minute, second = match.groups()
+    return np.datetime64(f"{year}-{month}-{day}T{hour}:{minute}:{second}", 's')
+
+
+def discover_shards(log_dir: str, metrics: Iterable[str] = None) -> Dict[str, List[Shard]]:
+    """按指标发现分片，每个指标内按 (时间戳, 文件名) 排序"""
+    result = {}
+    for metric in metrics or METRIC_VARIABLES:
+        metric_dir = os.path.join(log_dir, metric)
+        if not os.path.isdir(metric_dir):
+            continue
+        shards = []
+        with os.scandir(metric_dir) as entries:
+            for entry in entries:
+                timestamp = parse_timestamp(entry.name) if entry.is_file() else None
+                if timestamp is not None:
+                    shards.append(Shard(metric, entry.path, timestamp))
+        shards.sort(key=lambda s: (s.timestamp, s.name))
+        result[metric] = shards
+    return result
+
+
+def load_shard(shard: Shard) -> Dict[str, np.ndarray]:
+    """读取一个分片中该指标的变量，统一转换为二维float64 (不同运行保存的类型可能为uint8或double)"""
+    variables = METRIC_VARIABLES.get(shard.metric)
+    mat = loadmat(shard.path, variable_names=variables)
+    names = variables or [k for k in mat if not k.startswith('__')]
+    return {name: np.atleast_2d(np.asarray(mat[name], dtype=np.float64)) for name in names if name in mat}
+
+
+def build_series(metric: str, shards: List[Shard], frames: List[Dict[str, np.ndarray]]) -> MetricSeries:
+    """把按时间排序的分片矩阵拼接为MetricSeries"""
+    names = METRIC_VARIABLES.get(metric) or sorted({name for frame in frames for name in frame})
+    series = MetricSeries(metric,
+                          np.array([s.timestamp for s in shards], dtype='datetime64[s]'),
+                          np.array([s.name for s in shards], dtype=np.str_))
+    for name in names:
+        # 分片中缺少该变量时记为0×0矩阵，保证各变量与时间戳一一对应
+        arrays = [frame.get(name, np.zeros((0, 0))) for frame in frames]
+        shape = np.array([a.shape for a in arrays], dtype=np.int64).reshape(-1, 2)
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum(shape[:, 0] * shape[:, 1], out=offsets[1:])
+        data = np.concatenate([a.ravel() for a in arrays]) if arrays else np.zeros(0)
+        series.variables[name] = {'data': data, 'offsets': offsets, 'shape': shape}
+    return series
+
+
+def load_series(shards_by_metric: Dict[str, List[Shard]], workers: int = 8) -> Dict[str, MetricSeries]:
+    """用线程池并行读取给定的分片，返回按指标组织的时间序列"""
+    all_shards = [s for shards in shards_by_metric.values() for s in shards]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(load_shard, all_shards))
+
+    result = {}
+    position = 0
+    for metric, shards in shards_by_metric.items():
+        result[metric] = build_series(metric, shards, frames[position:position + len(shards)])
+        position += len(shards)
+    return result
+
+
+def load_metrics(log_dir: str, metrics: Iterable[str] = None, workers: int = 8) -> Dict[str, MetricSeries]:
+    """发现并并行读取log_dir下的所有分片"""
+    return load_series(discover_shards(log_dir, metrics), workers)
+
+
+def manifest_path(store_file: str) -> str:
+    return os.path.splitext(store_file)[0] + MANIFEST_SUFFIX
+
+
+def file_entries(shards: List[Shard]) -> List[Dict]:
+    """清单中记录的分片文件信息"""
+    entries = []
+    for shard in shards:
+        st = os.stat(shard.path)
+        entries.append({'name': shard.name, 'timestamp': str(shard.timestamp),
+                        'size': st.st_size, 'mtime_ns': st.st_mtime_ns})
+    return entries
+
+
+def watermark(files: List[Dict]) -> Optional[Dict]:
+    """
+    水位线: 已写入的最新时间戳及该时间戳下的文件名 (同一秒内可能有多个分片)
+    files为按时间排序的清单文件信息
+    """
+    if not files:
+        return None
+    latest = files[-1]['timestamp']
+    return {'timestamp': latest, 'files': [f['name'] for f in files if f['timestamp'] == latest]}
+
+
+def _manifest_entry(series: MetricSeries, shards: List[Shard]) -> Dict:
+    files = file_entries(shards)
+    return {
+        'num_shards': len(series),
+        'first_timestamp': str(series.timestamp[0]) if len(series) else None,
+        'last_timestamp': str(series.timestamp[-1]) if len(series) else None,
+        'variables': list(series.variables),
+        'watermark': watermark(files),
+        'files': files,
+    }
+
+
+def _write_npz(npz_file: str, series_by_metric: Dict[str, MetricSeries]):
+    """按存储布局写入npz (先写临时文件再替换，读者不会看到写了一半的文件)"""
+    arrays = {}
+    for metric, series in series_by_metric.items():
+        arrays[f"{metric}/timestamp"] = series.timestamp
+        arrays[f"{metric}/file"] = series.file
+        for name, columns in series.variables.items():
+            for key, value in columns.items():
+                arrays[f"{metric}/{name}/{key}"] = value
+
+    tmp_file = f"{npz_file}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, **arrays)
+    os.replace(tmp_file, npz_file)
+
+
+def save_manifest(store_file: str, manifest: Dict):
+    tmp_manifest = f"{manifest_path(store_file)}.{os.getpid()}.tmp"
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_manifest, manifest_path(store_file))
+
+
+def save_store(store_file: str, series_by_metric: Dict[str, MetricSeries], manifest: Dict):
+    """写入npz主文件和JSON清单 (清单最后写入，清单中的内容总是已经落盘)"""
+    _write_npz(store_file, series_by_metric)
+    save_manifest(store_file, manifest)
+
+
+def segment_path(store_file: str, index: int) -> str:
+    return f"{os.path.splitext(store_file)[0]}.seg-{index:05d}.npz"
+
+
+def remove_unlisted_segments(store_file: str, manifest: Dict):
+    """删除清单中未列出的段文件 (合并后遗留或写入中途失败)"""
+    listed = set(manifest.get('segments', []))
+    pattern = glob.escape(os.path.splitext(store_file)[0]) + '.seg-*.npz'
+    for segment_file in glob.glob(pattern):
+        if os.path.basename(segment_file) not in listed:
+            try:
+                os.remove(segment_file)
+            except OSError:
+                pass
+
+
+def save_segment(store_file: str, index: int, series_by_metric: Dict[str, MetricSeries]) -> str:
+    """写入一个增量段文件，返回文件名 (相对于存储文件所在目录)"""
+    segment_file = segment_path(store_file, index)
+    _write_npz(segment_file, series_by_metric)
+    return os.path.basename(segment_file)
+
+
+def consolidate(log_dir: str, store_file: str = None, metrics: Iterable[str] = None,
+                workers: int = 8) -> Dict:
+    """
+    读取log_dir下的全部分片并写入合并存储
+    store_file默认为 <log_dir>/log_store.npz，清单为同名的 .manifest.json
+
+    Returns:
+        清单字典
+    """
+    if store_file is None:
+        store_file = os.path.join(log_dir, DEFAULT_STORE_NAME)
+    shards_by_metric = discover_shards(log_dir, metrics)
+    series_by_metric = load_series(shards_by_metric, workers)
+    manifest = {
+        'version': STORE_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'log_dir': os.path.abspath(log_dir),
+        'store': os.path.basename(store_file),
+        'segments': [],
+        'metrics': {metric: _manifest_entry(series_by_metric[metric], shards)
+                    for metric, shards in shards_by_metric.items()},
+    }
+    save_store(store_file, series_by_metric, manifest)
+    remove_unlisted_segments(store_file, manifest)
+    return manifest
+
+
+def load_manifest(store_file: str) -> Dict:
+    with open(manifest_path(store_file), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_npz(npz_file: str, manifest: Dict, metrics: List[str]) -> Dict[str, MetricSeries]:
+    result = {}
+    with np.load(npz_file, allow_pickle=False) as npz:
+        for metric in metrics:
+            if f"{metric}/timestamp" not in npz.files:
+                continue
+            series = MetricSeries(metric, npz[f"{metric}/timestamp"], npz[f"{metric}/file"])
+            for name in manifest['metrics'][metric]['variables']:
+                if f"{metric}/{name}/data" in npz.files:
+                    series.variables[name] = {key: npz[f"{metric}/{name}/{key}"]
+                                              for key in ('data', 'offsets', 'shape')}
+            result[metric] = series
+    return result
+
+
+def open_store(store_file: str, metrics: Iterable[str] = None) -> Dict[str, MetricSeries]:
+    """
+    打开合并存储 (主文件及清单中列出的增量段)，返回按指标组织的MetricSeries
+
+    Raises:
+        FileNotFoundError: 存储文件不存在
+    """
+    manifest = load_manifest(store_file)
+    wanted = list(metrics) if metrics is not None else list(manifest['metrics'])
+    result = _read_npz(store_file, manifest, wanted)
+    store_dir = os.path.dirname(os.path.abspath(store_file))
+    for segment in manifest.get('segments', []):
+        for metric, series in _read_npz(os.path.join(store_dir, segment), manifest, wanted).items():
+            result[metric] = concat_series(result[metric], series) if metric in result else series
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合并仿真日志分片为单个列式存储文件')
+    parser.add_argument('log_dir', help='日志目录 (包含bler / delay / goodput等子目录)')
+    parser.add_argument('-o', '--output', default=None, help=f'存储文件，默认为 <log_dir>/{DEFAULT_STORE_NAME}')
+    parser.add_argument('-m', '--metrics', nargs='+', default=None, help='只合并指定指标')
+    parser.add_argument('-j', '--workers', type=int, default=8, help='读取线程数')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = consolidate(args.log_dir, args.output, args.metrics, args.workers)
+    total = sum(entry['num_shards'] for entry in manifest['metrics'].values())
+    print(f"合并 {total} 个分片，用时 {time.perf_counter() - start:.2f}s")
+    for metric, entry in manifest['metrics'].items():
+        print(f"  {metric}: {entry['num_shards']}个分片, "
+              f"{entry['first_timestamp']} ~ {entry['last_timestamp']}, 变量: {entry['variables']}")
+    store_file = args.output or os.path.join(args.log_dir, DEFAULT_STORE_NAME)
+    print(f"存储文件: '{store_file}'，清单: '{manifest_path(store_file)}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+log_data/log_metrics/visulization_data.txt 的流式解析
+
+文件由两部分组成:
+- 文本头: 每行 "<说明>: [n1  n2 ...]" (NumPy打印格式，UE较多时一个数组会折行)
+- 缩进格式的JSON文档: 运行信息 (Time / UESpeed / SCS / Bandwidth) 及
+  visulalazation_data 下各指标的数组 (二维为 UE × 统计步，一维为逐包序列)
+
+JSON部分按块读取并增量解析: 结构字符逐个处理，纯数值数组整段切出后由NumPy批量转换，
+不会把整个文件或完整的Python列表保留在内存中。iter_values逐个产出数值片段，
+可以在不构造完整数组的情况下做统计 (见summarize)；load_metrics_log把片段拼接为NumPy数组。
+
+用法:
+    python metrics_log.py ../../log_data/log_metrics/visulization_data.txt
+"""
+import argparse
+import json
+import re
+from dataclasses import dataclass, field
+from json.decoder import scanstring
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+import numpy as np
+
+# 指标数组所在的JSON键 (原文件中的拼写)
+DATA_KEY = 'visulalazation_data'
+
+# 每次读取的字符数
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SCALAR = re.compile(r'-?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?|true|false|null|NaN|-?Infinity')
+_NUMERIC_START = frozenset('-0123456789.NIn')
+_HEADER_LINE = re.compile(r'^(?P<label>[^:\[]+):\s*\[(?P<values>[^\]]*)\]\s*$', re.S)
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+# (路径, 值): 路径由对象键和数组下标组成，例如 ('visulalazation_data', 'uplink_delay_list', 2)
+Event = Tuple[Tuple[Any, ...], Any]
+
+
+@dataclass
+class MetricsLog:
+    """解析结果: 文本头中的数组、运行信息及各指标数组"""
+    header: Dict[str, np.ndarray] = field(default_factory=dict)
+    info: Dict[str, Any] = field(default_factory=dict)
+    series: Dict[str, Any] = field(default_factory=dict)
+
+
+def parse_header_line(text: str) -> Tuple[str, Any]:
+    """ "<说明>: [0  3  2  1]" -> (说明, 数组)，不是数组格式时返回原文本"""
+    match = _HEADER_LINE.match(text.strip())
+    if match is None:
+        return text.strip(), None
+    values = match.group('values').split()
+    return match.group('label').strip(), np.array(values, dtype=np.float64)
+
+
+def read_header(f: TextIO) -> Tuple[Dict[str, Any], str]:
+    """
+    读取JSON之前的文本头，返回 (说明 -> 数组, JSON部分的第一行)
+    折行的数组按方括号配对合并为一条
+    """
+    header = {}
+    pending = ''
+    while True:
+        line = f.readline()
+        if not line:
+            return header, ''
+        if not pending and line.lstrip().startswith(('{', '[')):
+            return header, line
+        pending += line
+        if pending.count('[') > pending.count(']'):
+            continue
+        if pending.strip():
+            label, values = parse_header_line(pending)
+            header[label] = values if values is not None else label
+        pending = ''
+
+
+def _parse_numbers(text: str) -> np.ndarray:
+    """逗号分隔的JSON数值 -> float64数组 (null记为NaN)"""
+    if not text.strip():
+        return np.zeros(0)
+    if 'n' in text:
+        text = text.replace('null', 'nan')
+    try:
+        return np.array(text.split(','), dtype=np.float64)
+    except ValueError:
+        raise ValueError(f"数组中包含非数值元素: {text[:80]!r}") from None
+
+
+class _EventReader:
+    """
+    增量JSON解析器
+    只支持本文件用到的结构: 对象、数组、字符串、数值和字面量；
+    元素全为数值的数组以 (路径, ndarray) 片段产出，很长的数组会分多段产出
+    """
+
+    def __init__(self, f: TextIO, prefix: str = '', chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = prefix
+        self.pos = 0
+        self.eof = False
+        # 每层为 [类型, 当前键或下标]
+        self.stack: List[list] = []
+
+    def _fill(self) -> bool:
+        """读入下一块，文件已结束时返回False"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def _skip_whitespace(self) -> bool:
+        """跳过空白，缓冲区中还有字符时返回True"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return True
+            if not self._fill():
+                return False
+
+    def _path(self) -> Tuple[Any, ...]:
+        return tuple(frame[1] for frame in self.stack)
+
+    def _element_done(self):
+        if not self.stack:
+            return
+        frame = self.stack[-1]
+        if frame[0] == 'object':
+            frame[1] = None
+        else:
+            frame[1] += 1
+
+    def _numeric_array(self) -> Iterator[Event]:
+        """从当前位置读取纯数值数组直到 ']'，过长时按最后一个逗号分段产出"""
+        path = self._path()
+        while True:
+            end = self.buf.find(']', self.pos)
+            if end >= 0:
+                yield path, _parse_numbers(self.buf[self.pos:end])
+                self.pos = end + 1
+                return
+            comma = self.buf.rfind(',', self.pos)
+            if comma >= 0:
+                yield path, _parse_numbers(self.buf[self.pos:comma])
+                self.pos = comma + 1
+            if not self._fill():
+                raise ValueError("JSON在数组中途结束")
+
+    def _string(self) -> str:
+        while True:
+            try:
+                value, end = scanstring(self.buf, self.pos + 1)
+                self.pos = end
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise ValueError("JSON在字符串中途结束") from None
+
+    def _scalar(self) -> Any:
+        while True:
+            match = _SCALAR.match(self.buf, self.pos)
+            # 匹配到缓冲区末尾时数值可能被截断，读入更多内容后重新匹配
+            if match is not None and (match.end() < len(self.buf) or self.eof):
+                break
+            if not self._fill():
+                if match is None:
+                    raise ValueError(f"无法解析的JSON值: {self.buf[self.pos:self.pos + 20]!r}")
+        self.pos = match.end()
+        token = match.group()
+        if token in _LITERALS:
+            return _LITERALS[token]
+        return int(token) if token.lstrip('-').isdigit() else float(token)
+
+    def events(self) -> Iterator[Event]:
+        while self._skip_whitespace():
+            c = self.buf[self.pos]
+            top = self.stack[-1] if self.stack else None
+            if c in ',:':
+                self.pos += 1
+            elif c == '{':
+                self.pos += 1
+                self.stack.append(['object', None])
+            elif c == '[':
+                self.pos += 1
+                if not self._skip_whitespace():
+                    raise ValueError("JSON在数组中途结束")
+                if self.buf[self.pos] in _NUMERIC_START or self.buf[self.pos] == ']':
+                    yield from self._numeric_array()
+                    self._element_done()
+                else:
+                    self.stack.append(['array', 0])
+            elif c in '}]':
+                self.pos += 1
+                self.stack.pop()
+                self._element_done()
+                if not self.stack:
+                    return
+            elif c == '"':
+                value = self._string()
+                if top is not None and top[0] == 'object' and top[1] is None:
+                    top[1] = value
+                else:
+                    yield self._path(), value
+                    self._element_done()
+            else:
+                yield self._path(), self._scalar()
+                self._element_done()
+
+
+def iter_values(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Event]:
+    """
+    逐个产出JSON部分的 (路径, 值)，跳过文本头
+    纯数值数组的值为ndarray片段，同一路径的连续片段依次拼接即为完整数组
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        _, first_line = read_header(f)
+        yield from _EventReader(f, first_line, chunk_size).events()
+
+
+def _insert(tree: dict, path: Tuple[Any, ...], value: Any):
+    node = tree
+    for key in path[:-1]:
+        node = node.setdefault(key, {})
+    node[path[-1]] = value
+
+
+def _finalize(node: Any) -> Any:
+    """以下标为键的字典 -> 列表；等长一维数组组成的列表 -> 二维数组"""
+    if not isinstance(node, dict):
+        return node
+    items = {key: _finalize(value) for key, value in node.items()}
+    if not items or not all(isinstance(key, int) for key in items):
+        return items
+    values = [items[i] for i in sorted(items)]
+    if all(isinstance(v, np.ndarray) and v.ndim == 1 for v in values) and len({len(v) for v in values}) == 1:
+        return np.vstack(values)
+    return values
+
+
+def load_metrics_log(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> MetricsLog:
+    """读取visulization_data.txt，指标数组转换为NumPy数组 (各行长度不同时为数组列表)"""
+    pieces: Dict[Tuple[Any, ...], Any] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        header, first_line = read_header(f)
+        for key, value in _EventReader(f, first_line, chunk_size).events():
+            if isinstance(value, np.ndarray):
+                pieces.setdefault(key, []).append(value)
+            else:
+                pieces[key] = value
+
+    tree = {}
+    for key, value in pieces.items():
+        if isinstance(value, list):
+            value = value[0] if len(value) == 1 else np.concatenate(value)
+        _insert(tree, key, value)
+    document = _finalize(tree)
+    series = document.pop(DATA_KEY, {}) if isinstance(document, dict) else {}
+    return MetricsLog(header, document if isinstance(document, dict) else {}, series)
+
+
+def summarize(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Dict[str, float]]:
+    """
+    不构造完整数组，逐片段统计各指标的元素数、行数、均值、最小值和最大值
+    内存占用只与chunk_size有关，适用于很大的文件
+    """
+    stats: Dict[str, Dict[str, float]] = {}
+    rows = {}
+    for key, value in iter_values(path, chunk_size):
+        if not isinstance(value, np.ndarray) or len(key) < 2 or key[0] != DATA_KEY:
+            continue
+        name = key[1]
+        entry = stats.setdefault(name, {'count': 0, 'rows': 0, 'sum': 0.0, 'min': np.inf, 'max': -np.inf})
+        rows.setdefault(name, set()).add(key[2:])
+        finite = value[np.isfinite(value)]
+        entry['count'] += len(value)
+        if len(finite):
+            entry['sum'] += float(finite.sum())
+            entry['min'] = min(entry['min'], float(finite.min()))
+            entry['max'] = max(entry['max'], float(finite.max()))
+    for name, entry in stats.items():
+        entry['rows'] = len(rows[name])
+        entry['mean'] = entry.pop('sum') / entry['count'] if entry['count'] else float('nan')
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析 log_metrics/visulization_data.txt')
+    parser.add_argument('file', help='visulization_data.txt 路径')
+    parser.add_argument('--stream', action='store_true', help='只做逐片段统计，不构造完整数组 (大文件)')
+    args = parser.parse_args()
+
+    if args.stream:
+        for name, entry in summarize(args.file).items():
+            print(f"{name}: {entry['rows']}行 {entry['count']}个值, 均值 {entry['mean']:.4f}, "
+                  f"范围 [{entry['min']:.4f}, {entry['max']:.4f}]")
+        return
+
+    log = load_metrics_log(args.file)
+    for label, values in log.header.items():
+        print(f"{label}: {values}")
+    print(f"运行信息: {log.info}")
+    for name, values in log.series.items():
+        shape = values.shape if isinstance(values, np.ndarray) else f"{len(values)}行 (长度不同)"
+        print(f"  {name}: {shape}")
+
+
+if __name__ == '__main__':
+    main()
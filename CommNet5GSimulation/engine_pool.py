@@ -0,0 +1,225 @@
+"""
+MATLAB引擎池
+启动MATLAB引擎 (matlab.engine.start_matlab) 需要数十秒，run.py每次运行都重新启动并在结束时退出。
+这里改为使用共享会话: 后台常驻的MATLAB进程通过 matlab.engine.shareEngine 以固定名称共享，
+调用方用 find_matlab / connect_matlab 连接 (毫秒级)，用完归还而不退出。
+会话崩溃或连接失效时，按原名称重新启动并连接。
+
+用法:
+    python engine_pool.py start -n 4     # 后台启动4个共享会话 (commnet5g_1 ... commnet5g_4)
+    python engine_pool.py status         # 查看共享会话
+    python engine_pool.py stop           # 关闭所有共享会话
+
+    from engine_pool import EnginePool
+    with EnginePool(size=2) as pool:
+        with pool.acquire() as eng:
+            eng.main()
+"""
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import matlab.engine
+
+# 共享会话名称前缀，会话名为 <前缀>_<序号>
+SESSION_PREFIX = 'commnet5g'
+
+# 等待新启动的共享会话出现的超时时间 (秒)
+DEFAULT_STARTUP_TIMEOUT = 180
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def simulation_path() -> str:
+    """仿真MATLAB代码所在目录 (MATLAB路径格式)"""
+    return os.path.join(script_dir, 'simulation').replace('\\', '/')
+
+
+def session_name(index: int, prefix: str = SESSION_PREFIX) -> str:
+    return f"{prefix}_{index}"
+
+
+def find_sessions(prefix: str = SESSION_PREFIX) -> List[str]:
+    """当前机器上以prefix开头的共享会话"""
+    return sorted(name for name in matlab.engine.find_matlab() if name.startswith(prefix + '_'))
+
+
+def launch_session(name: str, matlab_executable: str = 'matlab') -> subprocess.Popen:
+    """
+    在后台启动一个常驻的MATLAB进程并以name共享
+    进程与当前Python进程分离，Python退出后会话仍然保留
+    """
+    startup = f"addpath('{simulation_path()}'); matlab.engine.shareEngine('{name}')"
+    command = [matlab_executable, '-nosplash', '-nodesktop', '-r', startup]
+    if os.name == 'nt':
+        command.insert(3, '-minimize')
+        flags = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        return subprocess.Popen(command, creationflags=flags, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return subprocess.Popen(command, start_new_session=True, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_sessions(names: List[str], timeout: float = DEFAULT_STARTUP_TIMEOUT):
+    """等待names中的共享会话全部出现"""
+    deadline = time.monotonic() + timeout
+    missing = set(names)
+    while missing:
+        missing -= set(matlab.engine.find_matlab())
+        if not missing:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"等待MATLAB共享会话超时: {sorted(missing)}")
+        time.sleep(1.0)
+
+
+def connect_session(name: str, start_missing: bool = True, timeout: float = DEFAULT_STARTUP_TIMEOUT):
+    """
+    连接名为name的共享会话，会话不存在且start_missing为True时先在后台启动
+    连接后添加仿真代码路径 (addpath对已存在的路径无开销)
+    """
+    if name not in matlab.engine.find_matlab():
+        if not start_missing:
+            raise RuntimeError(f"MATLAB共享会话不存在: {name}")
+        launch_session(name)
+        wait_for_sessions([name], timeout)
+    eng = matlab.engine.connect_matlab(name)
+    eng.addpath(simulation_path(), nargout=0)
+    return eng
+
+
+def is_healthy(eng) -> bool:
+    """引擎是否仍可调用 (MATLAB崩溃或被关闭后调用会抛出异常)"""
+    try:
+        eng.eval('0;', nargout=0)
+        return True
+    except Exception:
+        return False
+
+
+def stop_session(eng):
+    """关闭共享会话对应的MATLAB进程 (quit只会断开连接)"""
+    try:
+        eng.eval('exit', nargout=0)
+    except Exception:
+        pass  # MATLAB退出时连接随之断开
+
+
+class EnginePool:
+    """
+    共享会话引擎池
+    size个会话按 <prefix>_1 ... <prefix>_<size> 命名，已存在的会话直接连接，缺少的在后台启动
+    acquire取出一个引擎，使用前检查是否可用，不可用时按原名称重建
+    健康检查和重建只持有该会话自己的锁，一个会话的慢速重启不会阻塞其他会话；
+    池级别的锁只保护 名称 -> 引擎 字典的读写
+    """
+
+    def __init__(self, size: int = 1, prefix: str = SESSION_PREFIX, first_index: int = 1,
+                 start_missing: bool = True, timeout: float = DEFAULT_STARTUP_TIMEOUT):
+        self.prefix = prefix
+        self.start_missing = start_missing
+        self.timeout = timeout
+        self.names = [session_name(first_index + i, prefix) for i in range(size)]
+        self._engines: Dict[str, object] = {}
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._session_locks = {name: threading.Lock() for name in self.names}
+
+        # 先一次性启动所有缺少的会话再等待，多个MATLAB并行启动
+        missing = [name for name in self.names if name not in matlab.engine.find_matlab()]
+        if missing and not start_missing:
+            raise RuntimeError(f"MATLAB共享会话不存在: {missing}")
+        for name in missing:
+            print(f"启动MATLAB共享会话: {name}")
+            launch_session(name)
+        wait_for_sessions(missing, timeout)
+
+        for name in self.names:
+            self._engines[name] = connect_session(name, start_missing, timeout)
+            self._idle.put(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _recycle(self, name: str):
+        """会话失效: 关闭残留进程后按原名称重新启动并连接 (调用方持有该会话的锁)"""
+        print(f"MATLAB共享会话 {name} 不可用，重新启动")
+        with self._lock:
+            old = self._engines.pop(name, None)
+        if old is not None:
+            try:
+                old.quit()
+            except Exception:
+                pass
+        if name in matlab.engine.find_matlab():
+            # 会话仍在注册表中但无响应 (例如卡死)，连接后关闭
+            try:
+                stop_session(matlab.engine.connect_matlab(name))
+            except Exception:
+                pass
+        eng = connect_session(name, self.start_missing, self.timeout)
+        with self._lock:
+            self._engines[name] = eng
+        return eng
+
+    @contextmanager
+    def acquire(self, timeout: float = None):
+        """取出一个可用引擎，with块结束后归还"""
+        name = self._idle.get(timeout=timeout)
+        try:
+            with self._session_locks[name]:
+                with self._lock:
+                    eng = self._engines.get(name)
+                if not is_healthy(eng):
+                    eng = self._recycle(name)
+            yield eng
+        finally:
+            self._idle.put(name)
+
+    def close(self, stop: bool = False):
+        """断开所有连接，stop为True时同时关闭共享会话"""
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for eng in engines:
+            if stop:
+                stop_session(eng)
+            else:
+                try:
+                    eng.quit()
+                except Exception:
+                    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MATLAB共享会话管理')
+    parser.add_argument('command', choices=['start', 'status', 'stop'])
+    parser.add_argument('-n', '--size', type=int, default=1, help='共享会话数量 (start)')
+    parser.add_argument('--prefix', default=SESSION_PREFIX, help='会话名称前缀')
+    args = parser.parse_args()
+
+    if args.command == 'start':
+        start = time.perf_counter()
+        pool = EnginePool(args.size, args.prefix)
+        pool.close()
+        print(f"{args.size} 个共享会话就绪 ({time.perf_counter() - start:.1f}s): {pool.names}")
+    elif args.command == 'status':
+        sessions = find_sessions(args.prefix)
+        print(f"共享会话 ({len(sessions)}个): {sessions}")
+    else:
+        for name in find_sessions(args.prefix):
+            stop_session(matlab.engine.connect_matlab(name))
+            print(f"已关闭: {name}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
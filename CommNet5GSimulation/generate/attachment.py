@@ -0,0 +1,288 @@
+"""
+批量小区接入 (准入) 引擎
+MATLAB侧NetSimuEnv.lockResources按优先级逐个处理UE: 先尝试当前的gnbNodeId，
+失败后按距离从近到远 (tools.getCoveredGnbsForUe) 依次调用attemptGNBConnection，
+接入条件为基站支持该UE的切片类型且切片的connectedUEsCount < maxConnectedUEsCount。
+这里对所有UE一次性求解同样的结果:
+- 候选: 由spatial_index查询覆盖每个UE的基站，按距离 (或RSRP) 排序，
+  只保留支持该UE切片类型的基站，每个候选对应一个 (基站, 切片) 容量单元
+- 容量: 切片资源块 ceil(NRB × resourceWeight) / minUERBs，与createNRGNB / nrSlice一致
+- 求解: 按轮次的延迟接受，每轮所有未接入的UE向下一个候选提出申请，
+  各容量单元的申请者 (含已暂时接受的UE) 按优先级排序后用前缀计数保留前 容量 个，其余UE转向下一个候选。
+  所有容量单元对UE的优先顺序相同 (priority降序，同优先级按原始顺序，与sortUeByPriority的稳定排序一致)，
+  此时延迟接受的结果唯一且等于按优先级逐个贪心接入的结果
+- 耗时: 端到端主要花在候选生成 (覆盖查询与按距离排序，30万UE×1000基站时约占九成)，
+  求解部分约为逐个贪心循环 (attach_greedy) 的一半，因此整体只比attach_greedy快约1.1~1.2倍
+
+用法 (基准测试):
+    python attachment.py --ues 200000 --gnbs 1000 --verify 20000
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from sinr_engine import SINRConfig, SINREngine
+from spatial_index import GeoIndex
+
+# 每个UE占用的最小资源块数 (createNRGNB中固定为4)
+MIN_UE_RBS = 4
+
+RANK_MODES = ('distance', 'rsrp')
+
+
+@dataclass
+class AttachmentConfig:
+    """接入参数，默认值与NetSimuEnv.lockResources一致"""
+    rank_by: str = 'distance'       # 候选基站排序: 'distance' (getCoveredGnbsForUe) 或 'rsrp' (接收信号降序)
+    min_ue_rbs: int = MIN_UE_RBS
+    prefer_current: bool = True     # 已连接的UE先尝试当前基站 (不要求在覆盖范围内，与MATLAB一致)
+    sinr: SINRConfig = None         # rank_by为'rsrp'时的路损配置
+
+
+@dataclass
+class AttachmentResult:
+    """接入结果: serving / slice_rows为每个UE的基站行号 / 切片行号 (-1为未接入)，load为每个切片的已接入UE数"""
+    serving: np.ndarray
+    slice_rows: np.ndarray
+    load: np.ndarray
+    rounds: int = 0
+
+    @property
+    def num_attached(self) -> int:
+        return int(np.count_nonzero(self.serving >= 0))
+
+    def apply(self, table):
+        """把结果写回NetworkTable: 接入的UE更新gnbNodeId并置为Connected，其余UE置为Idle"""
+        attached = self.serving >= 0
+        table.ues['gnbNodeId'][attached] = table.gnbs['id'][self.serving[attached]]
+        table.ues['connectionState'][:] = attached
+
+
+def priority_order(priority: np.ndarray) -> np.ndarray:
+    """UE处理顺序: priority降序，相同优先级保持原始顺序 (MATLAB sort 'descend'为稳定排序)"""
+    return np.argsort(-np.asarray(priority, dtype=np.int64), kind='stable')
+
+
+class AttachmentEngine:
+    """
+    基于NetworkTable列数据的批量接入引擎
+    基站的空间索引、切片容量以及 (基站, 切片类型) -> 切片行号 的查找表在构造时一次性计算
+    """
+
+    def __init__(self, table, area_bounds: Sequence[float], config: AttachmentConfig = None):
+        if config is None:
+            config = AttachmentConfig()
+        if config.rank_by not in RANK_MODES:
+            raise ValueError(f"不支持的候选排序方式: {config.rank_by}，可选: {', '.join(RANK_MODES)}")
+        self.table = table
+        self.area_bounds = area_bounds
+        self.config = config
+
+        gnbs = table.gnbs
+        self.index = GeoIndex(gnbs['latitude'], gnbs['longitude'], gnbs['radius'])
+        self.capacity = self.slice_capacity(table, config.min_ue_rbs)
+
+        self.slice_lookup = table.slice_lookup()
+
+        self._sinr_engine = None
+
+    @staticmethod
+    def slice_capacity(table, min_ue_rbs: int = MIN_UE_RBS) -> np.ndarray:
+        """
+        每个切片可接入的UE数: nrSlice的maxConnectedUEsCount = ceil(NRB × resourceWeight) / minUERBs，
+        connectedUEsCount为整数，因此可接入数为其向上取整
+        """
+        rows = table.slice_gnb_rows()
+        num_rbs = np.ceil(table.gnbs['numResourceBlocks'][rows].astype(np.float64) * table.slice_resource_weights())
+        return np.ceil(num_rbs / min_ue_rbs).astype(np.int64)
+
+    @property
+    def sinr_engine(self) -> SINREngine:
+        if self._sinr_engine is None:
+            self._sinr_engine = SINREngine(self.table, self.area_bounds, self.config.sinr)
+        return self._sinr_engine
+
+    def current_serving(self) -> np.ndarray:
+        """表中记录的服务基站行号 (处于连接状态且gnbNodeId存在)，-1为未连接"""
+        ues = self.table.ues
+        return np.where(ues['connectionState'] == 1, self.table.gnb_rows(ues['gnbNodeId']), -1)
+
+    def candidates(self, ue_rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        每个UE按尝试顺序排列的候选 (对应lockResources中attemptGNBConnection的调用顺序)
+        返回CSR形式 (offsets, gnb_rows, slice_rows)：第q个UE (ue_rows[q]) 的候选为 [offsets[q]:offsets[q+1]]，
+        不支持该UE切片类型的基站不会接入也不占用资源，已被剔除
+        """
+        ues = self.table.ues
+        if ue_rows is None:
+            ue_rows = np.arange(self.table.num_ues)
+        ue_rows = np.asarray(ue_rows, dtype=np.int64)
+        offsets, gnb_rows, distances = self.index.covering(ues['latitude'][ue_rows], ues['longitude'][ue_rows])
+        query = np.repeat(np.arange(len(ue_rows)), np.diff(offsets))
+
+        if self.config.rank_by == 'rsrp' and len(query):
+            rsrp = self.sinr_engine.received_power(ue_rows[query], gnb_rows, pairwise=True)
+            order = np.lexsort((-rsrp, query))
+            gnb_rows = gnb_rows[order]
+
+        # 当前基站排在最前，并从覆盖列表中去掉 (findAndConnectToGNB的excludedGNBs)
+        if self.config.prefer_current:
+            current = self.current_serving()[ue_rows]
+            has_current = (current >= 0).astype(np.int64)
+            keep = gnb_rows != current[query]
+            query, gnb_rows = query[keep], gnb_rows[keep]
+            kept_offsets = np.zeros(len(ue_rows) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(query, minlength=len(ue_rows)), out=kept_offsets[1:])
+            starts = kept_offsets[:-1] + np.cumsum(has_current) - has_current
+            merged_query = np.repeat(np.arange(len(ue_rows)), np.diff(kept_offsets) + has_current)
+            merged_gnb = np.empty(len(merged_query), dtype=np.int64)
+            merged_gnb[starts[has_current == 1]] = current[has_current == 1]
+            merged_gnb[starts[query] + has_current[query] + np.arange(len(query)) - kept_offsets[query]] = gnb_rows
+            query, gnb_rows = merged_query, merged_gnb
+
+        slice_rows = self.slice_lookup[gnb_rows, ues['sliceType'][ue_rows[query]]]
+        eligible = slice_rows >= 0
+        query, gnb_rows, slice_rows = query[eligible], gnb_rows[eligible], slice_rows[eligible]
+        offsets = np.zeros(len(ue_rows) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(query, minlength=len(ue_rows)), out=offsets[1:])
+        return offsets, gnb_rows, slice_rows
+
+    def attach(self, ue_rows: np.ndarray = None, load: np.ndarray = None) -> AttachmentResult:
+        """
+        为ue_rows中的UE (默认所有UE) 求解接入结果，等价于按优先级逐个执行lockResources中的接入流程
+        load: 可选，每个切片已接入的UE数 (例如移动后只为失去覆盖的UE重新接入时)，默认全部为0
+        返回的serving / slice_rows覆盖所有UE，不在ue_rows中的UE为-1
+        """
+        num_ues = self.table.num_ues
+        if ue_rows is None:
+            ue_rows = np.arange(num_ues)
+        ue_rows = np.asarray(ue_rows, dtype=np.int64)
+        load = np.zeros(len(self.capacity), dtype=np.int64) if load is None else np.array(load, dtype=np.int64)
+
+        # 按处理顺序重排，之后UE的下标即为优先级名次
+        ue_rows = ue_rows[priority_order(self.table.ues['priority'][ue_rows])]
+        offsets, cand_gnb, cand_slice = self.candidates(ue_rows)
+        free = self.capacity - load
+
+        num_queries = len(ue_rows)
+        cursor = offsets[:-1].copy()
+        held_ue = np.zeros(0, dtype=np.int64)
+        proposers = np.flatnonzero(cursor < offsets[1:])
+        contested = np.zeros(len(self.capacity), dtype=bool)
+        # 已满的容量单元中最差 (名次最大) 的已接受UE，未满时为UE数，没有剩余容量时为-1
+        cutoff = np.where(free > 0, num_queries, -1)
+        rounds = 0
+        while len(proposers):
+            rounds += 1
+            proposed = cand_slice[cursor[proposers]]
+            # 名次在最差已接受UE之后的申请不会被接受，不参与排序
+            hopeful = proposers < cutoff[proposed]
+            rejected = [proposers[~hopeful]]
+            proposers, proposed = proposers[hopeful], proposed[hopeful]
+
+            # 只有本轮收到申请的容量单元需要重新排序，其已暂时接受的UE一起参与
+            contested[proposed] = True
+            held_slice = cand_slice[cursor[held_ue]]
+            involved = contested[held_slice]
+            contested[proposed] = False
+
+            keys = np.sort(np.concatenate([held_slice[involved] * num_queries + held_ue[involved],
+                                           proposed * num_queries + proposers]))
+            slot, ue = np.divmod(keys, num_queries)
+            # 容量单元内的名次 (前缀计数)，名次小于剩余容量的UE被接受
+            first = np.flatnonzero(np.diff(slot, prepend=-1))
+            sizes = np.diff(np.r_[first, len(slot)])
+            position = np.arange(len(slot)) - np.repeat(first, sizes)
+            accepted = position < free[slot]
+            full = sizes >= free[slot[first]]
+            cutoff[slot[first[full]]] = ue[first[full] + free[slot[first[full]]] - 1]
+
+            held_ue = np.concatenate([held_ue[~involved], ue[accepted]])
+            rejected.append(ue[~accepted])
+            rejected = np.concatenate(rejected)
+            cursor[rejected] += 1
+            proposers = rejected[cursor[rejected] < offsets[rejected + 1]]
+
+        serving = np.full(num_ues, -1, dtype=np.int64)
+        slice_rows = np.full(num_ues, -1, dtype=np.int64)
+        serving[ue_rows[held_ue]] = cand_gnb[cursor[held_ue]]
+        slice_rows[ue_rows[held_ue]] = cand_slice[cursor[held_ue]]
+        load += np.bincount(cand_slice[cursor[held_ue]], minlength=len(self.capacity))
+        return AttachmentResult(serving, slice_rows, load, rounds)
+
+    def attach_greedy(self, ue_rows: np.ndarray = None, load: np.ndarray = None) -> AttachmentResult:
+        """逐个UE的贪心接入 (lockResources的直接移植)，用于校验attach的结果"""
+        num_ues = self.table.num_ues
+        if ue_rows is None:
+            ue_rows = np.arange(num_ues)
+        ue_rows = np.asarray(ue_rows, dtype=np.int64)
+        load = np.zeros(len(self.capacity), dtype=np.int64) if load is None else np.array(load, dtype=np.int64)
+
+        ue_rows = ue_rows[priority_order(self.table.ues['priority'][ue_rows])]
+        offsets, cand_gnb, cand_slice = self.candidates(ue_rows)
+        serving = np.full(num_ues, -1, dtype=np.int64)
+        slice_rows = np.full(num_ues, -1, dtype=np.int64)
+        capacity = self.capacity.tolist()
+        counts = load.tolist()
+        for q, ue in enumerate(ue_rows.tolist()):
+            for k in range(offsets[q], offsets[q + 1]):
+                s = cand_slice[k]
+                if counts[s] < capacity[s]:
+                    counts[s] += 1
+                    serving[ue] = cand_gnb[k]
+                    slice_rows[ue] = s
+                    break
+        return AttachmentResult(serving, slice_rows, np.asarray(counts, dtype=np.int64))
+
+
+def main():
+    from generate import NetworkTable, NRDataGenerator
+
+    parser = argparse.ArgumentParser(description='批量接入基准测试')
+    parser.add_argument('--ues', type=int, default=200000, help='UE数量')
+    parser.add_argument('--gnbs', type=int, default=1000, help='基站数量')
+    parser.add_argument('--rank-by', choices=RANK_MODES, default='distance', help='候选基站排序方式')
+    parser.add_argument('--verify', type=int, default=20000,
+                        help='与逐个贪心接入比较的UE数 (取前N个UE，0为不比较)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    area_bounds = (39.9, 40.1, 116.3, 116.5)
+    generator = NRDataGenerator(area_bounds=area_bounds, seed=args.seed)
+    gnbs = generator.generate_gnbs_array(args.gnbs)
+    table = NetworkTable.from_arrays(gnbs, generator.generate_ues_array(args.ues, gnbs))
+
+    start = time.perf_counter()
+    engine = AttachmentEngine(table, area_bounds, AttachmentConfig(rank_by=args.rank_by))
+    print(f"UE数: {args.ues}, 基站数: {args.gnbs}, 切片数: {len(engine.capacity)}, "
+          f"总容量: {int(engine.capacity.sum())}")
+    print(f"构造引擎: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    engine.candidates()
+    print(f"候选生成: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    result = engine.attach()
+    elapsed = time.perf_counter() - start
+    print(f"批量接入: {elapsed:.2f} s ({args.ues / elapsed:,.0f} UE/s)，{result.rounds}轮，"
+          f"接入 {result.num_attached} 个UE ({result.num_attached / args.ues:.1%})")
+
+    if args.verify:
+        subset = np.arange(min(args.verify, args.ues))
+        start = time.perf_counter()
+        batched = engine.attach(subset)
+        batched_time = time.perf_counter() - start
+        start = time.perf_counter()
+        greedy = engine.attach_greedy(subset)
+        greedy_time = time.perf_counter() - start
+        same = np.array_equal(batched.serving, greedy.serving) and np.array_equal(batched.load, greedy.load)
+        print(f"校验前{len(subset)}个UE: 批量 {batched_time:.2f} s，逐个贪心 {greedy_time:.2f} s，"
+              f"结果{'一致' if same else '不一致'}")
+
+
+if __name__ == '__main__':
+    main()
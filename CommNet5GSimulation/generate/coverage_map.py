@@ -0,0 +1,273 @@
+"""
+UE-基站距离 / 覆盖关系的增量维护
+MATLAB侧tools.createUeGnbDistanceMap对每个UE×基站调用一次Haversine，
+NetSimuEnv.updateDistanceMapping在每次移动后重算该UE的整行。这里按整数下标 (UE行号, 基站行号)
+保存覆盖范围内的距离 (稀疏，每个UE一行)，每步只重算必要的部分:
+- 距离: 只有移动后跨过网格单元 (或位于网格之外) 的UE重算其已有条目的Haversine距离，
+  其余UE的距离保持上次重算时的值，误差不超过单元对角线长度 (cell_size × √2)
+- 覆盖关系: 每个UE记录上次空间查询时的位置 (锚点) 和到最近覆盖边界的余量，
+  只有离开锚点的距离达到余量的UE才重新查询空间索引；
+  由三角不等式，余量之内所有基站的覆盖判断都不会改变，因此覆盖关系始终与逐对计算一致
+
+update返回本步变化的条目 (DistanceDelta)，距离为inf表示移出该基站覆盖范围
+
+用法 (基准测试):
+    python coverage_map.py --ues 200000 --gnbs 1000 --steps 10
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from geo import EARTH_RADIUS, haversine
+from spatial_index import GeoIndex
+
+# 网格单元边长 (米)
+DEFAULT_CELL_SIZE = 20.0
+
+# 到覆盖边界余量的上限 (米)，空间查询的半径为最大覆盖半径加上该值
+MAX_SLACK = 200.0
+
+# 锚点距离使用局部等距圆柱近似，判断时放大的相对误差与绝对余量 (米)
+DRIFT_FACTOR = 1.01
+DRIFT_MARGIN = 1.0
+
+METERS_PER_DEGREE = np.pi / 180 * EARTH_RADIUS
+
+
+@dataclass
+class DistanceDelta:
+    """一步中变化的距离条目: ue / gnb为行号，distance为inf表示移出覆盖范围"""
+    ue: np.ndarray
+    gnb: np.ndarray
+    distance: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ue)
+
+
+class CoverageMap:
+    """
+    UE×基站的覆盖距离表 (只保存覆盖范围内的条目)
+    gnb_slots / distance_slots为 (UE数, K) 的定长数组，第i个UE的覆盖基站为gnb_slots[i]中不为-1的项，按距离升序
+    """
+
+    def __init__(self, gnb_lat, gnb_lon, gnb_radius, area_bounds: Sequence[float],
+                 cell_size: float = DEFAULT_CELL_SIZE, max_slack: float = MAX_SLACK):
+        self.index = GeoIndex(gnb_lat, gnb_lon, gnb_radius)
+        self.cell_size = float(cell_size)
+        self.max_slack = float(max_slack)
+        lat_min, lat_max, lon_min, lon_max = area_bounds
+        self.origin = (float(lat_min), float(lon_min))
+        self.cell_lat = self.cell_size / METERS_PER_DEGREE
+        self.cell_lon = self.cell_lat / np.cos(np.radians((lat_min + lat_max) / 2))
+        self.shape = (int(np.ceil((lat_max - lat_min) / self.cell_lat)) + 1,
+                      int(np.ceil((lon_max - lon_min) / self.cell_lon)) + 1)
+        self.lat = np.zeros(0)
+        self.lon = np.zeros(0)
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.anchor_lat = np.zeros(0)
+        self.anchor_lon = np.zeros(0)
+        self.slack = np.zeros(0)
+        self.gnb_slots = np.zeros((0, 1), dtype=np.int32)
+        self.distance_slots = np.zeros((0, 1))
+        # 最近一次update中重新查询覆盖关系 / 只重算距离的UE数
+        self.requeried = 0
+        self.refreshed = 0
+
+    @classmethod
+    def from_table(cls, table, area_bounds: Sequence[float], cell_size: float = DEFAULT_CELL_SIZE) -> 'CoverageMap':
+        gnbs = table.gnbs
+        return cls(gnbs['latitude'], gnbs['longitude'], gnbs['radius'], area_bounds, cell_size)
+
+    @property
+    def num_ues(self) -> int:
+        return len(self.cells)
+
+    @property
+    def num_gnbs(self) -> int:
+        return len(self.index)
+
+    def cell_of(self, lat, lon) -> np.ndarray:
+        """经纬度 -> 网格单元编号，区域之外为-1"""
+        row = np.floor((np.asarray(lat) - self.origin[0]) / self.cell_lat).astype(np.int64)
+        col = np.floor((np.asarray(lon) - self.origin[1]) / self.cell_lon).astype(np.int64)
+        inside = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        return np.where(inside, row * self.shape[1] + col, -1)
+
+    def _query(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        重新查询rows中UE的覆盖基站，更新锚点和余量
+        返回覆盖条目的CSR形式 (offsets, 基站行号, 距离)，每个UE内按距离升序
+        """
+        lat, lon = self.lat[rows], self.lon[rows]
+        radius = self.index.radius
+        offsets, gnbs, distances = self.index.query_radius(lat, lon, float(radius.max()) + self.max_slack)
+        owner = np.repeat(np.arange(len(rows)), np.diff(offsets))
+        # 余量: 到查询范围内各基站覆盖边界的最小距离 (范围外的基站边界至少在max_slack之外)
+        slack = np.full(len(rows), self.max_slack)
+        np.minimum.at(slack, owner, np.abs(distances - radius[gnbs]))
+        self.slack[rows] = slack
+        self.anchor_lat[rows] = lat
+        self.anchor_lon[rows] = lon
+        covered = distances <= radius[gnbs]
+        counts = np.bincount(owner[covered], minlength=len(rows))
+        covered_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=covered_offsets[1:])
+        return covered_offsets, gnbs[covered], distances[covered]
+
+    def _drift(self) -> np.ndarray:
+        """各UE离开锚点的距离 (米，局部等距圆柱近似)"""
+        north = (self.lat - self.anchor_lat) * METERS_PER_DEGREE
+        east = (self.lon - self.anchor_lon) * METERS_PER_DEGREE * np.cos(np.radians(self.lat))
+        return np.hypot(north, east)
+
+    def _entries(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """rows中UE当前保存的条目 -> (UE行号, 基站行号, 距离)"""
+        slots = self.gnb_slots[rows]
+        valid = slots >= 0
+        return np.repeat(rows, valid.sum(axis=1)), slots[valid].astype(np.int64), self.distance_slots[rows][valid]
+
+    def _store(self, rows: np.ndarray, offsets: np.ndarray, gnbs: np.ndarray, distances: np.ndarray):
+        """把covering查询的结果 (CSR) 写入rows对应的定长行，容量不足时加宽"""
+        counts = np.diff(offsets)
+        width = int(counts.max()) if len(counts) else 0
+        if width > self.gnb_slots.shape[1]:
+            extra = width - self.gnb_slots.shape[1]
+            self.gnb_slots = np.pad(self.gnb_slots, ((0, 0), (0, extra)), constant_values=-1)
+            self.distance_slots = np.pad(self.distance_slots, ((0, 0), (0, extra)), constant_values=np.inf)
+        self.gnb_slots[rows] = -1
+        self.distance_slots[rows] = np.inf
+        owner = np.repeat(rows, counts)
+        position = np.arange(len(gnbs)) - np.repeat(offsets[:-1], counts)
+        self.gnb_slots[owner, position] = gnbs
+        self.distance_slots[owner, position] = distances
+
+    def reset(self, lat, lon) -> DistanceDelta:
+        """按所有UE的位置完整建表，返回全部覆盖条目 (初始导出)"""
+        self.lat = np.array(lat, dtype=np.float64)
+        self.lon = np.array(lon, dtype=np.float64)
+        n = len(self.lat)
+        self.cells = self.cell_of(self.lat, self.lon)
+        self.anchor_lat = self.lat.copy()
+        self.anchor_lon = self.lon.copy()
+        self.slack = np.zeros(n)
+        self.gnb_slots = np.full((n, 1), -1, dtype=np.int32)
+        self.distance_slots = np.full((n, 1), np.inf)
+        rows = np.arange(n)
+        offsets, gnbs, distances = self._query(rows)
+        self._store(rows, offsets, gnbs, distances)
+        return DistanceDelta(np.repeat(rows, np.diff(offsets)), gnbs, distances)
+
+    def update(self, lat, lon) -> DistanceDelta:
+        """
+        UE移动后更新距离表，返回变化的条目 (新增或距离变化的条目为新距离，不再覆盖的条目为inf)
+        离开锚点达到余量的UE重新查询覆盖关系；其余跨过网格单元的UE只重算已有条目的距离
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if len(lat) != self.num_ues:
+            raise ValueError(f"UE数量与建表时不一致 ({len(lat)} != {self.num_ues})，请调用reset")
+        self.lat[:] = lat
+        self.lon[:] = lon
+        cells = self.cell_of(lat, lon)
+        crossed = (cells != self.cells) | (cells < 0)
+        self.cells = cells
+        requery = self._drift() * DRIFT_FACTOR + DRIFT_MARGIN >= self.slack
+        query_rows = np.flatnonzero(requery)
+        refresh_rows = np.flatnonzero(crossed & ~requery)
+        self.requeried, self.refreshed = len(query_rows), len(refresh_rows)
+
+        # 只重算距离: 覆盖关系不变，条目的位置也不变
+        ue, slot = np.nonzero(self.gnb_slots[refresh_rows] >= 0)
+        ue = refresh_rows[ue]
+        gnb = self.gnb_slots[ue, slot].astype(np.int64)
+        distance = haversine(lat[ue], lon[ue], self.index.lat[gnb], self.index.lon[gnb])
+        self.distance_slots[ue, slot] = distance
+        # 行内按距离升序: 重算后顺序可能改变，重新排序这些行
+        self._sort_rows(refresh_rows)
+        deltas = [(ue, gnb, distance)]
+
+        if len(query_rows):
+            old_ue, old_gnb, old_distance = self._entries(query_rows)
+            offsets, gnbs, distances = self._query(query_rows)
+            new_ue = np.repeat(query_rows, np.diff(offsets))
+            self._store(query_rows, offsets, gnbs, distances)
+
+            # 以 UE行号 × 基站数 + 基站行号 作为条目键比较新旧两组条目
+            old_key = old_ue * self.num_gnbs + old_gnb
+            new_key = new_ue * self.num_gnbs + gnbs
+            if len(old_key):
+                order = np.argsort(old_key)
+                old_key, old_distance = old_key[order], old_distance[order]
+                pos = np.minimum(np.searchsorted(old_key, new_key), len(old_key) - 1)
+                changed = (old_key[pos] != new_key) | (old_distance[pos] != distances)
+            else:
+                changed = np.ones(len(new_key), dtype=bool)
+            removed = ~np.isin(old_key, new_key, assume_unique=True)
+            deltas.append((new_ue[changed], gnbs[changed], distances[changed]))
+            deltas.append((old_key[removed] // self.num_gnbs, old_key[removed] % self.num_gnbs,
+                           np.full(int(removed.sum()), np.inf)))
+        return DistanceDelta(*(np.concatenate(parts) for parts in zip(*deltas)))
+
+    def _sort_rows(self, rows: np.ndarray):
+        """rows中各UE的条目按距离升序重排 (空位的距离为inf，排在最后)"""
+        if not len(rows) or self.gnb_slots.shape[1] == 1:
+            return
+        order = np.argsort(self.distance_slots[rows], axis=1, kind='stable')
+        self.distance_slots[rows] = np.take_along_axis(self.distance_slots[rows], order, axis=1)
+        self.gnb_slots[rows] = np.take_along_axis(self.gnb_slots[rows], order, axis=1)
+
+    def covering(self, ue: int) -> Tuple[np.ndarray, np.ndarray]:
+        """第ue个UE的覆盖基站 (行号) 及距离，按距离升序 (对应tools.getCoveredGnbsForUe)"""
+        slots = self.gnb_slots[ue]
+        valid = slots >= 0
+        return slots[valid].astype(np.int64), self.distance_slots[ue][valid]
+
+    def matrix(self) -> sparse.csr_matrix:
+        """当前距离表 -> UE数 × 基站数的稀疏矩阵 (只含覆盖范围内的条目)"""
+        ue, gnb, distance = self._entries(np.arange(self.num_ues))
+        return sparse.csr_matrix((distance, (ue, gnb)), shape=(self.num_ues, self.num_gnbs))
+
+
+def main():
+    from mobility import MobilityConfig, MobilityEngine
+
+    parser = argparse.ArgumentParser(description='增量距离表基准测试')
+    parser.add_argument('--ues', type=int, default=200000, help='UE数量')
+    parser.add_argument('--gnbs', type=int, default=1000, help='基站数量')
+    parser.add_argument('--steps', type=int, default=10, help='时间步数')
+    parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE, help='网格单元边长 (米)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    area_bounds = (39.9, 40.1, 116.3, 116.5)
+    rng = np.random.default_rng(args.seed)
+    lat_min, lat_max, lon_min, lon_max = area_bounds
+    gnb_lat = rng.uniform(lat_min, lat_max, args.gnbs)
+    gnb_lon = rng.uniform(lon_min, lon_max, args.gnbs)
+    gnb_radius = rng.uniform(300, 1000, args.gnbs)
+    engine = MobilityEngine(rng.uniform(lat_min, lat_max, args.ues), rng.uniform(lon_min, lon_max, args.ues),
+                            rng.uniform(0, 120 / 3.6, args.ues), rng.uniform(0, 360, args.ues), area_bounds,
+                            MobilityConfig(seed=args.seed))
+    coverage = CoverageMap(gnb_lat, gnb_lon, gnb_radius, area_bounds, args.cell_size)
+
+    start = time.perf_counter()
+    initial = coverage.reset(engine.lat, engine.lon)
+    print(f"UE数: {args.ues}, 基站数: {args.gnbs}, 单元边长: {args.cell_size} m")
+    print(f"完整建表: {time.perf_counter() - start:.2f} s, 覆盖条目 {len(initial)}")
+    for step in range(1, args.steps + 1):
+        engine.step()
+        start = time.perf_counter()
+        delta = coverage.update(engine.lat, engine.lon)
+        elapsed = time.perf_counter() - start
+        print(f"第{step}步: 重新查询 {coverage.requeried} 个UE ({coverage.requeried / args.ues:.1%})，"
+              f"只重算距离 {coverage.refreshed} 个，变化条目 {len(delta)} "
+              f"(移出覆盖 {np.count_nonzero(np.isinf(delta.distance))})，{elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
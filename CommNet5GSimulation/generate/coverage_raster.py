@@ -0,0 +1,370 @@
+"""
+覆盖栅格渲染: 在经纬度网格上计算最佳服务基站的RSRP / SINR，输出PNG瓦片或单张叠加图
+计算语义与sinr_engine一致 (38.901 UMa路损、同干扰组基站为干扰源、calculateUESINR的噪声)，
+每个像素视为一个位于该点的UE，选择RSRP最大的基站为服务基站。
+
+- 瓦片: Web墨卡托 <目录>/<z>/<x>/<y>.png (256×256)，可作为folium.TileLayer按缩放级别加载
+- 叠加图: 覆盖area的单张PNG，行按墨卡托坐标等间距，可用folium.raster_layers.ImageOverlay显示
+
+结果按场景哈希 (基站参数、区域、路损配置、指标、色标范围) 缓存在 <缓存目录>/<哈希>/ 下，
+场景不变时重复绘图直接使用已有的图片。PNG由标准库zlib编码，不依赖图像库。
+
+用法:
+    python coverage_raster.py -f ../5g_nr_simulation_data.yaml --metric sinr --zooms 14 15 16
+    python coverage_raster.py -f ../5g_nr_simulation_data.yaml --metric rsrp --overlay --width 1024
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from dataclasses import asdict
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from geo import haversine
+from sinr_engine import (SINRConfig, free_space_path_loss, interference_group_ids, relative_positions,
+                         thermal_noise, transmit_gain, uma_path_loss)
+
+TILE_SIZE = 256
+METRICS = ('rsrp', 'sinr')
+
+# 色标范围 (dBm / dB)
+DEFAULT_RANGES = {'rsrp': (-120.0, -60.0), 'sinr': (-5.0, 25.0)}
+
+# RSRP低于该值的像素视为无覆盖，透明显示
+DEFAULT_COVERAGE_FLOOR = -125.0
+
+# 像素处假想UE的噪声系数 (dB)，取生成器UE噪声系数 (5-9 dB) 的中值
+DEFAULT_UE_NOISE_FIGURE = 7.0
+
+DEFAULT_CACHE_DIR = 'raster_cache'
+
+# 像素 × 基站 矩阵单个分块的元素数上限
+DEFAULT_BLOCK_ELEMENTS = 4 * 1024 * 1024
+
+# 色标 (由低到高)，线性插值
+COLOR_STOPS = np.array([
+    [48, 18, 59], [70, 107, 227], [41, 187, 236], [49, 242, 153],
+    [163, 253, 61], [237, 208, 58], [251, 128, 34], [208, 47, 5],
+], dtype=np.float64)
+DEFAULT_ALPHA = 170
+
+_GNB_KEYS = {
+    'transmitPower': 'transmit_power',
+    'carrierFrequency': 'carrier_frequency',
+    'channelBandwidth': 'channel_bandwidth',
+    'subcarrierSpacing': 'subcarrier_spacing',
+    'numResourceBlocks': 'num_resource_blocks',
+}
+
+
+def gnb_columns_from_config(config: Dict) -> Dict[str, np.ndarray]:
+    """draw.py使用的YAML配置 (gNBs列表，下划线命名) -> 基站列"""
+    gnbs = config.get('gNBs', [])
+    columns = {
+        'latitude': np.array([g['position']['latitude'] for g in gnbs], dtype=np.float64),
+        'longitude': np.array([g['position']['longitude'] for g in gnbs], dtype=np.float64),
+    }
+    for column, key in _GNB_KEYS.items():
+        columns[column] = np.array([g[key] for g in gnbs], dtype=np.float64)
+    return columns
+
+
+def gnb_columns_from_table(table) -> Dict[str, np.ndarray]:
+    """NetworkTable -> 基站列"""
+    return {column: np.asarray(table.gnbs[column], dtype=np.float64)
+            for column in ['latitude', 'longitude'] + list(_GNB_KEYS)}
+
+
+def area_from_config(config: Dict, gnbs: Dict[str, np.ndarray] = None) -> Tuple[float, float, float, float]:
+    """
+    YAML中的area (左上角 / 右下角) -> (lat_min, lat_max, lon_min, lon_max)
+    没有area时使用基站位置的范围
+    """
+    area = config.get('area')
+    if area:
+        lats = (area['latitudeTopLeft'], area['latitudeBottomRight'])
+        lons = (area['longitudeTopLeft'], area['longitudeBottomRight'])
+        return min(lats), max(lats), min(lons), max(lons)
+    if gnbs is None:
+        gnbs = gnb_columns_from_config(config)
+    return (float(gnbs['latitude'].min()), float(gnbs['latitude'].max()),
+            float(gnbs['longitude'].min()), float(gnbs['longitude'].max()))
+
+
+# ---------------------------------------------------------------- Web墨卡托
+
+def lat_to_mercator(lat) -> np.ndarray:
+    """纬度 -> 墨卡托y (归一化到[0, 1]，0为北端)"""
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878))
+    return (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+
+
+def mercator_to_lat(y) -> np.ndarray:
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=np.float64)))))
+
+
+def lon_to_mercator(lon) -> np.ndarray:
+    return (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+
+
+def mercator_to_lon(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64) * 360.0 - 180.0
+
+
+def tile_range(area_bounds: Sequence[float], zoom: int) -> Tuple[int, int, int, int]:
+    """覆盖area的瓦片编号范围 (x_min, x_max, y_min, y_max)，闭区间"""
+    lat_min, lat_max, lon_min, lon_max = area_bounds
+    n = 2 ** zoom
+    x = np.floor(lon_to_mercator([lon_min, lon_max]) * n).astype(int)
+    y = np.floor(lat_to_mercator([lat_max, lat_min]) * n).astype(int)
+    return int(x[0]), int(min(x[1], n - 1)), int(y[0]), int(min(y[1], n - 1))
+
+
+def tile_pixel_centers(x: int, y: int, zoom: int, size: int = TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """瓦片各行像素中心的纬度、各列像素中心的经度"""
+    n = 2 ** zoom
+    centers = (np.arange(size) + 0.5) / size
+    return mercator_to_lat((y + centers) / n), mercator_to_lon((x + centers) / n)
+
+
+# ---------------------------------------------------------------- 图像
+
+def colorize(values: np.ndarray, value_range: Tuple[float, float], mask: np.ndarray = None,
+             alpha: int = DEFAULT_ALPHA) -> np.ndarray:
+    """数值 -> RGBA (uint8)，mask为False或数值为NaN的像素透明"""
+    low, high = value_range
+    t = np.clip((values - low) / (high - low), 0.0, 1.0) * (len(COLOR_STOPS) - 1)
+    t = np.nan_to_num(t)
+    index = np.minimum(t.astype(np.int64), len(COLOR_STOPS) - 2)
+    fraction = (t - index)[..., None]
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = np.round(COLOR_STOPS[index] * (1 - fraction) + COLOR_STOPS[index + 1] * fraction)
+    visible = ~np.isnan(values)
+    if mask is not None:
+        visible &= mask
+    rgba[..., 3] = np.where(visible, alpha, 0)
+    return rgba
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """RGBA数组 (高 × 宽 × 4, uint8) -> PNG字节"""
+    height, width = rgba.shape[:2]
+    # 每行前加过滤类型0
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, -1)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+def write_png(path: str, rgba: np.ndarray):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(encode_png(rgba))
+    os.replace(tmp_path, path)
+
+
+# ---------------------------------------------------------------- 计算
+
+class CoverageRaster:
+    """
+    最佳服务基站的RSRP / SINR栅格计算
+    基站侧的发射增益、干扰组、米制坐标在构造时计算，evaluate按像素分块做 像素 × 基站 的矩阵运算
+    """
+
+    def __init__(self, gnbs: Dict[str, np.ndarray], area_bounds: Sequence[float], config: SINRConfig = None,
+                 noise_figure: float = DEFAULT_UE_NOISE_FIGURE, block_elements: int = DEFAULT_BLOCK_ELEMENTS):
+        if config is None:
+            config = SINRConfig()
+        self.gnbs = {key: np.asarray(value, dtype=np.float64) for key, value in gnbs.items()}
+        self.area_bounds = tuple(float(v) for v in area_bounds)
+        self.config = config
+        self.noise_figure = noise_figure
+        self.block_elements = block_elements
+
+        self.gnb_x, self.gnb_y = relative_positions(self.gnbs['latitude'], self.gnbs['longitude'], self.area_bounds)
+        self.tx_gain = transmit_gain(self.gnbs['transmitPower'], self.gnbs['numResourceBlocks'])
+        # RSRP = P_tx - 10*log10(12*NRB) - 路损 (每个资源粒子上的功率)
+        self.rsrp_offset = self.gnbs['transmitPower'] - 10 * np.log10(12 * self.gnbs['numResourceBlocks'])
+        self.group_ids = interference_group_ids(self.gnbs['carrierFrequency'], self.gnbs['channelBandwidth'],
+                                                self.gnbs['subcarrierSpacing'])
+
+    @property
+    def num_gnbs(self) -> int:
+        return len(self.gnb_x)
+
+    def scenario_hash(self, *extra) -> str:
+        """基站参数、区域和计算配置的摘要，用作缓存键"""
+        digest = hashlib.sha1()
+        for key in sorted(self.gnbs):
+            digest.update(key.encode())
+            digest.update(np.ascontiguousarray(self.gnbs[key]).tobytes())
+        digest.update(json.dumps([self.area_bounds, asdict(self.config), self.noise_figure, list(extra)],
+                                 sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:16]
+
+    def _path_loss(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """像素 × 基站 的路损矩阵 (dB)"""
+        fc = self.gnbs['carrierFrequency'][None, :]
+        if self.config.path_loss_model.upper() == 'FSPL':
+            distance = haversine(lat[:, None], lon[:, None], self.gnbs['latitude'][None, :],
+                                 self.gnbs['longitude'][None, :])
+            return free_space_path_loss(distance, fc)
+        x, y = relative_positions(lat, lon, self.area_bounds)
+        dx = x[:, None] - self.gnb_x[None, :]
+        dy = y[:, None] - self.gnb_y[None, :]
+        d2d_sq = dx * dx + dy * dy
+        d2d = np.sqrt(d2d_sq)
+        d3d = np.sqrt(d2d_sq + (self.config.gnb_height - self.config.ue_height) ** 2)
+        return uma_path_loss(d2d, d3d, fc, self.config.gnb_height, self.config.ue_height, self.config.los,
+                             self.config.environment_height)
+
+    def evaluate(self, lat, lon) -> Dict[str, np.ndarray]:
+        """
+        计算各点的最佳服务基站、RSRP (dBm) 和SINR (dB)
+        lat / lon为同形状的数组，返回的各数组与其形状相同
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        shape = lat.shape
+        lat, lon = lat.ravel(), lon.ravel()
+        best = np.full(len(lat), -1, dtype=np.int64)
+        rsrp = np.full(len(lat), np.nan)
+        sinr = np.full(len(lat), np.nan)
+        if self.num_gnbs == 0:
+            return {'best': best.reshape(shape), 'rsrp': rsrp.reshape(shape), 'sinr': sinr.reshape(shape)}
+
+        block = max(1, self.block_elements // self.num_gnbs)
+        for start in range(0, len(lat), block):
+            end = min(start + block, len(lat))
+            path_loss = self._path_loss(lat[start:end], lon[start:end])
+            rows = np.arange(end - start)
+            rsrp_all = self.rsrp_offset[None, :] - path_loss
+            serving = np.argmax(rsrp_all, axis=1)
+            power = self.tx_gain[None, :] / 10.0 ** (path_loss / 10)
+            signal = power[rows, serving]
+            # 与服务基站同一干扰组的其他基站为干扰源
+            same_group = self.group_ids[None, :] == self.group_ids[serving][:, None]
+            interference = np.where(same_group, power, 0.0).sum(axis=1) - signal
+            noise = thermal_noise(self.gnbs['numResourceBlocks'][serving], self.gnbs['subcarrierSpacing'][serving],
+                                  self.noise_figure, self.config.rx_ant_temperature)
+            best[start:end] = serving
+            rsrp[start:end] = rsrp_all[rows, serving]
+            sinr[start:end] = 10 * np.log10(signal / (noise + np.maximum(interference, 0.0)))
+        return {'best': best.reshape(shape), 'rsrp': rsrp.reshape(shape), 'sinr': sinr.reshape(shape)}
+
+    def render(self, lat, lon, metric: str, value_range: Tuple[float, float] = None,
+               coverage_floor: float = DEFAULT_COVERAGE_FLOOR) -> np.ndarray:
+        """lat (行) × lon (列) 网格 -> RGBA图像，RSRP低于coverage_floor的像素透明"""
+        if metric not in METRICS:
+            raise ValueError(f"不支持的指标: {metric}，可选: {list(METRICS)}")
+        grid_lat, grid_lon = np.meshgrid(lat, lon, indexing='ij')
+        result = self.evaluate(grid_lat, grid_lon)
+        return colorize(result[metric], value_range or DEFAULT_RANGES[metric], result['rsrp'] >= coverage_floor)
+
+
+# ---------------------------------------------------------------- 输出与缓存
+
+def render_tiles(raster: CoverageRaster, metric: str, zooms: Sequence[int], out_dir: str,
+                 value_range: Tuple[float, float] = None, coverage_floor: float = DEFAULT_COVERAGE_FLOOR) -> int:
+    """
+    把覆盖area的瓦片写入 out_dir/<z>/<x>/<y>.png，返回写入的瓦片数
+    每个缩放级别完成后写入标记文件 <z>.done，已完成的级别直接跳过 (中断后可继续)
+    全透明的瓦片不写文件
+    """
+    written = 0
+    for zoom in zooms:
+        done_file = os.path.join(out_dir, f"{zoom}.done")
+        if os.path.exists(done_file):
+            continue
+        x_min, x_max, y_min, y_max = tile_range(raster.area_bounds, zoom)
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                lat, lon = tile_pixel_centers(x, y, zoom)
+                rgba = raster.render(lat, lon, metric, value_range, coverage_floor)
+                if rgba[..., 3].any():
+                    write_png(os.path.join(out_dir, str(zoom), str(x), f"{y}.png"), rgba)
+                    written += 1
+        os.makedirs(out_dir, exist_ok=True)
+        open(done_file, 'w').close()
+    return written
+
+
+def render_overlay(raster: CoverageRaster, metric: str, out_file: str, width: int = 1024,
+                   value_range: Tuple[float, float] = None, coverage_floor: float = DEFAULT_COVERAGE_FLOOR):
+    """
+    覆盖area的单张叠加图，行按墨卡托坐标等间距 (与地图投影一致，叠加时不变形)
+    返回ImageOverlay使用的边界 [[lat_min, lon_min], [lat_max, lon_max]]
+    """
+    lat_min, lat_max, lon_min, lon_max = raster.area_bounds
+    y_top, y_bottom = lat_to_mercator([lat_max, lat_min])
+    x_left, x_right = lon_to_mercator([lon_min, lon_max])
+    height = max(1, int(round(width * (y_bottom - y_top) / (x_right - x_left))))
+    lat = mercator_to_lat(y_top + (np.arange(height) + 0.5) / height * (y_bottom - y_top))
+    lon = mercator_to_lon(x_left + (np.arange(width) + 0.5) / width * (x_right - x_left))
+    write_png(out_file, raster.render(lat, lon, metric, value_range, coverage_floor))
+    return [[lat_min, lon_min], [lat_max, lon_max]]
+
+
+def cached_tiles(raster: CoverageRaster, metric: str, zooms: Sequence[int], cache_dir: str = DEFAULT_CACHE_DIR,
+                 value_range: Tuple[float, float] = None, coverage_floor: float = DEFAULT_COVERAGE_FLOOR) -> str:
+    """按场景哈希缓存的瓦片目录 (缺少的缩放级别会先渲染)，瓦片地址为 <目录>/{z}/{x}/{y}.png"""
+    value_range = value_range or DEFAULT_RANGES[metric]
+    tile_dir = os.path.join(cache_dir, f"{metric}_{raster.scenario_hash(metric, value_range, coverage_floor)}")
+    render_tiles(raster, metric, zooms, tile_dir, value_range, coverage_floor)
+    return tile_dir
+
+
+def cached_overlay(raster: CoverageRaster, metric: str, width: int = 1024, cache_dir: str = DEFAULT_CACHE_DIR,
+                   value_range: Tuple[float, float] = None, coverage_floor: float = DEFAULT_COVERAGE_FLOOR):
+    """按场景哈希缓存的叠加图，返回 (PNG路径, 边界)"""
+    value_range = value_range or DEFAULT_RANGES[metric]
+    key = raster.scenario_hash(metric, value_range, coverage_floor, width)
+    out_file = os.path.join(cache_dir, f"{metric}_{key}.png")
+    lat_min, lat_max, lon_min, lon_max = raster.area_bounds
+    bounds = [[lat_min, lon_min], [lat_max, lon_max]]
+    if not os.path.exists(out_file):
+        bounds = render_overlay(raster, metric, out_file, width, value_range, coverage_floor)
+    return out_file, bounds
+
+
+def main():
+    from draw import load_yaml_config
+
+    parser = argparse.ArgumentParser(description='覆盖 / SINR栅格渲染')
+    parser.add_argument('-f', '--file', default='5g_nr_simulation_data.yaml', help='YAML配置文件 (draw.py格式)')
+    parser.add_argument('--metric', choices=METRICS, default='sinr')
+    parser.add_argument('--zooms', type=int, nargs='+', default=[14, 15, 16], help='瓦片缩放级别')
+    parser.add_argument('--overlay', action='store_true', help='输出单张叠加图而不是瓦片')
+    parser.add_argument('--width', type=int, default=1024, help='叠加图宽度 (像素)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='缓存目录')
+    parser.add_argument('--noise-figure', type=float, default=DEFAULT_UE_NOISE_FIGURE, help='UE噪声系数 (dB)')
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.file)
+    if config is None:
+        return
+    gnbs = gnb_columns_from_config(config)
+    raster = CoverageRaster(gnbs, area_from_config(config, gnbs), noise_figure=args.noise_figure)
+
+    start = time.perf_counter()
+    if args.overlay:
+        out_file, bounds = cached_overlay(raster, args.metric, args.width, args.cache_dir)
+        print(f"叠加图: '{out_file}'，边界: {bounds}")
+    else:
+        tile_dir = cached_tiles(raster, args.metric, args.zooms, args.cache_dir)
+        print(f"瓦片目录: '{tile_dir}'，缩放级别: {args.zooms}")
+    print(f"用时 {time.perf_counter() - start:.2f}s ({raster.num_gnbs}个基站)")
+
+
+if __name__ == '__main__':
+    main()
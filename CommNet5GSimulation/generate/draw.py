@@ -1,15 +1,31 @@
 import yaml
 import folium
 import numpy as np
-from geopy.distance import geodesic
 import argparse
+import csv
+import glob
+import json
 import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from yaml_io import load_yaml
+from spatial_index import GeoIndex
+from map_layers import add_sidecar_layers
+from coverage_raster import (DEFAULT_CACHE_DIR, CoverageRaster, area_from_config, cached_overlay, cached_tiles,
+                             gnb_columns_from_config)
+from mobility import MOBILITY_MODELS
+from trajectory import (TrackPlayback, config_tracks, encode_tracks, timestamped_features, track_sidecar_path,
+                        write_track_sidecar)
+
+# UE数超过该值时默认使用大规模渲染模式 (图层数据写入HTML旁边的数据文件)
+SCALABLE_UE_THRESHOLD = 2000
 
 def load_yaml_config(file_path):
     """读取YAML配置文件"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = yaml.safe_load(file)
+        data = load_yaml(file_path)
         return data
     except FileNotFoundError:
         print(f"错误: 找不到文件 {file_path}")
@@ -188,8 +204,57 @@ def get_slice_color(slice_type):
     }
     return colors.get(slice_type, 'gray')
 
-def create_5g_network_map(config_data):
-    """从配置数据创建5G网络地图"""
+def build_gnb_index(gnbs):
+    """根据配置中的基站列表建立空间索引 (带覆盖半径)"""
+    return GeoIndex([g['position']['latitude'] for g in gnbs],
+                    [g['position']['longitude'] for g in gnbs],
+                    [g['radius'] for g in gnbs])
+
+def ue_coverage(gnbs, ues):
+    """
+    查询每个UE的覆盖基站和最近基站
+    返回 (offsets, indices, distances, nearest_idx, nearest_dist)，
+    第i个UE的覆盖基站为 indices[offsets[i]:offsets[i+1]] (按距离升序)
+    """
+    index = build_gnb_index(gnbs)
+    ue_lats = [u['position']['latitude'] for u in ues]
+    ue_lons = [u['position']['longitude'] for u in ues]
+    offsets, indices, distances = index.covering(ue_lats, ue_lons)
+    nearest_dist, nearest_idx = index.nearest(ue_lats, ue_lons, k=1)
+    return offsets, indices, distances, nearest_idx[:, 0], nearest_dist[:, 0]
+
+def overlapping_gnb_pairs(gnbs):
+    """查询覆盖范围相交的基站对 (距离 <= 两者半径之和)，返回 (i, j, 距离)"""
+    index = build_gnb_index(gnbs)
+    i, j, dist = index.pairs_within(2 * float(index.radius.max()))
+    keep = dist <= index.radius[i] + index.radius[j]
+    return i[keep], j[keep], dist[keep]
+
+def legend_html(num_gnbs, num_ues):
+    """地图图例"""
+    return f'''
+    <div style="position: fixed; 
+                bottom: 50px; left: 50px; width: 250px; height: 200px; 
+                background-color: white; border:2px solid grey; z-index:9999; 
+                font-size:12px; padding: 10px">
+    <p><b>5G网络图例</b></p>
+    <p><i class="fa fa-broadcast-tower" style="color:red"></i> 基站 (gNB)</p>
+    <p><i class="fa fa-mobile" style="color:blue"></i> eMBB用户</p>
+    <p><i class="fa fa-mobile" style="color:red"></i> URLLC用户</p>
+    <p><i class="fa fa-mobile" style="color:green"></i> mMTC用户</p>
+    <p>🔴 覆盖范围</p>
+    <p>→ 移动方向</p>
+    <p><small>基站数: {num_gnbs}, 用户数: {num_ues}</small></p>
+    </div>
+    '''
+
+def create_5g_network_map(config_data, scalable=None, output=None):
+    """
+    从配置数据创建5G网络地图
+    scalable为True (或为None且UE数超过SCALABLE_UE_THRESHOLD) 时使用大规模渲染模式:
+    图层数据和弹窗内容写入output旁边的数据文件 (见map_layers.py)，HTML大小与UE数量无关，
+    此模式需要给出output (HTML保存路径)
+    """
     gnbs = config_data.get('gNBs', [])
     ues = config_data.get('UEs', [])
     
@@ -198,23 +263,10 @@ def create_5g_network_map(config_data):
         return None
     
     # 计算地图中心点
-    all_lats = []
-    all_lons = []
-    
-    for gnb in gnbs:
-        all_lats.append(gnb['position']['latitude'])
-        all_lons.append(gnb['position']['longitude'])
-    
-    for ue in ues:
-        all_lats.append(ue['position']['latitude'])
-        all_lons.append(ue['position']['longitude'])
-    
-    if not all_lats:
-        print("错误: 无法获取坐标信息")
-        return None
-    
-    center_lat = sum(all_lats) / len(all_lats)
-    center_lon = sum(all_lons) / len(all_lons)
+    all_lats = [item['position']['latitude'] for item in gnbs + ues]
+    all_lons = [item['position']['longitude'] for item in gnbs + ues]
+    center_lat = float(np.mean(all_lats))
+    center_lon = float(np.mean(all_lons))
     
     # 创建地图
     m = folium.Map(
@@ -223,6 +275,17 @@ def create_5g_network_map(config_data):
         tiles='OpenStreetMap'
     )
     
+    if scalable is None:
+        scalable = len(ues) > SCALABLE_UE_THRESHOLD
+    if scalable:
+        if output is None:
+            raise ValueError("大规模渲染模式需要给出HTML输出路径 (数据文件写在同一目录)")
+        coverage = ue_coverage(gnbs, ues) if gnbs and ues else None
+        files = add_sidecar_layers(m, gnbs, ues, output, coverage)
+        print(f"大规模渲染模式: 图层数据写入 {', '.join(repr(f) for f in files)}")
+        m.get_root().html.add_child(folium.Element(legend_html(len(gnbs), len(ues))))
+        return m
+    
     # 添加基站和覆盖范围
     for gnb in gnbs:
         lat = gnb['position']['latitude']
@@ -270,27 +333,23 @@ def create_5g_network_map(config_data):
     
     # 添加用户设备
     ue_colors = ['blue', 'green', 'purple', 'orange', 'darkblue', 'darkgreen']
+    if gnbs and ues:
+        cov_offsets, cov_indices, cov_distances, nearest_idx, nearest_dist = ue_coverage(gnbs, ues)
+    else:
+        cov_offsets = [0] * (len(ues) + 1)
     
     for i, ue in enumerate(ues):
         lat = ue['position']['latitude']
         lon = ue['position']['longitude']
         
-        # 计算与各基站的距离
-        distances_info = "<br><b>距离基站:</b><br>"
-        closest_gnb = None
-        min_distance = float('inf')
-        
-        for gnb in gnbs:
-            gnb_lat = gnb['position']['latitude']
-            gnb_lon = gnb['position']['longitude']
-            
-            dist = geodesic((lat, lon), (gnb_lat, gnb_lon)).meters
-            coverage_status = "✓覆盖" if dist <= gnb['radius'] else "✗超出"
-            distances_info += f"- {gnb['name']}: {dist:.1f}m ({coverage_status})<br>"
-            
-            if dist < min_distance:
-                min_distance = dist
-                closest_gnb = gnb
+        # 覆盖该UE的基站 (由空间索引查询，按距离升序)
+        distances_info = "<br><b>覆盖基站:</b><br>"
+        for k in range(cov_offsets[i], cov_offsets[i + 1]):
+            gnb = gnbs[cov_indices[k]]
+            distances_info += f"- {gnb['name']}: {cov_distances[k]:.1f}m (✓覆盖)<br>"
+        if cov_offsets[i] == cov_offsets[i + 1] and gnbs:
+            gnb = gnbs[nearest_idx[i]]
+            distances_info += f"- 无覆盖, 最近基站 {gnb['name']}: {nearest_dist[i]:.1f}m (✗超出)<br>"
         
         # 构建UE信息弹窗
         mobility_info = ""
@@ -344,25 +403,103 @@ def create_5g_network_map(config_data):
             ).add_to(m)
     
     # 添加图例
-    legend_html = f'''
-    <div style="position: fixed; 
-                bottom: 50px; left: 50px; width: 250px; height: 200px; 
-                background-color: white; border:2px solid grey; z-index:9999; 
-                font-size:12px; padding: 10px">
-    <p><b>5G网络图例</b></p>
-    <p><i class="fa fa-broadcast-tower" style="color:red"></i> 基站 (gNB)</p>
-    <p><i class="fa fa-mobile" style="color:blue"></i> eMBB用户</p>
-    <p><i class="fa fa-mobile" style="color:red"></i> URLLC用户</p>
-    <p><i class="fa fa-mobile" style="color:green"></i> mMTC用户</p>
-    <p>🔴 覆盖范围</p>
-    <p>→ 移动方向</p>
-    <p><small>基站数: {len(gnbs)}, 用户数: {len(ues)}</small></p>
-    </div>
-    '''
-    m.get_root().html.add_child(folium.Element(legend_html))
+    m.get_root().html.add_child(folium.Element(legend_html(len(gnbs), len(ues))))
     
     return m
 
+def add_coverage_raster(m, config_data, metric, output, zooms=(14, 15, 16), overlay=False,
+                        cache_dir=DEFAULT_CACHE_DIR):
+    """
+    在地图上叠加预渲染的最佳服务基站RSRP/SINR栅格 (见coverage_raster.py)
+    图片按场景哈希缓存在cache_dir；瓦片在HTML中按相对于output的路径引用，
+    单张叠加图由folium以data URL嵌入HTML
+    """
+    gnbs = gnb_columns_from_config(config_data)
+    if len(gnbs['latitude']) == 0:
+        return
+    raster = CoverageRaster(gnbs, area_from_config(config_data, gnbs))
+    name = f"{metric.upper()} (最佳服务基站)"
+    if overlay:
+        image_file, bounds = cached_overlay(raster, metric, cache_dir=cache_dir)
+        folium.raster_layers.ImageOverlay(os.path.abspath(image_file), bounds=bounds, name=name).add_to(m)
+    else:
+        tile_dir = cached_tiles(raster, metric, zooms, cache_dir)
+        html_dir = os.path.dirname(os.path.abspath(output))
+        url = os.path.relpath(os.path.abspath(tile_dir), html_dir).replace(os.sep, '/')
+        folium.TileLayer(tiles=url + '/{z}/{x}/{y}.png', attr='CommNet5G coverage raster', name=name,
+                         overlay=True, control=True, min_native_zoom=min(zooms), max_native_zoom=max(zooms),
+                         max_zoom=19).add_to(m)
+
+def add_trajectory_playback(m, config_data, output, num_steps, dt=1.0, track_format='binary', interval=100,
+                            model='constant'):
+    """
+    按mobility_model预计算所有UE在num_steps个时间步的位置并在地图上回放 (见trajectory.py)，
+    model为random_waypoint / gauss_markov时由mobility.MobilityEngine在区域内推进
+    track_format为'binary'时轨迹以差分压缩数据写入output旁边的 <输出>_tracks.js，由Canvas图层回放；
+    为'geojson'时每个UE一条TimestampedGeoJson轨迹直接写入HTML，只适合UE较少的场景
+    """
+    ues = config_data.get('UEs', [])
+    if not ues:
+        return
+    lat_tracks, lon_tracks = config_tracks(config_data, num_steps, dt, model)
+    slice_types = [ue['slice_type'] for ue in ues]
+    if track_format == 'geojson':
+        from folium.plugins import TimestampedGeoJson
+        features = timestamped_features(lat_tracks, lon_tracks, dt, [ue['name'] for ue in ues],
+                                        [get_slice_color(s) for s in slice_types])
+        TimestampedGeoJson(features, period=f"PT{dt:g}S", duration=f"PT{dt:g}S", transition_time=interval,
+                           add_last_point=True, auto_play=False).add_to(m)
+        return
+    header, compressed = encode_tracks(lat_tracks, lon_tracks)
+    names = sorted(set(slice_types))
+    header.update(dt=dt, slice_colors=[get_slice_color(s) for s in names],
+                  slice=[names.index(s) for s in slice_types])
+    track_file = track_sidecar_path(output)
+    write_track_sidecar(track_file, header, compressed)
+    m.add_child(TrackPlayback(os.path.basename(track_file), interval))
+    print(f"轨迹回放: {len(ues)}个UE × {num_steps}步写入 '{track_file}' ({len(compressed) / 1024:.1f} KB)")
+
+def network_analysis(config_data):
+    """print_network_analysis内容的结构化形式 (基站、UE覆盖/最近基站、覆盖重叠的基站对)，供批量模式写入JSON"""
+    gnbs = config_data.get('gNBs', [])
+    ues = config_data.get('UEs', [])
+    report = {
+        'gnbs': [{
+            'id': g['id'], 'name': g['name'],
+            'latitude': g['position']['latitude'], 'longitude': g['position']['longitude'],
+            'radius': g['radius'], 'transmit_power': g['transmit_power'],
+            'carrier_frequency': g['carrier_frequency'], 'channel_bandwidth': g['channel_bandwidth'],
+            'slices': [s['slice_type'] for s in g.get('slices', [])],
+        } for g in gnbs],
+        'ues': [],
+        'overlapping_gnb_pairs': [],
+    }
+    if gnbs and ues:
+        cov_offsets, cov_indices, cov_distances, nearest_idx, nearest_dist = ue_coverage(gnbs, ues)
+    for i, ue in enumerate(ues):
+        entry = {
+            'id': ue['id'], 'name': ue['name'],
+            'latitude': ue['position']['latitude'], 'longitude': ue['position']['longitude'],
+            'business_type': ue['business_type'], 'slice_type': ue['slice_type'], 'priority': ue['priority'],
+            'speed': ue.get('mobility_model', {}).get('speed'),
+            'direction': ue.get('mobility_model', {}).get('direction'),
+            'covering_gnbs': [], 'nearest_gnb': None,
+        }
+        if gnbs:
+            entry['covering_gnbs'] = [{'gnb': gnbs[cov_indices[k]]['name'], 'distance': round(float(cov_distances[k]), 1)}
+                                      for k in range(cov_offsets[i], cov_offsets[i + 1])]
+            entry['nearest_gnb'] = {'gnb': gnbs[nearest_idx[i]]['name'], 'distance': round(float(nearest_dist[i]), 1)}
+        report['ues'].append(entry)
+    if len(gnbs) > 1:
+        report['overlapping_gnb_pairs'] = [{'a': gnbs[i]['name'], 'b': gnbs[j]['name'], 'distance': round(float(d), 1)}
+                                           for i, j, d in zip(*overlapping_gnb_pairs(gnbs))]
+    report['summary'] = {
+        'num_gnbs': len(gnbs), 'num_ues': len(ues),
+        'covered_ues': sum(1 for u in report['ues'] if u['covering_gnbs']),
+        'overlapping_gnb_pairs': len(report['overlapping_gnb_pairs']),
+    }
+    return report
+
 def print_network_analysis(config_data):
     """打印网络分析信息"""
     gnbs = config_data.get('gNBs', [])
@@ -381,34 +518,113 @@ def print_network_analysis(config_data):
         if 'slices' in gnb:
             print(f"    切片: {', '.join([s['slice_type'] for s in gnb['slices']])}")
     
+    if gnbs and ues:
+        cov_offsets, cov_indices, cov_distances, nearest_idx, nearest_dist = ue_coverage(gnbs, ues)
+    
     print(f"\n📱 用户设备信息 (共{len(ues)}个):")
-    for ue in ues:
+    for i, ue in enumerate(ues):
         print(f"  {ue['name']} (ID: {ue['id']})")
         print(f"    位置: ({ue['position']['latitude']:.6f}, {ue['position']['longitude']:.6f})")
         print(f"    类型: {ue['business_type']}, 切片: {ue['slice_type']}, 优先级: {ue['priority']}")
         if 'mobility_model' in ue:
             print(f"    移动: {ue['mobility_model']['speed']}m/s, 方向: {ue['mobility_model']['direction']}°")
         
-        # 计算与各基站的距离
-        print("    距离基站:")
-        for gnb in gnbs:
-            dist = geodesic(
-                (ue['position']['latitude'], ue['position']['longitude']),
-                (gnb['position']['latitude'], gnb['position']['longitude'])
-            ).meters
-            status = "✓" if dist <= gnb['radius'] else "✗"
-            print(f"      {gnb['name']}: {dist:.1f}m {status}")
+        # 覆盖该UE的基站
+        if not gnbs:
+            continue
+        print("    覆盖基站:")
+        for k in range(cov_offsets[i], cov_offsets[i + 1]):
+            print(f"      {gnbs[cov_indices[k]]['name']}: {cov_distances[k]:.1f}m ✓")
+        if cov_offsets[i] == cov_offsets[i + 1]:
+            print(f"      无覆盖, 最近基站 {gnbs[nearest_idx[i]]['name']}: {nearest_dist[i]:.1f}m ✗")
     
-    # 基站间距离分析
+    # 覆盖范围相交的基站对
     if len(gnbs) > 1:
-        print(f"\n🔗 基站间距离:")
-        for i in range(len(gnbs)):
-            for j in range(i+1, len(gnbs)):
-                dist = geodesic(
-                    (gnbs[i]['position']['latitude'], gnbs[i]['position']['longitude']),
-                    (gnbs[j]['position']['latitude'], gnbs[j]['position']['longitude'])
-                ).meters
-                print(f"  {gnbs[i]['name']} ↔ {gnbs[j]['name']}: {dist:.1f}m")
+        print(f"\n🔗 覆盖重叠的基站对:")
+        for i, j, dist in zip(*overlapping_gnb_pairs(gnbs)):
+            print(f"  {gnbs[i]['name']} ↔ {gnbs[j]['name']}: {dist:.1f}m")
+
+BATCH_SUMMARY_COLUMNS = ['input', 'html', 'analysis', 'status', 'elapsed', 'num_gnbs', 'num_ues',
+                         'covered_ues', 'overlapping_gnb_pairs', 'error']
+
+def batch_outputs(path, base_dir, out_dir):
+    """场景文件 -> (HTML, 分析JSON)，在out_dir下保持相对base_dir的目录结构，避免同名场景互相覆盖"""
+    stem = os.path.splitext(os.path.relpath(path, base_dir))[0]
+    return os.path.join(out_dir, stem + '.html'), os.path.join(out_dir, stem + '_analysis.json')
+
+def is_up_to_date(path, outputs):
+    """所有输出都存在且比输入新时跳过渲染"""
+    source_mtime = os.path.getmtime(path)
+    return all(os.path.exists(f) and os.path.getmtime(f) > source_mtime for f in outputs)
+
+def render_scenario(path, html_file, analysis_file, options):
+    """在工作进程中渲染单个场景并写入分析JSON，异常记录在结果中而不是向上抛出"""
+    row = {'input': path, 'html': html_file, 'analysis': analysis_file}
+    start = time.perf_counter()
+    try:
+        config_data = load_yaml(path, use_cache=False)
+        os.makedirs(os.path.dirname(os.path.abspath(html_file)), exist_ok=True)
+        network_map = create_5g_network_map(config_data, options.get('scalable'), html_file)
+        if network_map is None:
+            raise ValueError("配置文件中没有找到gNBs或UEs数据")
+        if options.get('raster'):
+            add_coverage_raster(network_map, config_data, options['raster'], html_file, options['raster_zooms'],
+                                options['raster_overlay'], options['raster_cache'])
+            folium.LayerControl().add_to(network_map)
+        if options.get('trajectory'):
+            add_trajectory_playback(network_map, config_data, html_file, options['trajectory'], options['dt'],
+                                    options['track_format'], model=options['mobility_model'])
+        network_map.save(html_file)
+        report = network_analysis(config_data)
+        # 先写临时文件再改名，中途被杀时不会留下比输入新的不完整文件
+        with open(analysis_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        os.replace(analysis_file + '.tmp', analysis_file)
+        row.update(report['summary'])
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    row['elapsed'] = round(time.perf_counter() - start, 4)
+    return row
+
+def render_batch(patterns, out_dir, options, workers=None, force=False):
+    """
+    在进程池中批量渲染匹配patterns (glob，支持**) 的场景文件，
+    每个场景输出HTML和 <场景>_analysis.json，输出比输入新的场景被跳过 (force为True时全部重新渲染)；
+    本次渲染的结果汇总写入 out_dir/batch_summary.csv
+    """
+    paths = sorted({os.path.abspath(p) for pattern in patterns for p in glob.glob(pattern, recursive=True)
+                    if os.path.isfile(p)})
+    if not paths:
+        print(f"没有匹配的场景文件: {' '.join(patterns)}")
+        return []
+    base_dir = os.path.commonpath([os.path.dirname(p) for p in paths])
+    jobs = []
+    for path in paths:
+        outputs = batch_outputs(path, base_dir, out_dir)
+        if force or not is_up_to_date(path, outputs):
+            jobs.append((path,) + outputs)
+    print(f"场景总数: {len(paths)}, 已是最新: {len(paths) - len(jobs)}, 待渲染: {len(jobs)}")
+    if not jobs:
+        return []
+
+    os.makedirs(out_dir, exist_ok=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_scenario, *job, options) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows.append(row)
+            status = '✓' if row['status'] == 'ok' else f"✗ {row['error']}"
+            print(f"[{done}/{len(jobs)}] {os.path.relpath(row['input'], base_dir)} ({row['elapsed']:.2f}s) {status}")
+    with open(os.path.join(out_dir, 'batch_summary.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=BATCH_SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(sorted(rows, key=lambda row: row['input']))
+    return rows
+
 
 def main():
     parser = argparse.ArgumentParser(description='5G网络配置可视化工具')
@@ -418,8 +634,48 @@ def main():
                        help='输出HTML文件名 (默认: 5g_network_map.html)')
     parser.add_argument('--create-sample', action='store_true',
                        help='创建示例YAML配置文件')
-    
+    parser.add_argument('--scalable', dest='scalable', action='store_true', default=None,
+                       help=f'大规模渲染模式 (默认在UE数超过{SCALABLE_UE_THRESHOLD}时启用)')
+    parser.add_argument('--no-scalable', dest='scalable', action='store_false',
+                       help='总是逐个添加标记 (原始渲染方式)')
+    parser.add_argument('--raster', choices=['rsrp', 'sinr'], default=None,
+                       help='叠加最佳服务基站RSRP/SINR栅格')
+    parser.add_argument('--raster-zooms', type=int, nargs='+', default=[14, 15, 16],
+                       help='栅格瓦片的缩放级别')
+    parser.add_argument('--raster-overlay', action='store_true',
+                       help='栅格使用单张叠加图而不是瓦片')
+    parser.add_argument('--raster-cache', default=DEFAULT_CACHE_DIR,
+                       help=f'栅格缓存目录 (默认: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--trajectory', type=int, default=None, metavar='STEPS',
+                       help='按mobility_model预计算STEPS个时间步的UE轨迹并添加回放控件')
+    parser.add_argument('--dt', type=float, default=1.0,
+                       help='轨迹时间步长 (秒, 默认: 1.0)')
+    parser.add_argument('--mobility-model', choices=MOBILITY_MODELS, default='constant',
+                       help='轨迹的移动模型 (默认: constant，即mobility_model匀速直线)')
+    parser.add_argument('--track-format', choices=['binary', 'geojson'], default='binary',
+                       help='轨迹格式: 差分压缩数据文件 + Canvas回放 (默认) 或 TimestampedGeoJson')
+    parser.add_argument('--batch', nargs='+', metavar='GLOB', default=None,
+                       help='批量模式: 在进程池中渲染所有匹配的场景文件 (如 "scenarios/**/*.yaml")')
+    parser.add_argument('--out-dir', default='maps',
+                       help='批量模式的输出目录 (默认: maps)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                       help='批量模式的工作进程数 (默认: CPU核数)')
+    parser.add_argument('--force', action='store_true',
+                       help='批量模式下即使输出比输入新也重新渲染')
+
     args = parser.parse_args()
+
+    # 批量模式: 分析结果写入各场景的JSON文件而不是打印
+    if args.batch:
+        options = {key: getattr(args, key) for key in ('scalable', 'raster', 'raster_zooms', 'raster_overlay',
+                                                       'raster_cache', 'trajectory', 'dt', 'track_format',
+                                                       'mobility_model')}
+        rows = render_batch(args.batch, args.out_dir, options, args.workers, args.force)
+        if rows:
+            failed = [row for row in rows if row['status'] != 'ok']
+            print(f"\n完成 {len(rows) - len(failed)} 个场景，失败 {len(failed)} 个，"
+                  f"汇总保存在 '{os.path.join(args.out_dir, 'batch_summary.csv')}'")
+        return
     
     # 如果需要创建示例文件
     # if args.create_sample:
@@ -438,9 +694,16 @@ def main():
         return
     
     # 创建地图
-    network_map = create_5g_network_map(config_data)
+    network_map = create_5g_network_map(config_data, args.scalable, args.output)
     if network_map is None:
         return
+    if args.raster:
+        add_coverage_raster(network_map, config_data, args.raster, args.output, args.raster_zooms,
+                            args.raster_overlay, args.raster_cache)
+        folium.LayerControl().add_to(network_map)
+    if args.trajectory:
+        add_trajectory_playback(network_map, config_data, args.output, args.trajectory, args.dt,
+                                args.track_format, model=args.mobility_model)
     
     # 保存地图
     network_map.save(args.output)
@@ -4,6 +4,8 @@ from folium import plugins
 from folium.features import DivIcon
 import math
 
+from geo import meters_to_degrees
+
 # 解析YAML数据
 data = """
 gNBs:
@@ -278,8 +280,9 @@ for i, ue in enumerate(config['UEs']):
     # 绘制移动方向箭头
     arrow_length = 50  # 箭头长度（米）
     rad = math.radians(direction)
-    end_lat = lat + (arrow_length / 111000) * math.cos(rad)
-    end_lon = lon + (arrow_length / (111000 * math.cos(math.radians(lat)))) * math.sin(rad)
+    d_lat, d_lon = meters_to_degrees(arrow_length * math.cos(rad), arrow_length * math.sin(rad), lat)
+    end_lat = lat + float(d_lat)
+    end_lon = lon + float(d_lon)
     
     folium.PolyLine(
         locations=[(lat, lon), (end_lat, end_lon)],
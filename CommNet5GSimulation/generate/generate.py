@@ -1,10 +1,16 @@
 import random
-import yaml
+import sys
 import numpy as np
 from dataclasses import dataclass
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Iterator, Sequence
 from scipy.io import savemat
 
+from yaml_io import write_scenario_yaml, iter_gnb_dicts, iter_ue_dicts, load_yaml
+from mat_io import fits_mat5, save_network_mat, save_network_mat73
+from spatial_index import GeoIndex
+from sinr_engine import SINREngine
+from interference import DEFAULT_INTERFERENCE_DISTANCE, table_interference_graph
+
 @dataclass
 class nrSlice:
     """5G网络切片类"""
@@ -92,12 +98,33 @@ class NRDataGenerator:
     # 切片类型
     SLICE_TYPES = ['eMBB', 'URLLC', 'mMTC', 'Custom']
     
-    def __init__(self, area_bounds: Tuple[float, float, float, float] = (39.9, 40.1, 116.3, 116.5)):
+    # 各切片类型的 (QoS等级范围, 最小带宽保证范围)，闭区间，与generate_slice一致
+    SLICE_PARAM_RANGES = {
+        'eMBB': ((4, 7), (10000000, 100000000)),
+        'URLLC': ((1, 3), (1000000, 10000000)),
+        'mMTC': ((8, 10), (100000, 5000000)),
+        'Custom': ((1, 10), (1000000, 50000000)),
+    }
+    
+    # 5G NR标准的RB数量限制
+    MAX_RB_MAPPING = {
+        5e6: 25, 10e6: 52, 15e6: 79, 20e6: 106, 25e6: 133,
+        30e6: 160, 40e6: 216, 50e6: 270, 60e6: 324, 70e6: 378,
+        80e6: 432, 90e6: 486, 100e6: 540, 200e6: 1080, 400e6: 2160
+    }
+    
+    GNB_ANTENNA_OPTIONS = [2, 4, 8, 16, 32, 64]
+    UE_ANTENNA_OPTIONS = [1, 2, 4]
+    
+    def __init__(self, area_bounds: Tuple[float, float, float, float] = (39.9, 40.1, 116.3, 116.5),
+                 seed: int = None):
         """
         初始化数据生成器
         area_bounds: (lat_min, lat_max, lon_min, lon_max) 区域边界
+        seed: 批量生成 (generate_*_array) 使用的numpy随机数种子
         """
         self.area_bounds = area_bounds
+        self.rng = np.random.default_rng(seed)
         
     def calculate_num_resource_blocks(self, bandwidth: float, scs: float) -> int:
         """
@@ -107,14 +134,7 @@ class NRDataGenerator:
         num_subcarriers = int(bandwidth / scs)
         num_rb = num_subcarriers // 12
         
-        # 5G NR标准的RB数量限制
-        max_rb_mapping = {
-            5e6: 25, 10e6: 52, 15e6: 79, 20e6: 106, 25e6: 133,
-            30e6: 160, 40e6: 216, 50e6: 270, 60e6: 324, 70e6: 378,
-            80e6: 432, 90e6: 486, 100e6: 540, 200e6: 1080, 400e6: 2160
-        }
-        
-        return min(num_rb, max_rb_mapping.get(bandwidth, num_rb))
+        return min(num_rb, self.MAX_RB_MAPPING.get(bandwidth, num_rb))
     
     def generate_gnb_params(self, band_type: str = 'mixed', force_params: Dict = None) -> Dict[str, Any]:
         """
@@ -260,6 +280,131 @@ class NRDataGenerator:
         
         return ue
     
+    def generate_gnbs_array(self, n: int, band_type: str = 'mixed', force_params: Dict = None,
+                            start_id: int = 1) -> Dict[str, np.ndarray]:
+        """
+        批量生成n个基站，一次性抽取所有字段，返回列数组
+        分布与generate_gnb一致，切片以CSR形式存储:
+        第i个基站的切片为 sliceType[sliceOffsets[i]:sliceOffsets[i+1]]
+        sliceType / 业务类型使用类别编码 (SLICE_TYPES / BUSINESS_TYPES 中的下标)
+        """
+        rng = self.rng
+        lat_min, lat_max, lon_min, lon_max = self.area_bounds
+        
+        if force_params:
+            carrier_freq = np.full(n, force_params['carrierFrequency'], dtype=np.float64)
+            scs = np.full(n, force_params['subcarrierSpacing'], dtype=np.float64)
+            bandwidth = np.full(n, force_params['channelBandwidth'], dtype=np.float64)
+            num_rb = np.full(n, force_params['numResourceBlocks'], dtype=np.int32)
+        else:
+            # 选择频段类型 (mixed: 80% FR1, 20% FR2)
+            if band_type == 'FR1':
+                is_fr2 = np.zeros(n, dtype=bool)
+            elif band_type == 'FR2':
+                is_fr2 = np.ones(n, dtype=bool)
+            else:
+                is_fr2 = rng.random(n) >= 0.8
+            
+            carrier_freq = np.empty(n, dtype=np.float64)
+            bandwidth = np.empty(n, dtype=np.float64)
+            for band, mask in (('FR1', ~is_fr2), ('FR2', is_fr2)):
+                count = int(mask.sum())
+                carrier_freq[mask] = rng.choice(self.STANDARD_CARRIER_FREQUENCIES[band], size=count)
+                bandwidth[mask] = rng.choice(self.BANDWIDTH_OPTIONS[band], size=count)
+            
+            # 子载波间距与generate_gnb_params保持一致
+            scs = np.full(n, 30, dtype=np.float64)
+            
+            # 计算资源块数量，并按标准RB数量限制截断
+            num_rb = (np.floor(bandwidth / scs) // 12).astype(np.int64)
+            num_rb = np.minimum(num_rb, self._lookup_max_rb(bandwidth)).astype(np.int32)
+        
+        # 生成切片（每个基站1-3个切片）
+        num_slices = rng.integers(1, 4, size=n)
+        slice_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(num_slices, out=slice_offsets[1:])
+        slice_type, qos_level, min_bw = self._generate_slices_array(int(slice_offsets[-1]))
+        
+        return {
+            'id': np.arange(start_id, start_id + n, dtype=np.int32),
+            'latitude': rng.uniform(lat_min, lat_max, n),
+            'longitude': rng.uniform(lon_min, lon_max, n),
+            'radius': rng.uniform(100, 2000, n),  # 100m - 2km覆盖半径
+            'noiseFigure': rng.uniform(2.0, 5.0, n),  # 2-5 dB
+            'numTransmitAntennas': rng.choice(self.GNB_ANTENNA_OPTIONS, size=n).astype(np.int16),
+            'transmitPower': rng.uniform(30, 46, n),  # 30-46 dBm
+            'carrierFrequency': carrier_freq,
+            'channelBandwidth': bandwidth,
+            'subcarrierSpacing': scs,
+            'numResourceBlocks': num_rb,
+            'sliceOffsets': slice_offsets,
+            'sliceType': slice_type,
+            'qosLevel': qos_level,
+            'minBandwidthGuarantee': min_bw,
+        }
+    
+    def _lookup_max_rb(self, bandwidth: np.ndarray) -> np.ndarray:
+        """按带宽查表得到标准RB数量上限，表中没有的带宽不做限制"""
+        keys = np.array(sorted(self.MAX_RB_MAPPING), dtype=np.float64)
+        values = np.array([self.MAX_RB_MAPPING[k] for k in keys], dtype=np.int64)
+        idx = np.clip(np.searchsorted(keys, bandwidth), 0, len(keys) - 1)
+        return np.where(keys[idx] == bandwidth, values[idx], np.iinfo(np.int32).max)
+    
+    def _generate_slices_array(self, total: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """批量生成total个切片，返回 (切片类型编码, QoS等级, 最小带宽保证)"""
+        rng = self.rng
+        slice_type = rng.integers(0, len(self.SLICE_TYPES), size=total).astype(np.int8)
+        ranges = [self.SLICE_PARAM_RANGES[t] for t in self.SLICE_TYPES]
+        qos_low = np.array([r[0][0] for r in ranges])[slice_type]
+        qos_high = np.array([r[0][1] for r in ranges])[slice_type]
+        bw_low = np.array([r[1][0] for r in ranges], dtype=np.int64)[slice_type]
+        bw_high = np.array([r[1][1] for r in ranges], dtype=np.int64)[slice_type]
+        qos_level = rng.integers(qos_low, qos_high + 1).astype(np.int8)
+        min_bw = rng.integers(bw_low, bw_high + 1).astype(np.int64)
+        return slice_type, qos_level, min_bw
+    
+    def generate_ues_array(self, n: int, gnbs: Dict[str, np.ndarray] = None,
+                           start_id: int = 1) -> Dict[str, np.ndarray]:
+        """
+        批量生成n个用户设备，返回列数组，分布与generate_ue一致
+        gnbs: generate_gnbs_array返回的基站列数组，为空时所有UE处于Idle状态
+        """
+        rng = self.rng
+        lat_min, lat_max, lon_min, lon_max = self.area_bounds
+        num_gnbs = len(gnbs['id']) if gnbs is not None else 0
+        
+        if num_gnbs:
+            # 均匀选择连接的基站，90%的UE处于连接状态
+            gnb_index = rng.integers(0, num_gnbs, size=n)
+            connection_state = (rng.random(n) > 0.1).astype(np.int8)
+            gnb_node_id = gnbs['id'][gnb_index].astype(np.int32)
+            
+            # 从所连基站的切片中均匀选择切片类型
+            offsets = gnbs['sliceOffsets']
+            counts = offsets[gnb_index + 1] - offsets[gnb_index]
+            pick = (rng.random(n) * counts).astype(np.int64)
+            slice_type = gnbs['sliceType'][offsets[gnb_index] + pick].astype(np.int8)
+        else:
+            connection_state = np.zeros(n, dtype=np.int8)
+            gnb_node_id = np.zeros(n, dtype=np.int32)
+            slice_type = rng.integers(0, len(self.SLICE_TYPES), size=n).astype(np.int8)
+        
+        return {
+            'id': np.arange(start_id, start_id + n, dtype=np.int32),
+            'latitude': rng.uniform(lat_min, lat_max, n),
+            'longitude': rng.uniform(lon_min, lon_max, n),
+            'noiseFigure': rng.uniform(5.0, 9.0, n),  # 5-9 dB (UE噪声较高)
+            'numTransmitAntennas': rng.choice(self.UE_ANTENNA_OPTIONS, size=n).astype(np.int16),
+            'transmitPower': rng.uniform(10, 23, n),  # 10-23 dBm (UE功率较低)
+            'connectionState': connection_state,
+            'gnbNodeId': gnb_node_id,
+            'businessType': rng.integers(0, len(self.BUSINESS_TYPES), size=n).astype(np.int8),
+            'priority': rng.integers(1, 11, size=n).astype(np.int8),
+            'sliceType': slice_type,
+            'speed': rng.uniform(0, 120, n) / 3.6,  # 0-120 km/h 转换为 m/s
+            'direction': rng.uniform(0, 360, n),  # 0-360度
+        }
+    
     def generate_interference_groups(self, num_groups: int = 3, gnbs_per_group: List[int] = None) -> List[Dict]:
         """
         生成干扰组 - 每组内的基站使用相同的射频参数
@@ -289,6 +434,241 @@ class NRDataGenerator:
         return interference_groups
 
 
+class _RowView(Sequence):
+    """按需把列式数据的某一行构造成数据类对象的只读序列，不复制列数据"""
+    
+    def __init__(self, row_factory, length: int):
+        self._row_factory = row_factory
+        self._length = length
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row_factory(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._row_factory(index)
+
+
+class NetworkTable:
+    """
+    列式 (struct-of-arrays) 存储的5G网络
+    gnbs / ues / slices 为 {列名: numpy数组}，列名与数据类字段一致；
+    第i个基站的切片为 slices[...][sliceOffsets[i]:sliceOffsets[i+1]] (CSR)
+    sliceType / businessType 为类别编码，对应 sliceCategories / businessCategories 中的下标
+    transmitPower 以float32紧凑存储 (精度约1e-6 dB)，其余浮点列为float64，与数据类字段取值一致
+    """
+    
+    GNB_COLUMNS = {
+        'id': np.int32,
+        'latitude': np.float64,
+        'longitude': np.float64,
+        'radius': np.float64,
+        'noiseFigure': np.float64,
+        'numTransmitAntennas': np.int16,
+        'transmitPower': np.float32,
+        'carrierFrequency': np.float64,
+        'channelBandwidth': np.float64,
+        'subcarrierSpacing': np.float64,
+        'numResourceBlocks': np.int32,
+    }
+    
+    SLICE_COLUMNS = {
+        'sliceType': np.int8,
+        'qosLevel': np.int8,
+        'minBandwidthGuarantee': np.int64,
+    }
+    
+    UE_COLUMNS = {
+        'id': np.int32,
+        'latitude': np.float64,
+        'longitude': np.float64,
+        'noiseFigure': np.float64,
+        'numTransmitAntennas': np.int16,
+        'transmitPower': np.float32,
+        'connectionState': np.int8,
+        'gnbNodeId': np.int32,
+        'businessType': np.int8,
+        'priority': np.int8,
+        'sliceType': np.int8,
+        'speed': np.float64,
+        'direction': np.float64,
+    }
+    
+    def __init__(self, gnbs: Dict[str, np.ndarray], slices: Dict[str, np.ndarray], slice_offsets: np.ndarray,
+                 ues: Dict[str, np.ndarray], slice_categories: List[str] = None,
+                 business_categories: List[str] = None):
+        # dtype已匹配时np.asarray不会复制数据
+        self.gnbs = {name: np.asarray(gnbs[name], dtype=dtype) for name, dtype in self.GNB_COLUMNS.items()}
+        self.slices = {name: np.asarray(slices[name], dtype=dtype) for name, dtype in self.SLICE_COLUMNS.items()}
+        self.slice_offsets = np.asarray(slice_offsets, dtype=np.int64)
+        self.ues = {name: np.asarray(ues[name], dtype=dtype) for name, dtype in self.UE_COLUMNS.items()}
+        self.slice_categories = list(slice_categories or NRDataGenerator.SLICE_TYPES)
+        self.business_categories = list(business_categories or NRDataGenerator.BUSINESS_TYPES)
+        
+        if len(self.slice_offsets) != self.num_gnbs + 1:
+            raise ValueError(f"sliceOffsets长度应为基站数+1 ({self.num_gnbs + 1})，实际为{len(self.slice_offsets)}")
+    
+    @classmethod
+    def from_arrays(cls, gnb_columns: Dict[str, np.ndarray], ue_columns: Dict[str, np.ndarray]) -> 'NetworkTable':
+        """由 NRDataGenerator.generate_gnbs_array / generate_ues_array 的结果构造"""
+        return cls(gnb_columns, gnb_columns, gnb_columns['sliceOffsets'], ue_columns)
+    
+    @classmethod
+    def from_entities(cls, gnb_list: List[nrGNB], ue_list: List[nrUE],
+                      slice_categories: List[str] = None, business_categories: List[str] = None) -> 'NetworkTable':
+        """由nrGNB / nrUE数据类列表构造"""
+        slice_categories = list(slice_categories or NRDataGenerator.SLICE_TYPES)
+        business_categories = list(business_categories or NRDataGenerator.BUSINESS_TYPES)
+        slice_code = {name: code for code, name in enumerate(slice_categories)}
+        business_code = {name: code for code, name in enumerate(business_categories)}
+        
+        gnbs = {name: [getattr(gnb, name) for gnb in gnb_list]
+                for name in cls.GNB_COLUMNS if name not in ('latitude', 'longitude')}
+        gnbs['latitude'] = [gnb.position[0] for gnb in gnb_list]
+        gnbs['longitude'] = [gnb.position[1] for gnb in gnb_list]
+        
+        all_slices = [s for gnb in gnb_list for s in gnb.slices]
+        slices = {
+            'sliceType': [slice_code[s.sliceType] for s in all_slices],
+            'qosLevel': [s.qosLevel for s in all_slices],
+            'minBandwidthGuarantee': [s.minBandwidthGuarantee for s in all_slices],
+        }
+        slice_offsets = np.zeros(len(gnb_list) + 1, dtype=np.int64)
+        np.cumsum([len(gnb.slices) for gnb in gnb_list], out=slice_offsets[1:])
+        
+        ues = {name: [getattr(ue, name) for ue in ue_list]
+               for name in ('id', 'noiseFigure', 'numTransmitAntennas', 'transmitPower',
+                            'connectionState', 'gnbNodeId', 'priority')}
+        ues['latitude'] = [ue.position[0] for ue in ue_list]
+        ues['longitude'] = [ue.position[1] for ue in ue_list]
+        ues['businessType'] = [business_code[ue.businessType] for ue in ue_list]
+        ues['sliceType'] = [slice_code[ue.sliceType] for ue in ue_list]
+        ues['speed'] = [ue.mobilityModel.speed for ue in ue_list]
+        ues['direction'] = [ue.mobilityModel.direction for ue in ue_list]
+        
+        return cls(gnbs, slices, slice_offsets, ues, slice_categories, business_categories)
+    
+    @property
+    def num_gnbs(self) -> int:
+        return len(self.gnbs['id'])
+    
+    @property
+    def num_ues(self) -> int:
+        return len(self.ues['id'])
+    
+    @property
+    def num_slices_per_gnb(self) -> np.ndarray:
+        return np.diff(self.slice_offsets)
+    
+    def slice_gnb_rows(self) -> np.ndarray:
+        """每个切片所属基站的行号"""
+        return np.repeat(np.arange(self.num_gnbs), self.num_slices_per_gnb)
+    
+    def slice_resource_weights(self) -> np.ndarray:
+        """
+        切片资源权重 (对应MATLAB侧nrSlice的bandwidthWeight)
+        生成的数据没有resourceWeight，按同一基站内各切片的最小带宽保证占比折算
+        """
+        min_bw = self.slices['minBandwidthGuarantee'].astype(np.float64)
+        rows = self.slice_gnb_rows()
+        totals = np.bincount(rows, weights=min_bw, minlength=self.num_gnbs)
+        return min_bw / totals[rows]
+    
+    def slice_lookup(self) -> np.ndarray:
+        """
+        (基站行号, 切片类型编码) -> 切片行号的查找表，基站不支持该切片类型时为-1
+        同一基站内切片类型重复时后出现的覆盖先出现的 (与MATLAB侧containers.Map的赋值语义一致)
+        """
+        slice_type = self.slices['sliceType'].astype(np.int64)
+        num_types = max(len(self.slice_categories), int(slice_type.max(initial=-1)) + 1)
+        lookup = np.full((self.num_gnbs, num_types), -1, dtype=np.int64)
+        lookup[self.slice_gnb_rows(), slice_type] = np.arange(len(slice_type))
+        return lookup
+    
+    def gnb_rows(self, gnb_ids) -> np.ndarray:
+        """基站ID -> 行号，ID不存在时为-1"""
+        ids = self.gnbs['id']
+        gnb_ids = np.asarray(gnb_ids)
+        if len(ids) == 0:
+            return np.full(gnb_ids.shape, -1, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        pos = np.clip(np.searchsorted(ids, gnb_ids, sorter=order), 0, len(ids) - 1)
+        rows = order[pos]
+        return np.where(ids[rows] == gnb_ids, rows, -1)
+    
+    def slices_of(self, i: int) -> List[nrSlice]:
+        """第i个基站的切片列表"""
+        start, end = self.slice_offsets[i], self.slice_offsets[i + 1]
+        return [nrSlice(self.slice_categories[code], int(qos), int(min_bw))
+                for code, qos, min_bw in zip(self.slices['sliceType'][start:end].tolist(),
+                                             self.slices['qosLevel'][start:end].tolist(),
+                                             self.slices['minBandwidthGuarantee'][start:end].tolist())]
+    
+    def gnb(self, i: int) -> nrGNB:
+        """把第i行构造成nrGNB对象"""
+        col = self.gnbs
+        gnb_id = int(col['id'][i])
+        return nrGNB(
+            id=gnb_id,
+            name=f"gNB_{gnb_id}",
+            position=(float(col['latitude'][i]), float(col['longitude'][i])),
+            radius=float(col['radius'][i]),
+            noiseFigure=float(col['noiseFigure'][i]),
+            numTransmitAntennas=int(col['numTransmitAntennas'][i]),
+            transmitPower=float(col['transmitPower'][i]),
+            carrierFrequency=float(col['carrierFrequency'][i]),
+            channelBandwidth=float(col['channelBandwidth'][i]),
+            subcarrierSpacing=float(col['subcarrierSpacing'][i]),
+            numResourceBlocks=int(col['numResourceBlocks'][i]),
+            slices=self.slices_of(i)
+        )
+    
+    def ue(self, i: int) -> nrUE:
+        """把第i行构造成nrUE对象"""
+        col = self.ues
+        ue_id = int(col['id'][i])
+        return nrUE(
+            id=ue_id,
+            name=f"UE_{ue_id}",
+            position=(float(col['latitude'][i]), float(col['longitude'][i])),
+            noiseFigure=float(col['noiseFigure'][i]),
+            numTransmitAntennas=int(col['numTransmitAntennas'][i]),
+            transmitPower=float(col['transmitPower'][i]),
+            connectionState=int(col['connectionState'][i]),
+            gnbNodeId=int(col['gnbNodeId'][i]),
+            businessType=self.business_categories[col['businessType'][i]],
+            priority=int(col['priority'][i]),
+            sliceType=self.slice_categories[col['sliceType'][i]],
+            mobilityModel=nrMobilityModel(float(col['speed'][i]), float(col['direction'][i]))
+        )
+    
+    @property
+    def gnb_list(self) -> Sequence[nrGNB]:
+        """nrGNB对象的惰性序列，访问时才构造对象"""
+        return _RowView(self.gnb, self.num_gnbs)
+    
+    @property
+    def ue_list(self) -> Sequence[nrUE]:
+        """nrUE对象的惰性序列，访问时才构造对象"""
+        return _RowView(self.ue, self.num_ues)
+    
+    def iter_gnbs(self) -> Iterator[nrGNB]:
+        return (self.gnb(i) for i in range(self.num_gnbs))
+    
+    def iter_ues(self) -> Iterator[nrUE]:
+        return (self.ue(i) for i in range(self.num_ues))
+    
+    def nbytes(self) -> int:
+        """所有列占用的字节数"""
+        return (sum(a.nbytes for a in self.gnbs.values()) + sum(a.nbytes for a in self.slices.values())
+                + sum(a.nbytes for a in self.ues.values()) + self.slice_offsets.nbytes)
+
+
 def to_camel_case(snake_str):
     """
     将下划线分隔的字符串转换为小驼峰格式
@@ -333,9 +713,8 @@ def yaml_to_mat(yaml_file, mat_file):
         yaml_file (str): YAML文件路径
         mat_file (str): .mat文件保存路径
     """
-    # 加载YAML数据
-    with open(yaml_file, 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
+    # 加载YAML数据 (带解析缓存)
+    data = load_yaml(yaml_file)
     
     # 转换键为小驼峰格式
     data_camel = convert_to_camel_case(data)
@@ -427,153 +806,122 @@ def main():
         ue = generator.generate_ue(i + 1, gnb_list)
         ue_list.append(ue)
     
-    # 统计信息
-    connected_ues = sum(1 for ue in ue_list if ue.connectionState == 1)
-    fr1_count = sum(1 for gnb in gnb_list if gnb.carrierFrequency < 6e9)
-    fr2_count = len(gnb_list) - fr1_count
+    # 统计信息 (基于列式网络表做向量化统计)
+    table = NetworkTable.from_entities(gnb_list, ue_list)
+    gnb_columns = table.gnbs
+    connected_ues = int(np.count_nonzero(table.ues['connectionState'] == 1))
+    fr1_count = int(np.count_nonzero(gnb_columns['carrierFrequency'] < 6e9))
+    fr2_count = table.num_gnbs - fr1_count
     
     print(f"\n=== 网络统计信息 ===")
-    print(f"基站总数: {len(gnb_list)}")
+    print(f"基站总数: {table.num_gnbs}")
     print(f"  - FR1基站: {fr1_count}")
     print(f"  - FR2基站: {fr2_count}")
-    print(f"用户设备总数: {len(ue_list)}")
+    print(f"用户设备总数: {table.num_ues}")
     print(f"已连接UE数量: {connected_ues}")
-    print(f"连接率: {connected_ues/len(ue_list)*100:.1f}%")
+    print(f"连接率: {connected_ues/table.num_ues*100:.1f}%")
     
     # 干扰分析
     print(f"\n=== 干扰分析 ===")
     print(f"干扰组数量: {len(interference_groups)}")
     
+    # 干扰图: 同频且距离不超过干扰距离的基站互为邻居；组成员由干扰组编号得到，不再逐个比较射频参数
+    # 各干扰组的基站按组顺序最先生成，第k组的第一个基站位于第 sum(gnbs_per_group[:k]) 行
+    graph = table_interference_graph(table, DEFAULT_INTERFERENCE_DISTANCE)
+    group_first_rows = np.cumsum([0] + gnbs_per_group[:-1])
+    group_masks = [graph.group_ids == graph.group_ids[row] for row in group_first_rows]
+    print(f"干扰图 (干扰距离 {DEFAULT_INTERFERENCE_DISTANCE:.0f} m): 边数 {graph.num_edges}，"
+          f"平均度 {graph.degree().mean():.1f}")
+    
     # 统计每个干扰组的详细信息
-    for group in interference_groups:
-        group_gnbs = [gnb for gnb in gnb_list 
-                     if gnb.carrierFrequency == group['params']['carrierFrequency'] and
-                        gnb.channelBandwidth == group['params']['channelBandwidth'] and
-                        gnb.subcarrierSpacing == group['params']['subcarrierSpacing']]
+    for group, group_mask in zip(interference_groups, group_masks):
+        group_ids = gnb_columns['id'][group_mask]
         
         print(f"\n干扰组 {group['group_id']}:")
         print(f"  载波频率: {group['params']['carrierFrequency']/1e9:.1f} GHz")
         print(f"  信道带宽: {group['params']['channelBandwidth']/1e6:.0f} MHz")
         print(f"  子载波间距: {group['params']['subcarrierSpacing']/1e3:.0f} kHz")
-        print(f"  基站数量: {len(group_gnbs)}")
-        print(f"  基站ID: {[gnb.id for gnb in group_gnbs]}")
+        print(f"  基站数量: {len(group_ids)}")
+        print(f"  基站ID: {group_ids.tolist()}")
         
         # 计算组内基站的平均距离（用于干扰强度估算）
-        if len(group_gnbs) > 1:
-            distances = []
-            for i, gnb1 in enumerate(group_gnbs):
-                for gnb2 in group_gnbs[i+1:]:
-                    # 简单的距离计算（假设地球是平面）
-                    lat_diff = gnb1.position[0] - gnb2.position[0]
-                    lon_diff = gnb1.position[1] - gnb2.position[1]
-                    distance = ((lat_diff * 111000)**2 + (lon_diff * 111000 * np.cos(np.radians(gnb1.position[0])))**2)**0.5
-                    distances.append(distance)
+        if len(group_ids) > 1:
+            group_index = GeoIndex(gnb_columns['latitude'][group_mask], gnb_columns['longitude'][group_mask])
+            _, _, distances = group_index.pairs_within()
             
             avg_distance = np.mean(distances)
-            min_distance = min(distances)
+            min_distance = np.min(distances)
             print(f"  平均站间距离: {avg_distance:.0f} m")
             print(f"  最小站间距离: {min_distance:.0f} m")
     
     # 载波频率分布
     freq_distribution = {}
-    for gnb in gnb_list:
-        freq_ghz = gnb.carrierFrequency / 1e9
-        freq_key = f"{freq_ghz:.1f}GHz"
-        freq_distribution[freq_key] = freq_distribution.get(freq_key, 0) + 1
+    freqs, counts = np.unique(gnb_columns['carrierFrequency'], return_counts=True)
+    for freq, count in zip(freqs.tolist(), counts.tolist()):
+        freq_key = f"{freq / 1e9:.1f}GHz"
+        freq_distribution[freq_key] = freq_distribution.get(freq_key, 0) + count
     
     print(f"\n=== 载波频率分布 ===")
     for freq, count in sorted(freq_distribution.items()):
         print(f"{freq}: {count}个基站")
     
+    # 按当前连接关系估算SINR (Python引擎，与NetSimuEnv计算语义一致)
+    sinr_engine = SINREngine(table, generator.area_bounds, interference_graph=graph)
+    sinr_stats = sinr_engine.summary(sinr_engine.evaluate())
+    print(f"\n=== SINR估算 (38.901 UMa) ===")
+    print(f"已连接UE数: {sinr_stats['connected']}")
+    if sinr_stats['connected'] > 0:
+        print(f"平均SINR: {sinr_stats['sinr_mean']:.1f} dB")
+        print(f"SINR 5%/50%/95%分位: {sinr_stats['sinr_p5']:.1f} / {sinr_stats['sinr_p50']:.1f} / "
+              f"{sinr_stats['sinr_p95']:.1f} dB")
+    
     # 保存数据到YAML文件
     save_data = input("\n是否保存数据到YAML文件? (y/n): ")
     if save_data.lower() == 'y':
-        # 转换为可序列化的格式
-        gnb_data = []
-        for gnb in gnb_list:
-            gnb_dict = {
-                'id': gnb.id,
-                'name': gnb.name,
-                'position': {
-                    'latitude': gnb.position[0],
-                    'longitude': gnb.position[1]
-                },
-                'radius': gnb.radius,
-                'noise_figure': gnb.noiseFigure,
-                'num_transmit_antennas': gnb.numTransmitAntennas,
-                'transmit_power': gnb.transmitPower,
-                'carrier_frequency': gnb.carrierFrequency,
-                'channel_bandwidth': gnb.channelBandwidth,
-                'subcarrier_spacing': gnb.subcarrierSpacing,
-                'num_resource_blocks': gnb.numResourceBlocks,
-                'slices': [{'slice_type': s.sliceType, 'qos_level': s.qosLevel, 'min_bandwidth_guarantee': s.minBandwidthGuarantee} for s in gnb.slices]
-            }
-            gnb_data.append(gnb_dict)
-        
-        ue_data = []
-        for ue in ue_list:
-            ue_dict = {
-                'id': ue.id,
-                'name': ue.name,
-                'position': {
-                    'latitude': ue.position[0],
-                    'longitude': ue.position[1]
-                },
-                'noise_figure': ue.noiseFigure,
-                'num_transmit_antennas': ue.numTransmitAntennas,
-                'transmit_power': ue.transmitPower,
-                'connection_state': ue.connectionState,
-                'gnb_node_id': ue.gnbNodeId,
-                'business_type': ue.businessType,
-                'priority': ue.priority,
-                'slice_type': ue.sliceType,
-                'mobility_model': {'speed': ue.mobilityModel.speed, 'direction': ue.mobilityModel.direction}
-            }
-            ue_data.append(ue_dict)
-        
-        # 添加干扰组信息
+        # 干扰组信息 (组成员由列式网络表向量化筛选)
         interference_groups_data = []
-        for group in interference_groups:
+        for group, group_mask in zip(interference_groups, group_masks):
             group_data = {
                 'group_id': group['group_id'],
                 'carrier_frequency': group['params']['carrierFrequency'],
                 'channel_bandwidth': group['params']['channelBandwidth'],
                 'subcarrier_spacing': group['params']['subcarrierSpacing'],
                 'num_resource_blocks': group['params']['numResourceBlocks'],
-                'gnb_ids': [gnb.id for gnb in gnb_list 
-                           if gnb.carrierFrequency == group['params']['carrierFrequency'] and
-                              gnb.channelBandwidth == group['params']['channelBandwidth'] and
-                              gnb.subcarrierSpacing == group['params']['subcarrierSpacing']],
+                'gnb_ids': gnb_columns['id'][group_mask].tolist(),
                 'description': group['description']
             }
             interference_groups_data.append(group_data)
         
-        data_export = {
-            'gnbs': gnb_data,
-            'ues': ue_data,
-            'interference_groups': interference_groups_data,
-            'metadata': {
-                'num_gnbs': len(gnb_list),
-                'num_ues': len(ue_list),
-                'num_interference_groups': len(interference_groups),
-                'area_bounds': generator.area_bounds,
-                'generation_time': str(np.datetime64('now')),
-                'description': '5G NR网络仿真数据 - 包含干扰组信息'
-            }
+        metadata = {
+            'area_bounds': list(generator.area_bounds),
+            'generation_time': str(np.datetime64('now')),
+            'description': '5G NR网络仿真数据 - 包含干扰组信息'
         }
         
+        # 流式写入：基站和UE字典由列式网络表逐块产生，不在内存中整体构建；
+        # YAML与MAT都从同一张网络表导出，两种格式的取值一致
         yaml_file = '5g_nr_simulation_data.yaml'
-        with open(yaml_file, 'w', encoding='utf-8') as f:
-            yaml.dump(data_export, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        write_scenario_yaml(yaml_file,
+                            iter_gnb_dicts(table),
+                            iter_ue_dicts(table),
+                            interference_groups_data,
+                            metadata)
         
         print(f"数据已保存到 '{yaml_file}'")
         
         # 询问是否转换为MAT文件
-        convert_to_mat = input("是否将YAML数据转换为MATLAB .mat文件? (y/n): ")
+        convert_to_mat = input("是否将网络数据导出为MATLAB .mat文件? (y/n): ")
         if convert_to_mat.lower() == 'y':
             mat_file = '5g_nr_simulation_data.mat'
-            yaml_to_mat(yaml_file, mat_file)
-            print("YAML数据已转换为小驼峰格式并保存为MATLAB .mat文件")
+            # 直接从内存中的列式网络表导出，不再重新读取YAML；
+            # 使用 --v73 参数或数据超出MAT v5单变量2GB限制时写出基于HDF5的MAT v7.3文件
+            if '--v73' in sys.argv or not fits_mat5(table, graph):
+                save_network_mat73(mat_file, table, interference_groups_data, generator.area_bounds,
+                                   interference_graph=graph)
+            else:
+                save_network_mat(mat_file, table, interference_groups_data, generator.area_bounds,
+                                 interference_graph=graph)
+            print("网络数据已按列 (struct of arrays) 保存为MATLAB .mat文件")
             print("文件包含基站、UE和干扰组的完整信息，可用于MATLAB中的网络仿真和干扰分析。")
 
 
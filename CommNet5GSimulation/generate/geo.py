@@ -0,0 +1,211 @@
+"""
+地理坐标计算工具
+- 球面模型 (Haversine)：与MATLAB侧tools.calculateHaversineDistance / nrMobilityModel一致
+- 椭球模型 (WGS84, Vincenty反算)：精度与geopy.distance.geodesic相当 (亚毫米级)
+- ECEF / 局部ENU坐标转换
+所有函数均为numpy向量化实现，距离矩阵按行分块计算以限制内存占用
+"""
+import numpy as np
+
+# 地球平均半径 (米)
+EARTH_RADIUS = 6371000.0
+
+# WGS84椭球参数
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+# 距离矩阵单个分块的默认内存上限 (字节)
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def to_unit_vectors(lat, lon) -> np.ndarray:
+    """经纬度 (度) -> 单位球面上的三维直角坐标 (ECEF方向)，形状为 (N, 3)"""
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack((cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)))
+
+
+def arc_to_chord(distance):
+    """球面距离 (米) -> 单位球上的弦长"""
+    return 2.0 * np.sin(np.minimum(np.asarray(distance, dtype=np.float64), np.pi * EARTH_RADIUS) / (2.0 * EARTH_RADIUS))
+
+
+def chord_to_arc(chord):
+    """单位球上的弦长 -> 球面距离 (米)"""
+    return 2.0 * EARTH_RADIUS * np.arcsin(np.clip(np.asarray(chord, dtype=np.float64) / 2.0, 0.0, 1.0))
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """逐元素计算两点间的Haversine距离 (米)，输入按numpy规则广播"""
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2.0 * EARTH_RADIUS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def vincenty(lat1, lon1, lat2, lon2, tol: float = 1e-12, max_iter: int = 200):
+    """
+    逐元素计算WGS84椭球面上的测地线距离 (米，Vincenty反算公式)，输入按numpy规则广播
+    近对跖点处迭代可能不收敛，对应结果为NaN
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (lat1, lon1, lat2, lon2)))
+    u1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    u2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    big_l = np.radians(lon2 - lon1)
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+    lam = big_l.copy()
+    converged = np.zeros(lam.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma > 0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # 赤道线上cos2_alpha为0，此时cos_2sigma_m取0
+            cos_2sigma_m = np.where(cos2_alpha > 0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha, 0.0)
+            c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+            lam_new = big_l + (1 - c) * WGS84_F * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam_new - lam) <= tol
+            lam = lam_new
+            if converged.all():
+                break
+
+        u_sq = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = b * sin_sigma * (cos_2sigma_m + b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distance = WGS84_B * a * (sigma - delta_sigma)
+    return np.where(converged, distance, np.nan)
+
+
+def _half_angle_terms(lat, lon):
+    """Haversine矩阵所需的逐点三角函数 (半角正弦/余弦及cos(lat))，每个点只计算一次"""
+    half_lat = np.radians(lat) / 2
+    half_lon = np.radians(lon) / 2
+    return np.sin(half_lat), np.cos(half_lat), np.sin(half_lon), np.cos(half_lon), np.cos(2 * half_lat)
+
+
+def _haversine_block(terms1, terms2) -> np.ndarray:
+    """
+    由逐点三角函数计算Haversine距离块
+    利用 sin(x-y) = sin x cos y - cos x sin y，块内只剩乘加运算和一次arcsin
+    """
+    sin_lat1, cos_lat1, sin_lon1, cos_lon1, cos_phi1 = (t[:, None] for t in terms1)
+    sin_lat2, cos_lat2, sin_lon2, cos_lon2, cos_phi2 = (t[None, :] for t in terms2)
+    a = sin_lat1 * cos_lat2
+    a -= cos_lat1 * sin_lat2
+    a *= a
+    b = sin_lon1 * cos_lon2
+    b -= cos_lon1 * sin_lon2
+    b *= b
+    b *= cos_phi1
+    b *= cos_phi2
+    a += b
+    np.sqrt(a, out=a)
+    np.minimum(a, 1.0, out=a)
+    np.arcsin(a, out=a)
+    a *= 2.0 * EARTH_RADIUS
+    return a
+
+
+_DISTANCE_METHODS = ('haversine', 'vincenty')
+
+
+def distance_matrix(lat1, lon1, lat2, lon2, method: str = 'haversine', dtype=np.float64,
+                    chunk_bytes: int = DEFAULT_CHUNK_BYTES, out: np.ndarray = None) -> np.ndarray:
+    """
+    计算 (N, M) 距离矩阵 (米)，第i行为第i个点 (lat1, lon1) 到所有点 (lat2, lon2) 的距离
+
+    Args:
+        method: 'haversine' (球面，与MATLAB侧一致) 或 'vincenty' (WGS84椭球)
+        dtype: 输出矩阵的数据类型，大规模场景可用float32减半内存
+        chunk_bytes: 每个分块中间结果的内存上限，按行分块计算
+        out: 可选的预分配输出数组 (例如np.memmap)
+
+    Raises:
+        ValueError: method不支持或out形状不匹配
+    """
+    if method not in _DISTANCE_METHODS:
+        raise ValueError(f"不支持的距离计算方法: {method}，可选: {list(_DISTANCE_METHODS)}")
+    lat1 = np.atleast_1d(np.asarray(lat1, dtype=np.float64))
+    lon1 = np.atleast_1d(np.asarray(lon1, dtype=np.float64))
+    lat2 = np.atleast_1d(np.asarray(lat2, dtype=np.float64))
+    lon2 = np.atleast_1d(np.asarray(lon2, dtype=np.float64))
+    n, m = len(lat1), len(lat2)
+    if out is None:
+        out = np.empty((n, m), dtype=dtype)
+    elif out.shape != (n, m):
+        raise ValueError(f"out形状应为 {(n, m)}，实际为 {out.shape}")
+
+    # Vincenty迭代过程中同时存在约十几个同尺寸的中间数组，Haversine只有两个
+    temporaries = 16 if method == 'vincenty' else 2
+    rows_per_chunk = max(1, chunk_bytes // (max(m, 1) * 8 * temporaries))
+    if method == 'haversine':
+        terms1 = _half_angle_terms(lat1, lon1)
+        terms2 = _half_angle_terms(lat2, lon2)
+    for start in range(0, n, rows_per_chunk):
+        end = min(start + rows_per_chunk, n)
+        if method == 'haversine':
+            out[start:end] = _haversine_block([t[start:end] for t in terms1], terms2)
+        else:
+            out[start:end] = vincenty(lat1[start:end, None], lon1[start:end, None], lat2[None, :], lon2[None, :])
+    return out
+
+
+def geodetic_to_ecef(lat, lon, height=0.0) -> np.ndarray:
+    """WGS84大地坐标 (度, 度, 米) -> ECEF坐标 (米)，形状为 (N, 3)"""
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    height = np.asarray(height, dtype=np.float64)
+    sin_lat, cos_lat = np.sin(lat_rad), np.cos(lat_rad)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    x = (n + height) * cos_lat * np.cos(lon_rad)
+    y = (n + height) * cos_lat * np.sin(lon_rad)
+    z = (n * (1 - WGS84_E2) + height) * sin_lat
+    return np.column_stack(np.broadcast_arrays(x, y, z))
+
+
+def geodetic_to_enu(lat, lon, height, lat0: float, lon0: float, height0: float = 0.0) -> np.ndarray:
+    """
+    WGS84大地坐标 -> 以 (lat0, lon0, height0) 为原点的局部东-北-天坐标 (米)
+    返回形状为 (N, 3) 的数组，列依次为 east, north, up
+    """
+    delta = geodetic_to_ecef(lat, lon, height) - geodetic_to_ecef(lat0, lon0, height0)
+    lat0_rad, lon0_rad = np.radians(lat0), np.radians(lon0)
+    sin_lat0, cos_lat0 = np.sin(lat0_rad), np.cos(lat0_rad)
+    sin_lon0, cos_lon0 = np.sin(lon0_rad), np.cos(lon0_rad)
+    rotation = np.array([
+        [-sin_lon0, cos_lon0, 0.0],
+        [-sin_lat0 * cos_lon0, -sin_lat0 * sin_lon0, cos_lat0],
+        [cos_lat0 * cos_lon0, cos_lat0 * sin_lon0, sin_lat0],
+    ])
+    return delta @ rotation.T
+
+
+def meters_to_degrees(d_north, d_east, lat):
+    """
+    在纬度lat处把北向/东向位移 (米) 换算为纬度/经度变化 (度)
+    球面近似，与MATLAB侧nrMobilityModel.updatePosition一致
+    """
+    d_lat = np.asarray(d_north, dtype=np.float64) / (np.pi / 180 * EARTH_RADIUS)
+    d_lon = np.asarray(d_east, dtype=np.float64) / (np.pi / 180 * EARTH_RADIUS * np.cos(np.radians(lat)))
+    return d_lat, d_lon
+
+
+def degrees_to_meters(d_lat, d_lon, lat):
+    """meters_to_degrees的逆变换：纬度/经度变化 (度) -> 北向/东向位移 (米)"""
+    d_north = np.asarray(d_lat, dtype=np.float64) * (np.pi / 180 * EARTH_RADIUS)
+    d_east = np.asarray(d_lon, dtype=np.float64) * (np.pi / 180 * EARTH_RADIUS * np.cos(np.radians(lat)))
+    return d_north, d_east
@@ -0,0 +1,300 @@
+"""
+大规模网络地图的分层渲染
+逐个添加 folium.Marker / Circle / PolyLine 时，每个实体都会在HTML中生成一段JS和一份弹窗HTML，
+数千个UE后文件达到数百MB，浏览器无法加载。这里把数据移到HTML旁边的两个数据文件中:
+- <输出>_data.js:   基站覆盖范围 (一个GeoJSON FeatureCollection)、基站与UE坐标、切片编码、移动方向线段
+- <输出>_popups.js: 弹窗所需的属性列与覆盖基站 (CSR)，第一次打开弹窗时才加载
+
+HTML中只有固定的加载脚本，大小与UE数量无关；UE在浏览器中作为一个聚类图层
+(Leaflet.markercluster + Canvas圆点) 一次性批量添加，弹窗内容在打开时由属性列生成。
+数据文件为 "window.<变量> = <JSON>;" 形式的脚本，直接用浏览器打开本地HTML (file://) 时也能加载。
+"""
+import json
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+import folium
+from branca.element import MacroElement
+from folium.plugins import MarkerCluster
+from jinja2 import Template
+
+DATA_VARIABLE = 'NETWORK_MAP_DATA'
+POPUP_VARIABLE = 'NETWORK_MAP_POPUPS'
+
+# 与draw.get_slice_color一致
+SLICE_COLORS = {'eMBB': 'blue', 'URLLC': 'red', 'mMTC': 'green'}
+DEFAULT_COLOR = 'gray'
+
+
+def sidecar_paths(output: str):
+    """HTML输出路径 -> (数据文件, 弹窗数据文件)"""
+    stem = os.path.splitext(output)[0]
+    return f"{stem}_data.js", f"{stem}_popups.js"
+
+
+def _column(items: List[Dict[str, Any]], *keys, default=None) -> list:
+    """配置字典列表中按嵌套键取出一列"""
+    values = []
+    for item in items:
+        value = item
+        for key in keys:
+            value = value.get(key, default) if isinstance(value, dict) else default
+        values.append(value)
+    return values
+
+
+def _codes(values: list):
+    """类别列 -> (编码, 类别表)"""
+    categories = sorted({str(v) for v in values})
+    lookup = {c: i for i, c in enumerate(categories)}
+    return [lookup[str(v)] for v in values], categories
+
+
+def _rounded(values, digits: int) -> list:
+    return np.round(np.asarray(values, dtype=np.float64), digits).tolist()
+
+
+def build_map_data(gnbs: List[Dict[str, Any]], ues: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """地图初始显示所需的数据: 覆盖范围GeoJSON、基站与UE坐标、切片及移动方向"""
+    gnb_lat = np.array(_column(gnbs, 'position', 'latitude'), dtype=np.float64)
+    gnb_lon = np.array(_column(gnbs, 'position', 'longitude'), dtype=np.float64)
+    coverage = {
+        'type': 'FeatureCollection',
+        'features': [{'type': 'Feature',
+                      'geometry': {'type': 'Point', 'coordinates': [round(lon, 6), round(lat, 6)]},
+                      'properties': {'radius': radius}}
+                     for lat, lon, radius in zip(gnb_lat.tolist(), gnb_lon.tolist(), _column(gnbs, 'radius'))],
+    }
+
+    ue_lat = np.array(_column(ues, 'position', 'latitude'), dtype=np.float64)
+    ue_lon = np.array(_column(ues, 'position', 'longitude'), dtype=np.float64)
+    slice_codes, slice_types = _codes(_column(ues, 'slice_type', default='eMBB'))
+
+    # 移动方向箭头，长度与draw.create_5g_network_map相同 (0.0005° × 速度/10)
+    speed = np.array(_column(ues, 'mobility_model', 'speed', default=0), dtype=np.float64)
+    direction = np.radians(np.array(_column(ues, 'mobility_model', 'direction', default=0), dtype=np.float64))
+    length = 0.0005 * (speed / 10)
+    moving = np.flatnonzero(speed > 0)
+
+    return {
+        'coverage': coverage,
+        'gnbs': {'name': _column(gnbs, 'name'), 'lat': _rounded(gnb_lat, 6), 'lon': _rounded(gnb_lon, 6)},
+        'ues': {
+            'name': _column(ues, 'name'),
+            'lat': _rounded(ue_lat, 6),
+            'lon': _rounded(ue_lon, 6),
+            'slice': slice_codes,
+        },
+        'slice_colors': [SLICE_COLORS.get(s, DEFAULT_COLOR) for s in slice_types],
+        'arrows': {
+            'ue': moving.tolist(),
+            'lat': _rounded(ue_lat[moving] + length[moving] * np.cos(direction[moving]), 6),
+            'lon': _rounded(ue_lon[moving] + length[moving] * np.sin(direction[moving]), 6),
+        },
+    }
+
+
+def build_popup_data(gnbs: List[Dict[str, Any]], ues: List[Dict[str, Any]], coverage) -> Dict[str, Any]:
+    """
+    弹窗所需的属性列
+    coverage为draw.ue_coverage的返回值 (覆盖基站CSR及最近基站)，没有基站时为None
+    """
+    slices = [' / '.join(f"{s['slice_type']}: QoS={s['qos_level']}" for s in g.get('slices', [])) for g in gnbs]
+    business_codes, business_types = _codes(_column(ues, 'business_type'))
+    slice_codes, slice_types = _codes(_column(ues, 'slice_type'))
+    popups = {
+        'gnbs': {
+            'id': _column(gnbs, 'id'),
+            'transmit_power': _column(gnbs, 'transmit_power'),
+            'noise_figure': _column(gnbs, 'noise_figure'),
+            'radius': _column(gnbs, 'radius'),
+            'num_transmit_antennas': _column(gnbs, 'num_transmit_antennas'),
+            'carrier_frequency': _column(gnbs, 'carrier_frequency'),
+            'channel_bandwidth': _column(gnbs, 'channel_bandwidth'),
+            'subcarrier_spacing': _column(gnbs, 'subcarrier_spacing'),
+            'num_resource_blocks': _column(gnbs, 'num_resource_blocks'),
+            'slices': slices,
+        },
+        'ues': {
+            'id': _column(ues, 'id'),
+            'business_type': business_codes,
+            'slice_type': slice_codes,
+            'priority': _column(ues, 'priority'),
+            'transmit_power': _column(ues, 'transmit_power'),
+            'noise_figure': _column(ues, 'noise_figure'),
+            'num_transmit_antennas': _column(ues, 'num_transmit_antennas'),
+            'speed': _column(ues, 'mobility_model', 'speed'),
+            'direction': _column(ues, 'mobility_model', 'direction'),
+        },
+        'business_types': business_types,
+        'slice_types': slice_types,
+    }
+    if coverage is not None:
+        offsets, indices, distances, nearest_idx, nearest_dist = coverage
+        popups['ues'].update({
+            'cover_offsets': np.asarray(offsets).tolist(),
+            'cover_gnb': np.asarray(indices).tolist(),
+            'cover_dist': _rounded(distances, 1),
+            'nearest': np.asarray(nearest_idx).tolist(),
+            'nearest_dist': _rounded(nearest_dist, 1),
+        })
+    return popups
+
+
+def write_sidecar(path: str, variable: str, payload: Dict[str, Any]):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"window.{variable} = ")
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        f.write(';\n')
+
+
+class SidecarNetworkLayers(MacroElement):
+    """从数据文件构建覆盖范围、基站、UE聚类和移动方向图层，弹窗在首次打开时加载弹窗数据文件"""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(map) {
+            var data = window.""" + DATA_VARIABLE + """;
+            var popups = null;
+            var waiting = [];
+            var renderer = L.canvas({padding: 0.5});
+
+            function withPopups(callback) {
+                if (popups) { callback(); return; }
+                waiting.push(callback);
+                if (waiting.length > 1) { return; }
+                var script = document.createElement('script');
+                script.src = {{ this.popup_src }};
+                script.onload = function() {
+                    popups = window.""" + POPUP_VARIABLE + """;
+                    waiting.forEach(function(f) { f(); });
+                    waiting = [];
+                };
+                document.head.appendChild(script);
+            }
+
+            function lazyPopup(layer, build) {
+                layer.bindPopup('加载中...', {maxWidth: 300});
+                layer.on('popupopen', function(e) {
+                    withPopups(function() { e.popup.setContent(build()); });
+                });
+            }
+
+            function gnbPopup(i) {
+                var g = popups.gnbs;
+                var html = '<b>' + data.gnbs.name[i] + '</b><br>' +
+                    'ID: ' + g.id[i] + '<br>' +
+                    '发射功率: ' + g.transmit_power[i] + ' dBm<br>' +
+                    '噪声系数: ' + g.noise_figure[i] + ' dB<br>' +
+                    '覆盖半径: ' + g.radius[i] + ' m<br>' +
+                    '天线数: ' + g.num_transmit_antennas[i] + '<br>' +
+                    '载波频率: ' + (g.carrier_frequency[i] / 1e9).toFixed(1) + ' GHz<br>' +
+                    '信道带宽: ' + (g.channel_bandwidth[i] / 1e6).toFixed(0) + ' MHz<br>' +
+                    '子载波间隔: ' + (g.subcarrier_spacing[i] / 1000).toFixed(0) + ' kHz<br>' +
+                    '资源块数: ' + g.num_resource_blocks[i];
+                if (g.slices[i]) {
+                    html += '<br><b>网络切片:</b><br>- ' + g.slices[i].split(' / ').join('<br>- ');
+                }
+                return html;
+            }
+
+            function uePopup(i) {
+                var u = popups.ues;
+                var html = '<b>' + data.ues.name[i] + '</b><br>' +
+                    'ID: ' + u.id[i] + '<br>' +
+                    '业务类型: ' + popups.business_types[u.business_type[i]] + '<br>' +
+                    '切片类型: ' + popups.slice_types[u.slice_type[i]] + '<br>' +
+                    '优先级: ' + u.priority[i] + '<br>' +
+                    '发射功率: ' + u.transmit_power[i] + ' dBm<br>' +
+                    '噪声系数: ' + u.noise_figure[i] + ' dB<br>' +
+                    '天线数: ' + u.num_transmit_antennas[i] + '<br>';
+                if (u.speed[i] !== null) {
+                    html += '移动速度: ' + u.speed[i] + ' m/s<br>移动方向: ' + u.direction[i] + '°<br>';
+                }
+                if (u.cover_offsets) {
+                    html += '<br><b>覆盖基站:</b><br>';
+                    var start = u.cover_offsets[i], end = u.cover_offsets[i + 1];
+                    for (var k = start; k < end; k++) {
+                        html += '- ' + data.gnbs.name[u.cover_gnb[k]] + ': ' + u.cover_dist[k].toFixed(1) + 'm (✓覆盖)<br>';
+                    }
+                    if (start === end) {
+                        html += '- 无覆盖, 最近基站 ' + data.gnbs.name[u.nearest[i]] + ': ' +
+                            u.nearest_dist[i].toFixed(1) + 'm (✗超出)<br>';
+                    }
+                }
+                return html;
+            }
+
+            var coverage = L.geoJSON(data.coverage, {
+                pointToLayer: function(feature, latlng) {
+                    return L.circle(latlng, {radius: feature.properties.radius, color: 'red', fillColor: 'red',
+                                             fillOpacity: 0.1, weight: 2, renderer: renderer, interactive: false});
+                }
+            }).addTo(map);
+
+            var gnbIcon = L.AwesomeMarkers.icon({icon: 'broadcast-tower', prefix: 'fa', markerColor: 'red'});
+            var gnbLayer = L.layerGroup();
+            data.gnbs.lat.forEach(function(lat, i) {
+                var marker = L.marker([lat, data.gnbs.lon[i]], {icon: gnbIcon}).bindTooltip(data.gnbs.name[i]);
+                lazyPopup(marker, function() { return gnbPopup(i); });
+                gnbLayer.addLayer(marker);
+            });
+            gnbLayer.addTo(map);
+
+            var ueLayer = L.markerClusterGroup({chunkedLoading: true, disableClusteringAtZoom: 18});
+            var ueMarkers = new Array(data.ues.lat.length);
+            for (var i = 0; i < ueMarkers.length; i++) {
+                var marker = L.circleMarker([data.ues.lat[i], data.ues.lon[i]], {
+                    radius: 5, weight: 1, color: data.slice_colors[data.ues.slice[i]],
+                    fillOpacity: 0.8, renderer: renderer});
+                marker.bindTooltip(data.ues.name[i]);
+                lazyPopup(marker, (function(i) { return function() { return uePopup(i); }; })(i));
+                ueMarkers[i] = marker;
+            }
+            ueLayer.addLayers(ueMarkers);
+            ueLayer.addTo(map);
+
+            // 移动方向: 按切片颜色各一条多段线
+            var segments = data.slice_colors.map(function() { return []; });
+            data.arrows.ue.forEach(function(i, k) {
+                segments[data.ues.slice[i]].push([[data.ues.lat[i], data.ues.lon[i]],
+                                                  [data.arrows.lat[k], data.arrows.lon[k]]]);
+            });
+            var arrowLayer = L.layerGroup(segments.map(function(lines, s) {
+                return L.polyline(lines, {color: data.slice_colors[s], weight: 3, opacity: 0.8,
+                                          renderer: renderer, interactive: false});
+            }));
+
+            L.control.layers(null, {'覆盖范围': coverage, '基站': gnbLayer, '用户设备': ueLayer,
+                                    '移动方向': arrowLayer}).addTo(map);
+        })({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, data_src: str, popup_src: str):
+        super().__init__()
+        self._name = 'SidecarNetworkLayers'
+        self.data_src = json.dumps(data_src)
+        self.popup_src = json.dumps(popup_src)
+
+    def render(self, **kwargs):
+        # 数据文件和聚类插件放在<head>中，在地图脚本执行前同步加载
+        figure = self.get_root()
+        for name, url in MarkerCluster.default_js:
+            figure.header.add_child(folium.JavascriptLink(url), name=name)
+        for name, url in MarkerCluster.default_css:
+            figure.header.add_child(folium.CssLink(url), name=name)
+        figure.header.add_child(folium.JavascriptLink(json.loads(self.data_src)), name='network_map_data')
+        super().render(**kwargs)
+
+
+def add_sidecar_layers(m: folium.Map, gnbs: List[Dict[str, Any]], ues: List[Dict[str, Any]], output: str,
+                       coverage=None) -> List[str]:
+    """写入数据文件并在地图上添加从数据文件加载的图层，返回写入的文件路径"""
+    data_file, popup_file = sidecar_paths(output)
+    write_sidecar(data_file, DATA_VARIABLE, build_map_data(gnbs, ues))
+    write_sidecar(popup_file, POPUP_VARIABLE, build_popup_data(gnbs, ues, coverage))
+    # HTML中按相对路径引用，数据文件与HTML放在同一目录
+    m.add_child(SidecarNetworkLayers(os.path.basename(data_file), os.path.basename(popup_file)))
+    return [data_file, popup_file]
@@ -0,0 +1,388 @@
+"""
+5G NR仿真场景的MATLAB .mat导出工具
+直接从内存中的NetworkTable导出列式结构 (struct of arrays)：
+gNBs.latitude 为一个double列向量，而不是每个基站一个struct的cell数组，
+MATLAB侧 tools.createNRGNB / tools.createNRUE 按列读取
+
+超出MAT v5限制 (单变量2GB、必须整体在内存中写出) 的场景使用基于HDF5的MAT v7.3格式：
+UE列作为顶层变量 UEs_<列名> 分块压缩写入，MATLAB侧可用matfile按范围读取
+"""
+import datetime
+import itertools
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+from scipy.io import savemat
+
+try:
+    import h5py
+except ImportError:  # MAT v7.3导出需要h5py
+    h5py = None
+
+# 默认天线高度 (米)，生成器不产生高度信息
+DEFAULT_GNB_HEIGHT = 25.0
+DEFAULT_UE_HEIGHT = 1.5
+
+# MAT v5单个变量的大小上限 (字节)
+MAT5_VARIABLE_LIMIT = 2 ** 31
+
+
+def _double(values) -> np.ndarray:
+    """MATLAB侧按double参与运算，统一转换避免single/整数类型的运算语义"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def _categories(names: Sequence[str]) -> np.ndarray:
+    """类别名列表 -> char矩阵，MATLAB侧用cellstr还原"""
+    return np.array(list(names), dtype=np.str_)
+
+
+def gnb_columns(table, height: float = DEFAULT_GNB_HEIGHT) -> Dict[str, np.ndarray]:
+    """
+    基站列数据，切片按CSR存储:
+    第i个基站的切片为 sliceOffsets(i)+1 : sliceOffsets(i+1)，sliceType为sliceCategories中从0开始的编码
+    """
+    gnbs = table.gnbs
+    columns = {name: _double(gnbs[name]) for name in table.GNB_COLUMNS}
+    columns['height'] = np.full(table.num_gnbs, height, dtype=np.float64)
+    columns['sliceOffsets'] = _double(table.slice_offsets)
+    columns['sliceType'] = _double(table.slices['sliceType'])
+    columns['qosLevel'] = _double(table.slices['qosLevel'])
+    columns['minBandwidthGuarantee'] = _double(table.slices['minBandwidthGuarantee'])
+    columns['resourceWeight'] = table.slice_resource_weights()
+    columns['sliceCategories'] = _categories(table.slice_categories)
+    return columns
+
+
+def ue_columns(table, height: float = DEFAULT_UE_HEIGHT) -> Dict[str, np.ndarray]:
+    """UE列数据，sliceType / businessType 为从0开始的类别编码"""
+    columns = {name: _double(table.ues[name]) for name in table.UE_COLUMNS}
+    columns['height'] = np.full(table.num_ues, height, dtype=np.float64)
+    columns['sliceCategories'] = _categories(table.slice_categories)
+    columns['businessCategories'] = _categories(table.business_categories)
+    return columns
+
+
+def interference_group_columns(interference_groups: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    干扰组列数据 (interference_groups条目为snake_case字典，与YAML导出一致)
+    第k组的基站ID为 gnbIds(gnbIdOffsets(k)+1 : gnbIdOffsets(k+1))
+    """
+    gnb_ids = [group['gnb_ids'] for group in interference_groups]
+    offsets = np.zeros(len(gnb_ids) + 1, dtype=np.float64)
+    np.cumsum([len(ids) for ids in gnb_ids], out=offsets[1:])
+    return {
+        'groupId': _double([group['group_id'] for group in interference_groups]),
+        'carrierFrequency': _double([group['carrier_frequency'] for group in interference_groups]),
+        'channelBandwidth': _double([group['channel_bandwidth'] for group in interference_groups]),
+        'subcarrierSpacing': _double([group['subcarrier_spacing'] for group in interference_groups]),
+        'numResourceBlocks': _double([group['num_resource_blocks'] for group in interference_groups]),
+        'gnbIdOffsets': offsets,
+        'gnbIds': _double([gnb_id for ids in gnb_ids for gnb_id in ids]),
+    }
+
+
+def interference_graph_columns(graph, gnb_ids) -> Dict[str, np.ndarray]:
+    """
+    干扰图 (interference.InterferenceGraph) 的列数据，行号换为基站ID
+    ID为gnbIds(i)的基站的干扰基站为 neighborIds(offsets(i)+1 : offsets(i+1))，距离为distance中的对应项
+    """
+    return {
+        'gnbIds': _double(gnb_ids),
+        'offsets': _double(graph.offsets),
+        'neighborIds': _double(np.asarray(gnb_ids)[graph.neighbors]),
+        'distance': _double(graph.distances),
+    }
+
+
+def area_struct(area_bounds: Sequence[float]) -> Dict[str, float]:
+    """(lat_min, lat_max, lon_min, lon_max) -> main.m使用的area结构体"""
+    lat_min, lat_max, lon_min, lon_max = area_bounds
+    return {
+        'latitudeTopLeft': float(lat_max),
+        'longitudeTopLeft': float(lon_min),
+        'latitudeBottomRight': float(lat_min),
+        'longitudeBottomRight': float(lon_max),
+    }
+
+
+def network_to_mat_dict(table, interference_groups: List[Dict[str, Any]] = None,
+                        area_bounds: Sequence[float] = None, gnb_height: float = DEFAULT_GNB_HEIGHT,
+                        ue_height: float = DEFAULT_UE_HEIGHT, interference_graph=None) -> Dict[str, Any]:
+    """
+    构造savemat使用的字典，键名与simulation/main.m读取的变量一致
+    interference_graph: 可选的干扰图，给出时NetSimuEnv按图中邻居计算干扰
+    """
+    mdict = {
+        'gNBs': gnb_columns(table, gnb_height),
+        'UEs': ue_columns(table, ue_height),
+        'interferenceGroups': interference_group_columns(interference_groups or []),
+    }
+    if area_bounds is not None:
+        mdict['area'] = area_struct(area_bounds)
+    if interference_graph is not None:
+        mdict['interferenceGraph'] = interference_graph_columns(interference_graph, table.gnbs['id'])
+    return mdict
+
+
+def fits_mat5(table, interference_graph=None) -> bool:
+    """
+    按double估算最大的变量 (UEs / gNBs / interferenceGraph结构体) 能否写入MAT v5文件，
+    留出约10%的余量给结构体头部和字段名
+    """
+    num_slices = len(table.slices['sliceType'])
+    sizes = [
+        table.num_ues * (len(table.UE_COLUMNS) + 1),
+        table.num_gnbs * (len(table.GNB_COLUMNS) + 2) + num_slices * 4,
+    ]
+    if interference_graph is not None:
+        sizes.append(table.num_gnbs * 2 + len(interference_graph.neighbors) * 2)
+    return max(sizes) * 8 < 0.9 * MAT5_VARIABLE_LIMIT
+
+
+def save_network_mat(mat_file: str, table, interference_groups: List[Dict[str, Any]] = None,
+                     area_bounds: Sequence[float] = None, gnb_height: float = DEFAULT_GNB_HEIGHT,
+                     ue_height: float = DEFAULT_UE_HEIGHT, interference_graph=None):
+    """
+    把NetworkTable直接导出为列式.mat文件，不经过YAML和逐实体字典
+
+    Args:
+        mat_file: .mat文件保存路径
+        table: NetworkTable
+        interference_groups: 干扰组列表 (snake_case字典，含gnb_ids)
+        area_bounds: (lat_min, lat_max, lon_min, lon_max)，给出时写入area结构体
+        interference_graph: 干扰图 (interference.InterferenceGraph)，给出时写入interferenceGraph结构体
+    """
+    mdict = network_to_mat_dict(table, interference_groups, area_bounds, gnb_height, ue_height,
+                                interference_graph)
+    savemat(mat_file, mdict, oned_as='column')
+    print(f"网络数据已按列导出到 '{mat_file}'")
+
+
+# ---------------------------------------------------------------------------
+# MAT v7.3 (HDF5) 写入
+# ---------------------------------------------------------------------------
+
+# MAT v7.3文件前512字节为用户块，存放MATLAB文件头
+MAT73_USERBLOCK_SIZE = 512
+
+# UE列变量名前缀，MATLAB侧 tools.loadUEColumns 按此前缀还原UEs结构体
+UE_COLUMN_PREFIX = 'UEs_'
+
+# 每次写入的UE行数
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+_MATLAB_CLASSES = {
+    np.dtype(np.float64): 'double',
+    np.dtype(np.float32): 'single',
+    np.dtype(np.int8): 'int8',
+    np.dtype(np.int16): 'int16',
+    np.dtype(np.int32): 'int32',
+    np.dtype(np.int64): 'int64',
+    np.dtype(np.uint8): 'uint8',
+    np.dtype(np.uint16): 'uint16',
+    np.dtype(np.uint32): 'uint32',
+    np.dtype(np.uint64): 'uint64',
+}
+
+
+def _matlab_class(dtype: np.dtype) -> str:
+    if dtype not in _MATLAB_CLASSES:
+        raise TypeError(f"不支持写入MAT v7.3的数据类型: {dtype}")
+    return _MATLAB_CLASSES[dtype]
+
+
+class Mat73Writer:
+    """
+    MAT v7.3 (HDF5) 文件写入器
+    write() 写入普通变量 (字典为struct，字符串为char，字典列表等为cell)；
+    append_columns() 以追加方式分块写入列向量，内存占用只与块大小有关
+
+    用法:
+        with Mat73Writer('scenario.mat') as writer:
+            writer.write('gNBs', gnb_columns(table))
+            for block in blocks:
+                writer.append_columns(block)
+    """
+
+    def __init__(self, mat_file: str, compression: str = 'gzip', compression_level: int = 4,
+                 chunk_rows: int = 1 << 16):
+        if h5py is None:
+            raise ImportError("写入MAT v7.3文件需要安装h5py: pip install h5py")
+        self.mat_file = mat_file
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunk_rows = chunk_rows
+        self._file = h5py.File(mat_file, 'w', userblock_size=MAT73_USERBLOCK_SIZE, libver='earliest')
+        self._refs = None
+        self._ref_count = itertools.count()
+        self._columns = {}
+
+    def __enter__(self) -> 'Mat73Writer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """关闭HDF5文件并写入MATLAB文件头"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        created = datetime.datetime.now().strftime('%a %b %d %H:%M:%S %Y')
+        text = f"MATLAB 7.3 MAT-file, Platform: GLNXA64, Created on: {created} HDF5 schema 1.00 ."
+        header = text.encode('ascii').ljust(116, b' ') + b'\x00' * 8 + b'\x00\x02' + b'IM'
+        with open(self.mat_file, 'r+b') as f:
+            f.write(header)
+
+    def write(self, name: str, value: Any):
+        """写入一个顶层变量"""
+        self._write_value(self._file, name, value)
+
+    def append_columns(self, block: Dict[str, np.ndarray], prefix: str = UE_COLUMN_PREFIX):
+        """
+        追加一块列数据，每列写为顶层列向量变量 <prefix><列名>
+        各块的列名和dtype需一致，数据分块压缩存储
+        """
+        for name, values in block.items():
+            values = np.ascontiguousarray(values)
+            if values.ndim != 1:
+                raise ValueError(f"列 {name} 必须是一维数组")
+            var_name = prefix + name
+            dataset = self._columns.get(var_name)
+            if dataset is None:
+                # MATLAB按列存储，N×1列向量在HDF5中的形状为(1, N)
+                dataset = self._file.create_dataset(
+                    var_name, shape=(1, 0), maxshape=(1, None), dtype=values.dtype,
+                    chunks=(1, self.chunk_rows), compression=self.compression,
+                    compression_opts=self.compression_level, shuffle=True)
+                dataset.attrs['MATLAB_class'] = np.bytes_(_matlab_class(values.dtype))
+                self._columns[var_name] = dataset
+            start = dataset.shape[1]
+            dataset.resize((1, start + len(values)))
+            dataset[0, start:] = values
+
+    def _refs_group(self):
+        if self._refs is None:
+            self._refs = self._file.require_group('#refs#')
+        return self._refs
+
+    def _write_value(self, parent, name: str, value: Any):
+        if isinstance(value, dict):
+            group = parent.create_group(name)
+            group.attrs['MATLAB_class'] = np.bytes_('struct')
+            field_dtype = h5py.vlen_dtype(np.dtype('S1'))
+            fields = np.empty(len(value), dtype=object)
+            for i, key in enumerate(value):
+                fields[i] = np.array(list(key), dtype='S1')
+            group.attrs.create('MATLAB_fields', fields, dtype=field_dtype)
+            for key, item in value.items():
+                self._write_value(group, key, item)
+        elif isinstance(value, str):
+            self._write_char(parent, name, [value])
+        elif isinstance(value, (list, tuple)):
+            if value and all(isinstance(item, str) for item in value):
+                self._write_char(parent, name, list(value))
+            elif all(isinstance(item, (bool, int, float, np.number)) for item in value):
+                self._write_array(parent, name, np.asarray(value, dtype=np.float64))
+            else:
+                self._write_cell(parent, name, value)
+        elif value is None:
+            self._write_array(parent, name, np.zeros((0, 0)))
+        elif isinstance(value, (bool, np.bool_)):
+            dataset = parent.create_dataset(name, data=np.array([[int(value)]], dtype=np.uint8))
+            dataset.attrs['MATLAB_class'] = np.bytes_('logical')
+            dataset.attrs['MATLAB_int_decode'] = np.int32(1)
+        elif isinstance(value, (int, float, np.number)):
+            self._write_array(parent, name, np.array([[value]], dtype=np.float64))
+        else:
+            array = np.asarray(value)
+            if array.dtype.kind in ('U', 'S'):
+                self._write_char(parent, name, [str(item) for item in array.ravel()])
+            else:
+                self._write_array(parent, name, array)
+
+    def _write_array(self, parent, name: str, array: np.ndarray):
+        if array.dtype == np.bool_:
+            array = array.astype(np.uint8)
+        matlab_class = _matlab_class(array.dtype)
+        if array.ndim == 1:
+            array = array.reshape(-1, 1)  # 一维数组写为N×1列向量 (HDF5形状为(1, N))，与savemat(oned_as='column')一致
+        if array.size == 0:
+            # 空数组以维度向量表示
+            dims = np.array(array.shape[::-1] if array.ndim else (0, 0), dtype=np.uint64)
+            dataset = parent.create_dataset(name, data=dims)
+            dataset.attrs['MATLAB_empty'] = np.uint8(1)
+        else:
+            dataset = parent.create_dataset(name, data=np.ascontiguousarray(array.T) if array.ndim > 1 else array)
+        dataset.attrs['MATLAB_class'] = np.bytes_(matlab_class)
+
+    def _write_char(self, parent, name: str, strings: List[str]):
+        """字符串列表 -> MATLAB char矩阵 (每行一个字符串，右侧补空格)"""
+        width = max(len(item) for item in strings)
+        chars = np.array([[ord(c) for c in item.ljust(width)] for item in strings], dtype=np.uint16)
+        if chars.size == 0:
+            dataset = parent.create_dataset(name, data=np.array([len(strings), 0], dtype=np.uint64))
+            dataset.attrs['MATLAB_empty'] = np.uint8(1)
+        else:
+            dataset = parent.create_dataset(name, data=np.ascontiguousarray(chars.T))
+        dataset.attrs['MATLAB_class'] = np.bytes_('char')
+        dataset.attrs['MATLAB_int_decode'] = np.int32(2)
+
+    def _write_cell(self, parent, name: str, items: Sequence[Any]):
+        """列表 -> 1×N cell，元素存放在#refs#组中并以对象引用关联"""
+        refs_group = self._refs_group()
+        refs = np.empty((len(items), 1), dtype=h5py.ref_dtype)
+        for i, item in enumerate(items):
+            ref_name = f"c{next(self._ref_count)}"
+            self._write_value(refs_group, ref_name, item)
+            refs[i, 0] = refs_group[ref_name].ref
+        dataset = parent.create_dataset(name, data=refs, dtype=h5py.ref_dtype)
+        dataset.attrs['MATLAB_class'] = np.bytes_('cell')
+
+
+def savemat73(mat_file: str, mdict: Dict[str, Any]):
+    """与scipy.io.savemat类似的接口，写出MAT v7.3文件"""
+    with Mat73Writer(mat_file) as writer:
+        for name, value in mdict.items():
+            writer.write(name, value)
+
+
+def iter_ue_column_blocks(table, block_size: int = DEFAULT_BLOCK_SIZE,
+                          height: float = DEFAULT_UE_HEIGHT) -> Iterable[Dict[str, np.ndarray]]:
+    """按块产生UE列数据 (double)，每块只转换block_size行"""
+    for start in range(0, table.num_ues, block_size):
+        end = min(start + block_size, table.num_ues)
+        block = {name: _double(table.ues[name][start:end]) for name in table.UE_COLUMNS}
+        block['height'] = np.full(end - start, height, dtype=np.float64)
+        yield block
+
+
+def save_network_mat73(mat_file: str, table, interference_groups: List[Dict[str, Any]] = None,
+                       area_bounds: Sequence[float] = None, gnb_height: float = DEFAULT_GNB_HEIGHT,
+                       ue_height: float = DEFAULT_UE_HEIGHT, ue_blocks: Iterable[Dict[str, np.ndarray]] = None,
+                       block_size: int = DEFAULT_BLOCK_SIZE, interference_graph=None):
+    """
+    把网络数据导出为MAT v7.3文件
+    gNBs / interferenceGroups / area / interferenceGraph 与save_network_mat一致；
+    UE列写为顶层变量 UEs_<列名>，分块压缩，MATLAB侧用 tools.loadUEColumns 读取 (可按范围)
+
+    Args:
+        ue_blocks: UE列数据块的迭代器，给出时代替table中的UE，可用于边生成边写出
+    """
+    if ue_blocks is None:
+        ue_blocks = iter_ue_column_blocks(table, block_size, ue_height)
+
+    with Mat73Writer(mat_file) as writer:
+        writer.write('gNBs', gnb_columns(table, gnb_height))
+        writer.write('interferenceGroups', interference_group_columns(interference_groups or []))
+        if area_bounds is not None:
+            writer.write('area', area_struct(area_bounds))
+        if interference_graph is not None:
+            writer.write('interferenceGraph', interference_graph_columns(interference_graph, table.gnbs['id']))
+        writer.write(UE_COLUMN_PREFIX + 'sliceCategories', list(table.slice_categories))
+        writer.write(UE_COLUMN_PREFIX + 'businessCategories', list(table.business_categories))
+        for block in ue_blocks:
+            writer.append_columns(block)
+    print(f"网络数据已按列导出到 '{mat_file}' (MAT v7.3)")
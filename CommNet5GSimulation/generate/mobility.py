@@ -0,0 +1,344 @@
+"""
+UE移动计算 (与MATLAB侧nrMobilityModel / nrUserEquipment.move一致)
+所有UE的位移按数组一次计算；MobilityEngine按步推进全部UE并给出覆盖丢失掩码
+
+注: calculateDisplacement先把方向换算为 math_angle = 90 - direction，
+    再取 北向 = d*cos(math_angle)、东向 = d*sin(math_angle)，
+    即实际运动方向为从正东起逆时针的direction度 (与draw.py箭头使用的罗盘方向不同)。
+    这里保持与仿真一致。
+
+用法 (基准测试):
+    python mobility.py --ues 1000000 --gnbs 1000 --steps 20 --model gauss_markov
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo import EARTH_RADIUS, haversine
+
+# 每度纬度对应的米数 (calculateDisplacement中的 pi/180 * R)
+METERS_PER_DEGREE = np.pi / 180 * EARTH_RADIUS
+
+
+def velocity_components(speed, direction) -> Tuple[np.ndarray, np.ndarray]:
+    """速度 (m/s) 与方向 (度) -> (北向速度, 东向速度)，语义同calculateDisplacement"""
+    # cos(90° - direction) = sin(direction)，sin(90° - direction) = cos(direction)
+    angle = np.radians(np.asarray(direction, dtype=np.float64))
+    speed = np.asarray(speed, dtype=np.float64)
+    return speed * np.sin(angle), speed * np.cos(angle)
+
+
+def displacement(speed, direction, dt: float, lat) -> Tuple[np.ndarray, np.ndarray]:
+    """dt秒内的经纬度位移 (度)，与nrMobilityModel.calculateDisplacement一致"""
+    v_north, v_east = velocity_components(speed, direction)
+    d_lat = v_north * dt / METERS_PER_DEGREE
+    d_lon = v_east * dt / (METERS_PER_DEGREE * np.cos(np.radians(np.asarray(lat, dtype=np.float64))))
+    return d_lat, d_lon
+
+
+def constant_velocity_tracks(lat, lon, speed, direction, num_steps: int,
+                             dt: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    匀速直线运动的轨迹，与逐步调用nrUserEquipment.move的结果一致
+    返回 (纬度, 经度)，形状为 (num_steps, UE数)，第0步为初始位置
+
+    纬度每步的增量恒定；经度增量依赖上一步的纬度，用累加一次算出所有步
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    v_north, v_east = velocity_components(speed, direction)
+    steps = np.arange(num_steps, dtype=np.float64)[:, None]
+    lat_tracks = lat[None, :] + steps * (v_north * dt / METERS_PER_DEGREE)[None, :]
+    d_lon = (v_east * dt / METERS_PER_DEGREE)[None, :] / np.cos(np.radians(lat_tracks[:-1]))
+    lon_tracks = np.empty_like(lat_tracks)
+    lon_tracks[0] = lon
+    np.cumsum(d_lon, axis=0, out=lon_tracks[1:])
+    lon_tracks[1:] += lon[None, :]
+    return lat_tracks, lon_tracks
+
+
+MOBILITY_MODELS = ('constant', 'random_waypoint', 'gauss_markov')
+
+# 覆盖判断的容差 (米): 距覆盖边界的余量低于该值的UE用Haversine距离重新判断
+COVERAGE_TOLERANCE = 1.0
+
+
+@dataclass
+class MobilityConfig:
+    """移动引擎参数，速度范围默认与NRDataGenerator.generate_mobility_model一致 (0-120 km/h)"""
+    model: str = 'constant'          # 'constant' / 'random_waypoint' / 'gauss_markov'
+    dt: float = 1.0                  # 时间步长 (秒)
+    speed_range: Tuple[float, float] = (0.0, 120 / 3.6)
+    pause_time: float = 0.0          # random_waypoint: 到达路点后的停留时间 (秒)
+    alpha: float = 0.75              # gauss_markov: 记忆程度 (0为完全随机，1为匀速直线)
+    speed_std: float = 2.0           # gauss_markov: 速度扰动标准差 (m/s)
+    direction_std: float = 30.0      # gauss_markov: 方向扰动标准差 (度)
+    seed: Optional[int] = None
+
+
+class MobilityEngine:
+    """
+    所有UE位置的按步推进，替代NetSimuEnv.ueMobility中逐UE的move / 覆盖判断循环
+    状态为列数组 (纬度、经度、速度、方向)，每步对全部UE做一次数组运算:
+    - constant:        匀速直线 (即nrUserEquipment.move)
+    - random_waypoint: 在area_bounds内随机选路点，以speed_range内的随机速度直线前往，到达后停留pause_time
+    - gauss_markov:    速度和方向按一阶高斯-马尔可夫过程围绕各UE的初始值变化
+    越出area_bounds的UE按边界镜面反射 (位置和速度分量同时翻转)
+
+    给出服务基站 (set_serving) 后，step返回本步移出服务基站覆盖范围的UE掩码，
+    这些UE的服务基站被置为-1 (对应MATLAB中gnbNodeId = NaN)。
+    覆盖判断是增量的: 每个UE记录到覆盖边界的余量，每步减去本步移动距离，
+    只有余量耗尽的UE才重新计算到服务基站的Haversine距离
+    """
+
+    def __init__(self, lat, lon, speed, direction, area_bounds: Sequence[float], config: MobilityConfig = None):
+        if config is None:
+            config = MobilityConfig()
+        if config.model not in MOBILITY_MODELS:
+            raise ValueError(f"不支持的移动模型: {config.model}")
+        self.config = config
+        self.area_bounds = tuple(float(b) for b in area_bounds)
+        self.rng = np.random.default_rng(config.seed)
+        self.lat = np.array(lat, dtype=np.float64)
+        self.lon = np.array(lon, dtype=np.float64)
+        self.speed = np.array(speed, dtype=np.float64)
+        self.direction = np.mod(np.array(direction, dtype=np.float64), 360)
+        self.time = 0.0
+        self.steps = 0
+
+        # 每步的北向 / 东向位移 (纬度度数)，只在速度或方向变化时重新计算；经度位移 = d_east / cos(纬度)
+        self.d_north = np.empty_like(self.lat)
+        self.d_east = np.empty_like(self.lat)
+        self._step_distance = np.empty_like(self.lat)
+        self._buffer = np.empty_like(self.lat)
+        self._buffer32 = np.empty(self.num_ues, dtype=np.float32)
+        self._update_velocity(slice(None))
+        if config.model == 'gauss_markov':
+            self.mean_speed = self.speed.copy()
+            self.mean_direction = self.direction.copy()
+        elif config.model == 'random_waypoint':
+            self.waypoint_lat = np.empty_like(self.lat)
+            self.waypoint_lon = np.empty_like(self.lon)
+            self.remaining = np.empty_like(self.lat)
+            self.pause_left = np.zeros_like(self.lat)
+            self._new_waypoints(np.arange(self.num_ues))
+        self.set_serving(np.full(self.num_ues, -1, dtype=np.int64), [], [], [])
+
+    @classmethod
+    def from_table(cls, table, area_bounds: Sequence[float], config: MobilityConfig = None) -> 'MobilityEngine':
+        """由NetworkTable构造，已连接 (connectionState为1) 的UE以gnbNodeId对应的基站作为服务基站"""
+        ues, gnbs = table.ues, table.gnbs
+        engine = cls(ues['latitude'], ues['longitude'], ues['speed'], ues['direction'], area_bounds, config)
+        serving = np.where(ues['connectionState'] == 1, table.gnb_rows(ues['gnbNodeId']), -1)
+        engine.set_serving(serving, gnbs['latitude'], gnbs['longitude'], gnbs['radius'])
+        return engine
+
+    @property
+    def num_ues(self) -> int:
+        return len(self.lat)
+
+    def _update_velocity(self, rows):
+        """按速度和方向重新计算rows中UE的每步位移"""
+        v_north, v_east = velocity_components(self.speed[rows], self.direction[rows])
+        self._set_velocity(rows, v_north, v_east)
+
+    def _set_velocity(self, rows, v_north, v_east):
+        scale = self.config.dt / METERS_PER_DEGREE
+        self.d_north[rows] = v_north * scale
+        self.d_east[rows] = v_east * scale
+        self._step_distance[rows] = self.speed[rows] * self.config.dt
+
+    def set_serving(self, serving, gnb_lat, gnb_lon, gnb_radius):
+        """设置服务基站 (基站行号，-1表示未连接) 及基站位置和覆盖半径"""
+        self.serving = np.array(serving, dtype=np.int64)
+        self.gnb_lat = np.asarray(gnb_lat, dtype=np.float64)
+        self.gnb_lon = np.asarray(gnb_lon, dtype=np.float64)
+        self.gnb_radius = np.asarray(gnb_radius, dtype=np.float64)
+        # 到服务基站覆盖边界的余量 (米)，未连接的UE为inf
+        self.slack = np.full(self.num_ues, np.inf)
+        self._check_coverage(np.arange(self.num_ues))
+
+    def attach(self, ue_rows, gnb_rows):
+        """把ue_rows中的UE连接到gnb_rows (-1表示断开)"""
+        ue_rows = np.asarray(ue_rows, dtype=np.int64)
+        self.serving[ue_rows] = gnb_rows
+        self._check_coverage(ue_rows)
+
+    def _check_coverage(self, rows: np.ndarray) -> np.ndarray:
+        """重新计算rows中UE到服务基站的余量，返回其中已连接且不在覆盖范围内的UE"""
+        serving = self.serving[rows]
+        connected = serving >= 0
+        self.slack[rows[~connected]] = np.inf
+        rows, serving = rows[connected], serving[connected]
+        self.slack[rows] = self.gnb_radius[serving] - haversine(self.lat[rows], self.lon[rows],
+                                                                self.gnb_lat[serving], self.gnb_lon[serving])
+        return rows[self.slack[rows] < 0]
+
+    def _new_waypoints(self, rows: np.ndarray):
+        """为rows中的UE选择新路点和速度，并按calculateDisplacement的方向语义设置方向"""
+        lat_min, lat_max, lon_min, lon_max = self.area_bounds
+        n = len(rows)
+        self.waypoint_lat[rows] = self.rng.uniform(lat_min, lat_max, n)
+        self.waypoint_lon[rows] = self.rng.uniform(lon_min, lon_max, n)
+        self.speed[rows] = self.rng.uniform(*self.config.speed_range, n)
+        north = (self.waypoint_lat[rows] - self.lat[rows]) * METERS_PER_DEGREE
+        east = (self.waypoint_lon[rows] - self.lon[rows]) * METERS_PER_DEGREE * np.cos(np.radians(self.lat[rows]))
+        # velocity_components中 北向 = sin(direction)、东向 = cos(direction)
+        self.direction[rows] = np.mod(np.degrees(np.arctan2(north, east)), 360)
+        self.remaining[rows] = np.hypot(north, east)
+        self._update_velocity(rows)
+
+    def _step_gauss_markov(self):
+        cfg = self.config
+        n = self.num_ues
+        memory = np.sqrt(1 - cfg.alpha ** 2)
+        noise = self.rng.standard_normal(n)
+        noise *= memory * cfg.speed_std
+        noise += (1 - cfg.alpha) * self.mean_speed
+        self.speed *= cfg.alpha
+        self.speed += noise
+        np.clip(self.speed, *cfg.speed_range, out=self.speed)
+        # d = m + alpha * (d - m) + 噪声，方向差取 [-180, 180) 内的等价角
+        offset = np.mod(self.direction - self.mean_direction + 180, 360) - 180
+        offset *= cfg.alpha
+        offset += memory * cfg.direction_std * self.rng.standard_normal(n)
+        np.add(self.mean_direction, offset, out=self.direction)
+        # 每步对全部UE重算速度分量，三角函数用float32计算 (比float64快一个数量级，位移误差在微米级)
+        angle = self._buffer32
+        np.multiply(self.direction, np.pi / 180, out=angle, casting='same_kind')
+        self._set_velocity(slice(None), self.speed * np.sin(angle), self.speed * np.cos(angle))
+
+    def _step_waypoint(self) -> np.ndarray:
+        """推进路点状态，返回本步到达路点的UE (移动后位置直接置为路点)"""
+        pausing = np.flatnonzero(self.pause_left > 0)
+        if len(pausing):
+            self.pause_left[pausing] -= self.config.dt
+            resumed = pausing[self.pause_left[pausing] <= 0]
+            if len(resumed):
+                self._new_waypoints(resumed)
+        self.remaining -= self._step_distance
+        return np.flatnonzero(self.remaining <= 0)
+
+    def _arrive(self, arrived: np.ndarray):
+        self.lat[arrived] = self.waypoint_lat[arrived]
+        self.lon[arrived] = self.waypoint_lon[arrived]
+        if self.config.pause_time > 0:
+            self.pause_left[arrived] = self.config.pause_time
+            self.remaining[arrived] = np.inf
+            self.speed[arrived] = 0.0
+            self._update_velocity(arrived)
+        else:
+            self._new_waypoints(arrived)
+
+    def _reflect(self):
+        """越界的UE按边界镜面反射: 越过纬度边界翻转北向分量，越过经度边界翻转东向分量"""
+        lat_min, lat_max, lon_min, lon_max = self.area_bounds
+        for values, low, high, component, flip in ((self.lat, lat_min, lat_max, self.d_north, 0.0),
+                                                   (self.lon, lon_min, lon_max, self.d_east, 180.0)):
+            # 大多数步中越界的UE很少，先用最值判断，避免每步生成两个掩码
+            if values.min() >= low and values.max() <= high:
+                continue
+            out = np.flatnonzero((values < low) | (values > high))
+            v = values[out]
+            values[out] = np.clip(np.where(v < low, 2 * low - v, 2 * high - v), low, high)
+            component[out] = -component[out]
+            # 北向 = sin(direction)、东向 = cos(direction): 翻转北向为 -direction，翻转东向为 180 - direction
+            self.direction[out] = np.mod(flip - self.direction[out], 360)
+            if self.config.model == 'gauss_markov':
+                self.mean_direction[out] = np.mod(flip - self.mean_direction[out], 360)
+
+    def step(self) -> np.ndarray:
+        """
+        推进一个时间步，返回本步移出服务基站覆盖范围的UE掩码
+        这些UE被断开 (serving置为-1)，需要重新分配基站
+        """
+        arrived = None
+        if self.config.model == 'gauss_markov':
+            self._step_gauss_markov()
+        elif self.config.model == 'random_waypoint':
+            arrived = self._step_waypoint()
+        # 与calculateDisplacement一致: 经度位移使用移动前的纬度；
+        # cos(纬度)用float32计算，每步经度位移的相对误差约1e-7 (位移本身不超过约30米，即微米级)
+        cos_lat = self._buffer32
+        np.multiply(self.lat, np.pi / 180, out=cos_lat, casting='same_kind')
+        np.cos(cos_lat, out=cos_lat)
+        d_lon = self._buffer
+        np.divide(self.d_east, cos_lat, out=d_lon)
+        self.lon += d_lon
+        self.lat += self.d_north
+        if arrived is not None and len(arrived):
+            self._arrive(arrived)
+        self._reflect()
+
+        # 本步移动距离不超过 速度 × dt，余量耗尽的UE才需要重新计算距离
+        self.slack -= self._step_distance
+        lost_rows = self._check_coverage(np.flatnonzero(self.slack < COVERAGE_TOLERANCE))
+        if len(lost_rows):
+            self.attach(lost_rows, -1)
+        lost = np.zeros(self.num_ues, dtype=bool)
+        lost[lost_rows] = True
+        self.time += self.config.dt
+        self.steps += 1
+        return lost
+
+    def run(self, num_steps: int) -> Iterator[np.ndarray]:
+        """连续推进num_steps步，逐步产出覆盖丢失掩码"""
+        for _ in range(num_steps):
+            yield self.step()
+
+    def record(self, num_steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        """推进并记录轨迹，返回 (纬度, 经度)，形状为 (num_steps, UE数)，第0步为当前位置"""
+        lat_tracks = np.empty((num_steps, self.num_ues))
+        lon_tracks = np.empty((num_steps, self.num_ues))
+        lat_tracks[0], lon_tracks[0] = self.lat, self.lon
+        for t in range(1, num_steps):
+            self.step()
+            lat_tracks[t], lon_tracks[t] = self.lat, self.lon
+        return lat_tracks, lon_tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='UE移动引擎基准测试')
+    parser.add_argument('--ues', type=int, default=1000000, help='UE数量')
+    parser.add_argument('--gnbs', type=int, default=1000, help='基站数量')
+    parser.add_argument('--steps', type=int, default=20, help='时间步数')
+    parser.add_argument('--model', choices=MOBILITY_MODELS, default='constant', help='移动模型')
+    parser.add_argument('--dt', type=float, default=1.0, help='时间步长 (秒)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    # 与NRDataGenerator默认区域一致 (北京)，每个UE连接到最近的基站
+    from spatial_index import GeoIndex
+    area_bounds = (39.9, 40.1, 116.3, 116.5)
+    rng = np.random.default_rng(args.seed)
+    lat_min, lat_max, lon_min, lon_max = area_bounds
+    gnb_lat = rng.uniform(lat_min, lat_max, args.gnbs)
+    gnb_lon = rng.uniform(lon_min, lon_max, args.gnbs)
+    gnb_radius = rng.uniform(300, 1000, args.gnbs)
+    ue_lat = rng.uniform(lat_min, lat_max, args.ues)
+    ue_lon = rng.uniform(lon_min, lon_max, args.ues)
+    distance, nearest = GeoIndex(gnb_lat, gnb_lon).nearest(ue_lat, ue_lon)
+    serving = np.where(distance[:, 0] <= gnb_radius[nearest[:, 0]], nearest[:, 0], -1)
+
+    engine = MobilityEngine(ue_lat, ue_lon, rng.uniform(0, 120 / 3.6, args.ues), rng.uniform(0, 360, args.ues),
+                            area_bounds, MobilityConfig(model=args.model, dt=args.dt, seed=args.seed))
+    engine.set_serving(serving, gnb_lat, gnb_lon, gnb_radius)
+    print(f"UE数: {args.ues}, 基站数: {args.gnbs}, 模型: {args.model}, 初始已连接: {np.count_nonzero(serving >= 0)}")
+    times = []
+    lost_total = 0
+    for _ in range(args.steps):
+        start = time.perf_counter()
+        lost = engine.step()
+        times.append(time.perf_counter() - start)
+        lost_total += int(np.count_nonzero(lost))
+    times = np.array(times) * 1000
+    print(f"每步耗时: 中位数 {np.median(times):.1f} ms, 最大 {times.max():.1f} ms, "
+          f"{args.ues / np.median(times) / 1000:.1f} M UE/s")
+    print(f"{args.steps}步内移出服务基站覆盖: {lost_total}, 当前已连接: {np.count_nonzero(engine.serving >= 0)}")
+
+
+if __name__ == '__main__':
+    main()
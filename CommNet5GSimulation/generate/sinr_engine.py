@@ -0,0 +1,272 @@
+"""
+Python版SINR/干扰计算引擎，与MATLAB侧NetSimuEnv的计算语义一致:
+- 干扰组: 载波频率、信道带宽、子载波间隔均相同的基站 (nrGNBaseStation.groupByInterference)
+- 信号:   S = P_tx / L * Nfft^2 / (12 * NRB) (calculateGNBTransmitSingal)
+- 噪声:   N = 2 * N0^2 * Nfft, N0 = sqrt(k * Fs * Teq / 2) (calculateUESINR)
+- 干扰:   同组内其他基站到该UE的信号之和 (calculateUEInterference)，
+         给出干扰图 (interference.py) 时只对服务基站在图中的邻居求和
+- 路损:   3GPP TR 38.901 UMa (nrPathLoss) 或自由空间路损 (fspl)
+所有UE一次性按干扰组做矩阵运算，不需要MATLAB引擎
+"""
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+
+from geo import EARTH_RADIUS, haversine
+from mat_io import DEFAULT_GNB_HEIGHT, DEFAULT_UE_HEIGHT
+
+# 物理常数 (与MATLAB physconst一致)
+LIGHT_SPEED = 299792458.0
+BOLTZMANN = 1.380649e-23
+
+# 38.901 UMa模型的最小二维距离 (米)，更近的距离按该值计算
+MIN_UMA_DISTANCE_2D = 10.0
+
+# 距离矩阵单个分块的元素数上限
+DEFAULT_BLOCK_ELEMENTS = 4 * 1024 * 1024
+
+
+@dataclass
+class SINRConfig:
+    """路损与接收机配置，默认值与main.m一致"""
+    path_loss_model: str = '5G-NR'   # '5G-NR' (38.901) 或 'fspl'
+    scenario: str = 'UMa'
+    environment_height: float = 1.0
+    los: bool = False                # TDL-A信道无LOS径
+    gnb_height: float = DEFAULT_GNB_HEIGHT
+    ue_height: float = DEFAULT_UE_HEIGHT
+    rx_ant_temperature: float = 290.0
+
+
+@dataclass
+class SINRResult:
+    """每个UE的计算结果 (线性值单位为W，sinr为dB)，未连接的UE各项均为0"""
+    serving: np.ndarray        # 服务基站行号，-1表示未连接
+    signal: np.ndarray
+    interference: np.ndarray
+    noise: np.ndarray
+    sinr: np.ndarray
+
+
+def ofdm_nfft(num_resource_blocks) -> np.ndarray:
+    """nrOFDMInfo的FFT点数: 不小于128、且子载波占用率不超过85%的最小2的幂"""
+    nrb = np.asarray(num_resource_blocks, dtype=np.float64)
+    return np.maximum(128.0, 2.0 ** np.ceil(np.log2(nrb * 12 / 0.85)))
+
+
+def ofdm_sample_rate(num_resource_blocks, subcarrier_spacing) -> np.ndarray:
+    """nrOFDMInfo的采样率 (Hz)，subcarrier_spacing单位为Hz"""
+    return ofdm_nfft(num_resource_blocks) * np.asarray(subcarrier_spacing, dtype=np.float64)
+
+
+def thermal_noise(num_resource_blocks, subcarrier_spacing, noise_figure,
+                  rx_ant_temperature: float = 290.0) -> np.ndarray:
+    """接收机噪声功率 (W)，与calculateUESINR一致: 2 * N0^2 * Nfft"""
+    nf = 10.0 ** (np.asarray(noise_figure, dtype=np.float64) / 10)
+    teq = rx_ant_temperature + 290.0 * (nf - 1)
+    n0_sq = BOLTZMANN * ofdm_sample_rate(num_resource_blocks, subcarrier_spacing) * teq / 2.0
+    return 2.0 * n0_sq * ofdm_nfft(num_resource_blocks)
+
+
+def transmit_gain(transmit_power, num_resource_blocks) -> np.ndarray:
+    """P_tx * Nfft^2 / (12 * NRB) (W)，除以线性路损即为接收信号 (calculateGNBTransmitSingal)"""
+    nrb = np.asarray(num_resource_blocks, dtype=np.float64)
+    return 10.0 ** ((np.asarray(transmit_power, dtype=np.float64) - 30) / 10) * ofdm_nfft(nrb) ** 2 / (12 * nrb)
+
+
+def interference_group_ids(carrier_frequency, channel_bandwidth, subcarrier_spacing,
+                           tolerance: float = 1e-6) -> np.ndarray:
+    """
+    为每个基站分配干扰组编号 (从0开始，按首次出现的顺序)
+    三个射频参数在tolerance内相同的基站属于同一组
+    """
+    params = np.column_stack([np.round(np.asarray(x, dtype=np.float64) / tolerance)
+                              for x in (carrier_frequency, channel_bandwidth, subcarrier_spacing)])
+    if len(params) == 0:
+        return np.zeros(0, dtype=np.int64)
+    _, first, inverse = np.unique(params, axis=0, return_index=True, return_inverse=True)
+    # np.unique按参数排序，转换为按首次出现的顺序编号，与groupByInterference一致
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    return rank[inverse.ravel()]
+
+
+def relative_positions(lat, lon, area_bounds: Sequence[float]):
+    """
+    相对于区域左下角的米制坐标，与tools.relativePositionInRectangle一致
+    area_bounds: (lat_min, lat_max, lon_min, lon_max)
+    """
+    lat_min, _, lon_min, _ = area_bounds
+    lat = np.asarray(lat, dtype=np.float64)
+    x = EARTH_RADIUS * np.cos(np.radians(lat)) * np.radians(np.asarray(lon, dtype=np.float64) - lon_min)
+    y = EARTH_RADIUS * np.radians(lat - lat_min)
+    return x, y
+
+
+def uma_path_loss(d2d, d3d, carrier_frequency, h_bs, h_ut, los: bool,
+                  environment_height: float = 1.0) -> np.ndarray:
+    """3GPP TR 38.901 UMa路损 (dB)，不含阴影衰落，输入按numpy规则广播"""
+    d2d = np.maximum(d2d, MIN_UMA_DISTANCE_2D)
+    d3d = np.maximum(d3d, d2d)
+    fc = np.asarray(carrier_frequency, dtype=np.float64)
+    # 与距离无关的项只在载波频率的形状上计算，距离的对数只计算一次
+    log_fc = 20 * np.log10(fc / 1e9)
+    d_bp = 4 * (h_bs - environment_height) * (h_ut - environment_height) * fc / LIGHT_SPEED
+    log_d3d = np.log10(d3d)
+    pl1 = (28.0 + log_fc) + 22 * log_d3d
+    pl2 = (28.0 + log_fc - 9 * np.log10(d_bp ** 2 + (h_bs - h_ut) ** 2)) + 40 * log_d3d
+    pl_los = np.where(d2d <= d_bp, pl1, pl2)
+    if los:
+        return pl_los
+    pl_nlos = (13.54 + log_fc - 0.6 * (h_ut - 1.5)) + 39.08 * log_d3d
+    return np.maximum(pl_los, pl_nlos)
+
+
+def free_space_path_loss(distance, carrier_frequency) -> np.ndarray:
+    """自由空间路损 (dB)，与MATLAB fspl一致 (距离小于一个波长时按0 dB计)"""
+    wavelength = LIGHT_SPEED / np.asarray(carrier_frequency, dtype=np.float64)
+    return 20 * np.log10(np.maximum(4 * np.pi * np.asarray(distance) / wavelength, 1.0))
+
+
+def shannon_rate(allocated_rbs, subcarrier_spacing, sinr_db, epsilon: float = 1.0) -> np.ndarray:
+    """
+    香农速率 (bps)，带宽为 分配RB数 * 12 * 子载波间隔
+    注: NetSimuEnv.calculateUERate直接把dB值当作线性SINR代入，这里使用线性值
+    """
+    bandwidth = np.asarray(allocated_rbs, dtype=np.float64) * 12 * np.asarray(subcarrier_spacing, dtype=np.float64)
+    return epsilon * bandwidth * np.log2(1 + 10.0 ** (np.asarray(sinr_db, dtype=np.float64) / 10))
+
+
+class SINREngine:
+    """
+    基于NetworkTable列数据的SINR计算引擎
+    基站侧的发射功率、FFT点数、干扰组等在构造时一次性计算，evaluate可对不同的服务关系重复调用
+    """
+
+    def __init__(self, table, area_bounds: Sequence[float], config: SINRConfig = None,
+                 block_elements: int = DEFAULT_BLOCK_ELEMENTS, interference_graph=None):
+        if config is None:
+            config = SINRConfig()
+        if config.path_loss_model.upper() not in ('5G-NR', 'FSPL'):
+            raise ValueError(f"不支持的路损模型: {config.path_loss_model}")
+        if config.path_loss_model.upper() == '5G-NR' and config.scenario != 'UMa':
+            raise ValueError(f"暂不支持的路损场景: {config.scenario}")
+        self.table = table
+        self.config = config
+        self.block_elements = block_elements
+        # 可选的干扰图 (interference.InterferenceGraph)，给出时只计算服务基站邻居的干扰
+        self.interference_graph = interference_graph
+
+        gnbs = table.gnbs
+        self.gnb_lat = np.asarray(gnbs['latitude'], dtype=np.float64)
+        self.gnb_lon = np.asarray(gnbs['longitude'], dtype=np.float64)
+        self.gnb_x, self.gnb_y = relative_positions(self.gnb_lat, self.gnb_lon, area_bounds)
+        self.carrier_frequency = np.asarray(gnbs['carrierFrequency'], dtype=np.float64)
+        self.subcarrier_spacing = np.asarray(gnbs['subcarrierSpacing'], dtype=np.float64)
+        self.num_resource_blocks = np.asarray(gnbs['numResourceBlocks'], dtype=np.float64)
+        self.nfft = ofdm_nfft(self.num_resource_blocks)
+        self.tx_gain = transmit_gain(gnbs['transmitPower'], self.num_resource_blocks)
+        self.group_ids = interference_group_ids(self.carrier_frequency, np.asarray(gnbs['channelBandwidth']),
+                                                self.subcarrier_spacing)
+
+        ues = table.ues
+        self.ue_lat = np.asarray(ues['latitude'], dtype=np.float64)
+        self.ue_lon = np.asarray(ues['longitude'], dtype=np.float64)
+        self.ue_x, self.ue_y = relative_positions(self.ue_lat, self.ue_lon, area_bounds)
+        self.ue_noise_figure = np.asarray(ues['noiseFigure'], dtype=np.float64)
+
+    @property
+    def num_groups(self) -> int:
+        return int(self.group_ids.max()) + 1 if len(self.group_ids) else 0
+
+    def default_serving(self) -> np.ndarray:
+        """表中记录的服务关系: 处于连接状态且gnbNodeId存在的UE，返回服务基站行号 (-1为未连接)"""
+        rows = self.table.gnb_rows(self.table.ues['gnbNodeId'])
+        return np.where(np.asarray(self.table.ues['connectionState']) == 1, rows, -1)
+
+    def path_loss(self, ue_idx: np.ndarray, gnb_idx: np.ndarray, pairwise: bool = False) -> np.ndarray:
+        """
+        ue_idx × gnb_idx 的路损矩阵 (dB)
+        pairwise为True时ue_idx与gnb_idx等长，逐对计算第k个UE到第k个基站的路损
+        """
+        if not pairwise:
+            ue_idx, gnb_idx = np.asarray(ue_idx)[:, None], np.asarray(gnb_idx)[None, :]
+        if self.config.path_loss_model.upper() == 'FSPL':
+            distance = haversine(self.ue_lat[ue_idx], self.ue_lon[ue_idx],
+                                 self.gnb_lat[gnb_idx], self.gnb_lon[gnb_idx])
+            return free_space_path_loss(distance, self.carrier_frequency[gnb_idx])
+        d2d = np.hypot(self.ue_x[ue_idx] - self.gnb_x[gnb_idx],
+                       self.ue_y[ue_idx] - self.gnb_y[gnb_idx])
+        d3d = np.hypot(d2d, self.config.gnb_height - self.config.ue_height)
+        return uma_path_loss(d2d, d3d, self.carrier_frequency[gnb_idx], self.config.gnb_height,
+                             self.config.ue_height, self.config.los, self.config.environment_height)
+
+    def received_power(self, ue_idx: np.ndarray, gnb_idx: np.ndarray, pairwise: bool = False) -> np.ndarray:
+        """ue_idx × gnb_idx 的接收信号矩阵 (W)，pairwise含义同path_loss"""
+        gain = self.tx_gain[gnb_idx] if pairwise else self.tx_gain[None, gnb_idx]
+        return gain / 10.0 ** (self.path_loss(ue_idx, gnb_idx, pairwise) / 10)
+
+    def evaluate(self, serving: np.ndarray = None) -> SINRResult:
+        """
+        计算所有UE的信号、干扰、噪声和SINR
+        serving: 每个UE的服务基站行号 (-1为未连接)，默认使用表中记录的服务关系
+        """
+        if serving is None:
+            serving = self.default_serving()
+        serving = np.asarray(serving, dtype=np.int64)
+        num_ues = len(serving)
+        signal = np.zeros(num_ues)
+        interference = np.zeros(num_ues)
+        noise = np.zeros(num_ues)
+        sinr = np.zeros(num_ues)
+
+        connected = np.flatnonzero(serving >= 0)
+        if len(connected) == 0:
+            return SINRResult(serving, signal, interference, noise, sinr)
+        serving_rows = serving[connected]
+        noise[connected] = thermal_noise(self.num_resource_blocks[serving_rows], self.subcarrier_spacing[serving_rows],
+                                         self.ue_noise_figure[connected], self.config.rx_ant_temperature)
+
+        if self.interference_graph is not None:
+            # 按干扰图逐对计算，代价与服务基站的度数之和成正比
+            signal[connected] = self.received_power(connected, serving_rows, pairwise=True)
+            ue, gnb = self.interference_graph.interferers(serving)
+            interference[:] = np.bincount(ue, weights=self.received_power(ue, gnb, pairwise=True), minlength=num_ues)
+            sinr[connected] = 10 * np.log10(signal[connected] / (noise[connected] + interference[connected]))
+            return SINRResult(serving, signal, interference, noise, sinr)
+
+        # 按服务基站所属干扰组分别计算，每组只需要 组内UE × 组内基站 的矩阵
+        ue_groups = self.group_ids[serving_rows]
+        order = np.argsort(ue_groups, kind='stable')
+        bounds = np.searchsorted(ue_groups[order], np.arange(self.num_groups + 1))
+        for g in range(self.num_groups):
+            members = connected[order[bounds[g]:bounds[g + 1]]]
+            if len(members) == 0:
+                continue
+            group_gnbs = np.flatnonzero(self.group_ids == g)
+            column = np.searchsorted(group_gnbs, serving[members])
+            block = max(1, self.block_elements // len(group_gnbs))
+            for start in range(0, len(members), block):
+                ue_idx = members[start:start + block]
+                power = self.received_power(ue_idx, group_gnbs)
+                rows = np.arange(len(ue_idx))
+                signal[ue_idx] = power[rows, column[start:start + block]]
+                power[rows, column[start:start + block]] = 0.0
+                interference[ue_idx] = power.sum(axis=1)
+
+        sinr[connected] = 10 * np.log10(signal[connected] / (noise[connected] + interference[connected]))
+        return SINRResult(serving, signal, interference, noise, sinr)
+
+    def summary(self, result: SINRResult) -> Dict[str, float]:
+        """已连接UE的SINR统计 (dB)"""
+        sinr = result.sinr[result.serving >= 0]
+        if len(sinr) == 0:
+            return {'connected': 0}
+        return {
+            'connected': int(len(sinr)),
+            'sinr_mean': float(np.mean(sinr)),
+            'sinr_p5': float(np.percentile(sinr, 5)),
+            'sinr_p50': float(np.percentile(sinr, 50)),
+            'sinr_p95': float(np.percentile(sinr, 95)),
+        }
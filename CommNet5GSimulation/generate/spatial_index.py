@@ -0,0 +1,144 @@
+"""
+基于KD树的地理空间索引
+点位置转换为单位球面上的三维坐标后建立KD树，球面距离与弦长单调对应，
+因此半径查询、k近邻和点对查询都可以在亚线性时间内完成，结果距离为Haversine距离 (米)
+"""
+from itertools import chain
+from typing import Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geo import arc_to_chord, haversine, to_unit_vectors
+
+# 按行排序距离时，填充矩阵的元素数不超过条目数的该倍数
+PADDED_SORT_FACTOR = 4
+
+
+class GeoIndex:
+    """
+    经纬度点集的空间索引 (通常为基站)
+    radius: 可选，每个点的覆盖半径 (米)，用于covering查询
+    """
+
+    def __init__(self, lat, lon, radius=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.radius = None if radius is None else np.asarray(radius, dtype=np.float64)
+        self.tree = cKDTree(to_unit_vectors(self.lat, self.lon))
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @staticmethod
+    def _concat(neighbours) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        query_ball_point返回的下标列表 -> (每个列表的长度, 拼接后的下标)
+        用itertools.chain在C层展开，逐个元素的生成器表达式在数百万条目时要慢一个数量级
+        """
+        counts = np.fromiter(map(len, neighbours), dtype=np.int64, count=len(neighbours))
+        return counts, np.fromiter(chain.from_iterable(neighbours), dtype=np.int64, count=int(counts.sum()))
+
+    def _flatten(self, lat, lon, neighbours) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """query_ball_point的结果 -> (查询点下标, 索引点下标, 距离)，每个查询点内按距离升序"""
+        counts, cols = self._concat(neighbours)
+        rows = np.repeat(np.arange(len(neighbours)), counts)
+        distances = haversine(lat[rows], lon[rows], self.lat[cols], self.lon[cols])
+        order = self._row_distance_order(rows, distances, len(lat))
+        return rows[order], cols[order], distances[order]
+
+    @staticmethod
+    def _row_distance_order(rows: np.ndarray, distances: np.ndarray, num_rows: int) -> np.ndarray:
+        """
+        按 (行, 距离) 排序的下标，与np.lexsort((distances, rows))相同
+        每行的条目数很少，先按行做稳定排序，再把各行填入 (行数, 最大条目数) 的矩阵按行排序距离，比lexsort快
+        """
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.int64)
+        by_row = np.argsort(rows, kind='stable')
+        sorted_rows = rows[by_row]
+        counts = np.bincount(sorted_rows, minlength=num_rows)
+        if num_rows * int(counts.max()) > PADDED_SORT_FACTOR * len(rows):
+            # 各行条目数相差悬殊时填充矩阵过大，退回lexsort
+            return np.lexsort((distances, rows))
+        starts = np.cumsum(counts) - counts
+        padded = np.full((num_rows, int(counts.max())), np.inf)
+        padded[sorted_rows, np.arange(len(rows)) - starts[sorted_rows]] = distances[by_row]
+        within = np.argsort(padded, axis=1, kind='stable')
+        valid = np.arange(padded.shape[1]) < counts[:, None]
+        return by_row[(starts[:, None] + within)[valid]]
+
+    @staticmethod
+    def _to_csr(rows: np.ndarray, num_rows: int) -> np.ndarray:
+        offsets = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=offsets[1:])
+        return offsets
+
+    def query_radius(self, lat, lon, distance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        查询每个点distance米范围内的索引点
+        返回CSR形式 (offsets, indices, distances)：第q个查询点的结果为 indices[offsets[q]:offsets[q+1]]，按距离升序
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        neighbours = self.tree.query_ball_point(to_unit_vectors(lat, lon), arc_to_chord(distance), workers=-1)
+        rows, cols, distances = self._flatten(lat, lon, neighbours)
+        keep = distances <= distance
+        return self._to_csr(rows[keep], len(lat)), cols[keep], distances[keep]
+
+    def covering(self, lat, lon) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        查询覆盖每个点的索引点 (距离 <= 该索引点的覆盖半径)，即"覆盖该UE的基站"
+        返回CSR形式 (offsets, indices, distances)，每个查询点内按距离升序
+        """
+        if self.radius is None:
+            raise ValueError("covering查询需要在构造GeoIndex时给出radius")
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if len(self) == 0:
+            return np.zeros(len(lat) + 1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        if len(lat) > len(self):
+            # 查询点多于索引点 (例如大量UE查询基站) 时反向查询: 对查询点建KD树，
+            # 每个索引点按自身覆盖半径查询，避免按最大半径产生大量随后被剔除的候选
+            neighbours = cKDTree(to_unit_vectors(lat, lon)).query_ball_point(
+                to_unit_vectors(self.lat, self.lon), arc_to_chord(self.radius) * (1 + 1e-12), workers=-1)
+            counts, rows = self._concat(neighbours)
+            cols = np.repeat(np.arange(len(neighbours)), counts)
+            distances = haversine(lat[rows], lon[rows], self.lat[cols], self.lon[cols])
+            order = self._row_distance_order(rows, distances, len(lat))
+            rows, cols, distances = rows[order], cols[order], distances[order]
+        else:
+            max_radius = float(self.radius.max())
+            neighbours = self.tree.query_ball_point(to_unit_vectors(lat, lon), arc_to_chord(max_radius), workers=-1)
+            rows, cols, distances = self._flatten(lat, lon, neighbours)
+        keep = distances <= self.radius[cols]
+        return self._to_csr(rows[keep], len(lat)), cols[keep], distances[keep]
+
+    def nearest(self, lat, lon, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """k近邻查询，返回 (距离, 下标)，形状为 (N, k)；索引点不足k个时多余位置下标为len(self)、距离为inf"""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        chords, indices = self.tree.query(to_unit_vectors(lat, lon), k=[i + 1 for i in range(k)], workers=-1)
+        valid = indices < len(self)
+        distances = np.full(indices.shape, np.inf)
+        safe = np.where(valid, indices, 0)
+        distances[valid] = haversine(lat[:, None], lon[:, None], self.lat[safe], self.lon[safe])[valid]
+        return distances, indices
+
+    def pairs_within(self, distance: float = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        查询距离不超过distance米的所有索引点对 (i < j)，distance为None时返回所有点对
+        返回 (i, j, 距离)
+        """
+        chord = 2.0 if distance is None else arc_to_chord(distance)
+        pairs = self.tree.query_pairs(chord * (1 + 1e-12), output_type='ndarray')
+        if len(pairs) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        i, j = np.minimum(pairs[:, 0], pairs[:, 1]), np.maximum(pairs[:, 0], pairs[:, 1])
+        distances = haversine(self.lat[i], self.lon[i], self.lat[j], self.lon[j])
+        if distance is not None:
+            keep = distances <= distance
+            i, j, distances = i[keep], j[keep], distances[keep]
+        order = np.lexsort((j, i))
+        return i[order], j[order], distances[order]
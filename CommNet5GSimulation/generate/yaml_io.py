@@ -0,0 +1,210 @@
+"""
+5G NR仿真场景的YAML读写工具
+写入采用流式方式：逐块把gnbs / ues / interference_groups条目写入文件，
+内存占用与UE数量无关；libyaml可用时使用C实现的Dumper
+读取统一使用load_yaml：优先使用C实现的Loader，并把解析结果以JSON缓存到磁盘
+"""
+import glob
+import hashlib
+import itertools
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List
+
+import yaml
+
+# libyaml可用时使用C实现，速度比纯Python实现快一个数量级
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# 解析结果缓存目录 (位于YAML文件同目录下)
+CACHE_DIR_NAME = '.yaml_cache'
+
+# 每次交给emitter的条目数
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _column_chunks(columns: Dict[str, Any], names: List[str], length: int,
+                   chunk_size: int) -> Iterator[Dict[str, list]]:
+    """把列数组按块转换为Python列表，避免逐元素访问numpy标量"""
+    for start in range(0, length, chunk_size):
+        end = min(start + chunk_size, length)
+        yield {name: columns[name][start:end].tolist() for name in names}
+
+
+def iter_gnb_dicts(table, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """从NetworkTable的列数据逐个生成基站字典"""
+    names = ['id', 'latitude', 'longitude', 'radius', 'noiseFigure', 'numTransmitAntennas', 'transmitPower',
+             'carrierFrequency', 'channelBandwidth', 'subcarrierSpacing', 'numResourceBlocks']
+    slice_types = table.slices['sliceType'].tolist()
+    qos_levels = table.slices['qosLevel'].tolist()
+    min_bws = table.slices['minBandwidthGuarantee'].tolist()
+    offsets = table.slice_offsets.tolist()
+    row = 0
+    for chunk in _column_chunks(table.gnbs, names, table.num_gnbs, chunk_size):
+        for k in range(len(chunk['id'])):
+            start, end = offsets[row], offsets[row + 1]
+            yield {
+                'id': chunk['id'][k],
+                'name': f"gNB_{chunk['id'][k]}",
+                'position': {
+                    'latitude': chunk['latitude'][k],
+                    'longitude': chunk['longitude'][k]
+                },
+                'radius': chunk['radius'][k],
+                'noise_figure': chunk['noiseFigure'][k],
+                'num_transmit_antennas': chunk['numTransmitAntennas'][k],
+                'transmit_power': chunk['transmitPower'][k],
+                'carrier_frequency': chunk['carrierFrequency'][k],
+                'channel_bandwidth': chunk['channelBandwidth'][k],
+                'subcarrier_spacing': chunk['subcarrierSpacing'][k],
+                'num_resource_blocks': chunk['numResourceBlocks'][k],
+                'slices': [{'slice_type': table.slice_categories[slice_types[j]], 'qos_level': qos_levels[j],
+                            'min_bandwidth_guarantee': min_bws[j]} for j in range(start, end)]
+            }
+            row += 1
+
+
+def iter_ue_dicts(table, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """从NetworkTable的列数据逐个生成UE字典"""
+    names = ['id', 'latitude', 'longitude', 'noiseFigure', 'numTransmitAntennas', 'transmitPower',
+             'connectionState', 'gnbNodeId', 'businessType', 'priority', 'sliceType', 'speed', 'direction']
+    for chunk in _column_chunks(table.ues, names, table.num_ues, chunk_size):
+        for k in range(len(chunk['id'])):
+            yield {
+                'id': chunk['id'][k],
+                'name': f"UE_{chunk['id'][k]}",
+                'position': {
+                    'latitude': chunk['latitude'][k],
+                    'longitude': chunk['longitude'][k]
+                },
+                'noise_figure': chunk['noiseFigure'][k],
+                'num_transmit_antennas': chunk['numTransmitAntennas'][k],
+                'transmit_power': chunk['transmitPower'][k],
+                'connection_state': chunk['connectionState'][k],
+                'gnb_node_id': chunk['gnbNodeId'][k],
+                'business_type': table.business_categories[chunk['businessType'][k]],
+                'priority': chunk['priority'][k],
+                'slice_type': table.slice_categories[chunk['sliceType'][k]],
+                'mobility_model': {'speed': chunk['speed'][k], 'direction': chunk['direction'][k]}
+            }
+
+
+def _write_sequence(stream, key: str, items: Iterable[Dict[str, Any]], chunk_size: int) -> int:
+    """把一个顶层序列逐块写入stream，返回写入的条目数"""
+    iterator = iter(items)
+    first_chunk = list(itertools.islice(iterator, chunk_size))
+    if not first_chunk:
+        stream.write(f"{key}: []\n")
+        return 0
+
+    stream.write(f"{key}:\n")
+    count = 0
+    chunk = first_chunk
+    while chunk:
+        yaml.dump(chunk, stream, Dumper=YAML_DUMPER, default_flow_style=False,
+                  allow_unicode=True, sort_keys=False)
+        count += len(chunk)
+        chunk = list(itertools.islice(iterator, chunk_size))
+    return count
+
+
+def write_scenario_yaml(yaml_file: str, gnbs: Iterable[Dict[str, Any]], ues: Iterable[Dict[str, Any]],
+                        interference_groups: Iterable[Dict[str, Any]] = (), metadata: Dict[str, Any] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    流式写入场景YAML文件
+    gnbs / ues / interference_groups 可以是生成器，条目按块写出，不会整体驻留内存
+    metadata 写在文件末尾，num_gnbs / num_ues / num_interference_groups 未给出时使用实际写入的数量
+
+    Returns:
+        各部分写入的条目数
+    """
+    with open(yaml_file, 'w', encoding='utf-8') as f:
+        counts = {
+            'num_gnbs': _write_sequence(f, 'gnbs', gnbs, chunk_size),
+            'num_ues': _write_sequence(f, 'ues', ues, chunk_size),
+            'num_interference_groups': _write_sequence(f, 'interference_groups', interference_groups, chunk_size),
+        }
+
+        metadata_export = dict(counts)
+        metadata_export.update(metadata or {})
+        yaml.dump({'metadata': metadata_export}, f, Dumper=YAML_DUMPER, default_flow_style=False,
+                  allow_unicode=True, sort_keys=False)
+    return counts
+
+
+def _json_compatible(value) -> bool:
+    """safe_load的结果能否无损地以JSON表示 (字典键均为字符串，值为基本类型、列表或字典)"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return True
+    if isinstance(value, list):
+        return all(_json_compatible(item) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _json_compatible(item) for key, item in value.items())
+    return False  # 时间戳、二进制、集合等类型不缓存
+
+
+def _file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """计算文件内容的哈希值"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_yaml(yaml_file: str, use_cache: bool = True, cache_dir: str = None) -> Any:
+    """
+    读取YAML文件 (safe_load语义)
+    解析结果以JSON格式缓存，缓存键为文件内容哈希和修改时间，文件变化后自动失效。
+    缓存只保存数据本身 (不使用pickle)，读取来历不明或从别处拷贝来的缓存目录也不会执行代码；
+    结果中含有JSON无法表示的类型 (如时间戳、非字符串键) 时不写缓存
+
+    Args:
+        yaml_file: YAML文件路径
+        use_cache: 是否使用解析缓存
+        cache_dir: 缓存目录，默认为YAML文件同目录下的 .yaml_cache
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        yaml.YAMLError: YAML格式错误
+    """
+    if not use_cache:
+        with open(yaml_file, 'r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=YAML_LOADER)
+
+    stat = os.stat(yaml_file)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(yaml_file)), CACHE_DIR_NAME)
+    base_name = os.path.basename(yaml_file)
+    cache_file = os.path.join(cache_dir, f"{base_name}.{_file_digest(yaml_file)}.{stat.st_mtime_ns}.json")
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass  # 缓存损坏时重新解析
+
+    with open(yaml_file, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=YAML_LOADER)
+
+    if not _json_compatible(data):
+        return data
+
+    # 写入缓存并清理同名文件的旧缓存 (包括旧版本的pickle缓存)，缓存目录不可写时忽略
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        prefix = os.path.join(glob.escape(cache_dir), glob.escape(base_name))
+        for stale in glob.glob(prefix + '.*.json') + glob.glob(prefix + '.*.pkl'):
+            if stale != cache_file:
+                os.remove(stale)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+    return data
@@ -0,0 +1,82 @@
+"""
+NumPy <-> MATLAB引擎的内存数据传递
+场景列数据直接以matlab.double传入 main(scenario)，仿真结果以列式结构体返回，
+不再经过 5g_nr_simulation_data.mat 的写入和load
+
+matlab.double由连续的NumPy内存通过缓冲区协议一次性构造 (MATLAB R2022a及以上)，
+不会逐元素转换为Python对象；返回的matlab数组同样通过缓冲区协议转换为NumPy数组
+"""
+import os
+import sys
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import matlab
+
+# 列式场景数据的构造与.mat导出共用 (generate/mat_io.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate'))
+from mat_io import network_to_mat_dict
+
+
+def to_matlab(value: Any) -> Any:
+    """
+    Python/NumPy值 -> 可传给MATLAB引擎的值
+    数值数组 -> matlab.double (一维数组为列向量)，布尔数组 -> matlab.logical，
+    字符串数组 -> 字符串列表 (MATLAB侧为cell，cellstr可直接使用)，dict -> struct
+    """
+    if isinstance(value, dict):
+        return {key: to_matlab(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'US':
+            return [str(item) for item in value.ravel()]
+        if value.ndim == 1:
+            value = value.reshape(-1, 1)
+        if value.dtype == np.bool_:
+            return matlab.logical(np.ascontiguousarray(value))
+        return matlab.double(np.ascontiguousarray(value, dtype=np.float64))
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, str) for item in value):
+        return list(value)
+    if isinstance(value, (np.integer, np.floating)):
+        return float(value)
+    return value
+
+
+def _matlab_array_to_numpy(value) -> np.ndarray:
+    try:
+        # R2022a及以上: matlab数组支持缓冲区协议，直接共享内存
+        array = np.asarray(value)
+    except (TypeError, ValueError):
+        # 旧版本: 内部数据按列优先顺序存储
+        array = np.array(value._data).reshape(value.size, order='F')
+    # 列向量 / 行向量还原为一维数组
+    if array.ndim == 2 and 1 in array.shape:
+        return array.reshape(-1)
+    return array
+
+
+def from_matlab(value: Any) -> Any:
+    """MATLAB引擎返回值 -> Python/NumPy值 (struct -> dict，数值数组 -> np.ndarray)"""
+    if isinstance(value, dict):
+        return {key: from_matlab(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_matlab(item) for item in value]
+    if hasattr(value, 'size') and type(value).__module__.startswith('matlab'):
+        return _matlab_array_to_numpy(value)
+    return value
+
+
+def network_to_matlab(table, interference_groups: List[Dict[str, Any]] = None,
+                      area_bounds: Sequence[float] = None, interference_graph=None) -> Dict[str, Any]:
+    """NetworkTable -> main(scenario)使用的列式场景结构体，字段与save_network_mat导出的一致"""
+    return to_matlab(network_to_mat_dict(table, interference_groups, area_bounds,
+                                         interference_graph=interference_graph))
+
+
+def run_simulation(eng, table, interference_groups: List[Dict[str, Any]] = None,
+                   area_bounds: Sequence[float] = None, interference_graph=None) -> Dict[str, np.ndarray]:
+    """
+    在引擎中运行main.m，场景与结果均在内存中传递，返回各UE性能指标列
+    interference_graph: 可选的干扰图 (generate/interference.py)，给出时按图中邻居计算干扰
+    """
+    scenario = network_to_matlab(table, interference_groups, area_bounds, interference_graph)
+    return from_matlab(eng.main(scenario, nargout=1))
@@ -1,31 +1,48 @@
-
-
-
-
-
-
+import argparse
 import os
-import matlab.engine
-import numpy as np
+import sys
+import time
 
-# 获取当前 Python 脚本所在目录
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
-# 构建相对路径（5G通信的仿真matlab代码位于同层simultion文件夹中）
-relative_path = os.path.join(script_dir, 'simulation')
-
-# 转换为 MATLAB 路径格式（使用正斜杠）
-matlab_path = relative_path.replace('\\', '/')
-print(matlab_path);
-
-# 启动MATLAB引擎
-eng = matlab.engine.start_matlab()
-eng.addpath(matlab_path, nargout=0)  # 添加MATLAB路径
-
-# 调用MATLAB函数
-res = eng.main()
-
-# print(result)
+import numpy as np
 
-# 关闭引擎
-eng.quit()
+# 生成器位于同层generate文件夹
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate'))
+from engine_pool import EnginePool
+from matlab_bridge import from_matlab, run_simulation
+from generate import NRDataGenerator, NetworkTable
+from interference import DEFAULT_INTERFERENCE_DISTANCE, table_interference_graph
+
+parser = argparse.ArgumentParser(description='运行5G NR MATLAB仿真')
+parser.add_argument('--mat', default=None, help='从.mat场景文件读取 (默认在内存中生成场景并直接传入MATLAB)')
+parser.add_argument('--gnbs', type=int, default=15, help='生成的基站数量')
+parser.add_argument('--ues', type=int, default=50, help='生成的UE数量')
+parser.add_argument('--seed', type=int, default=None, help='随机种子')
+args = parser.parse_args()
+
+# 连接常驻的MATLAB共享会话 (不存在时在后台启动，之后的运行直接复用)
+# 仿真matlab代码路径 (同层simulation文件夹) 在连接时添加
+start = time.perf_counter()
+pool = EnginePool(size=1)
+print(f"MATLAB引擎就绪: {time.perf_counter() - start:.2f}s")
+
+with pool.acquire() as eng:
+    # 调用MATLAB函数
+    if args.mat:
+        res = from_matlab(eng.main(args.mat.replace('\\', '/'), nargout=1))
+    else:
+        generator = NRDataGenerator(seed=args.seed)
+        gnbs = generator.generate_gnbs_array(args.gnbs)
+        ues = generator.generate_ues_array(args.ues, gnbs)
+        table = NetworkTable.from_arrays(gnbs, ues)
+        # 按干扰距离构造干扰图，MATLAB侧只计算图中邻居的干扰
+        graph = table_interference_graph(table, DEFAULT_INTERFERENCE_DISTANCE)
+        res = run_simulation(eng, table, area_bounds=generator.area_bounds, interference_graph=graph)
+
+connected = res['connectionState'] == 1
+print(f"已连接UE: {int(connected.sum())}/{len(connected)}")
+if connected.any():
+    print(f"平均SINR: {np.nanmean(res['sinr'][connected]):.2f} dB")
+    print(f"平均吞吐量: {np.nanmean(res['throughput'][connected]):.2f}")
+
+# 断开连接，共享会话保持运行 (python engine_pool.py stop 关闭)
+pool.close()
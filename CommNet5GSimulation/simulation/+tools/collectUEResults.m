@@ -0,0 +1,21 @@
+function results = collectUEResults(ueCell)
+    % 把仿真结束后各UE的性能指标收集为列式结构体 (struct of arrays)
+    % 供Python侧 (matlab_bridge.from_matlab) 直接转换为NumPy数组，不经过文件
+    % 输出:
+    %   results - 结构体，如 results.sinr 为列向量，第i行对应ueCell{i}；未赋值的指标为NaN
+
+    numUEs = numel(ueCell);
+    fields = {'id', 'connectionState', 'gnbNodeId', 'allocationRBNums', 'allocationPower', ...
+              'interference', 'sinr', 'rate', 'transmitBits', 'throughput', 'maxThroughput', 'delay'};
+    results = struct();
+    for k = 1:numel(fields)
+        column = NaN(numUEs, 1);
+        for i = 1:numUEs
+            value = ueCell{i}.(fields{k});
+            if ~isempty(value)
+                column(i) = double(value);
+            end
+        end
+        results.(fields{k}) = column;
+    end
+end
@@ -8,6 +8,11 @@ function [gNBs, gNBsMapping] = createNRGNB(gNBConfig)
     %
 
     fprintf('Creating new nrGNBaseStation object...\n');
+    if isstruct(gNBConfig) && isfield(gNBConfig, 'sliceOffsets')
+        % 列式数据 (struct of arrays)，由generate/mat_io.py导出
+        [gNBs, gNBsMapping] = createNRGNBFromColumns(gNBConfig);
+        return;
+    end
     gNBs = cell(1, length(gNBConfig));
     gNBsMapping = containers.Map('KeyType', 'double', 'ValueType', 'any');
 
@@ -27,3 +32,30 @@ function [gNBs, gNBsMapping] = createNRGNB(gNBConfig)
     end
     
 end
+
+function [gNBs, gNBsMapping] = createNRGNBFromColumns(columns)
+    % 按列读取基站配置，第i个基站的切片为 sliceOffsets(i)+1 : sliceOffsets(i+1)
+    % sliceType为sliceCategories中从0开始的编码
+    numGNBs = numel(columns.id);
+    sliceCategories = cellstr(columns.sliceCategories);
+    gNBs = cell(1, numGNBs);
+    gNBsMapping = containers.Map('KeyType', 'double', 'ValueType', 'any');
+
+    for i = 1:numGNBs
+        numResourceBlocks = columns.numResourceBlocks(i);
+        transmitPower = columns.transmitPower(i);
+        slices = containers.Map('KeyType', 'char', 'ValueType', 'any');
+        for j = columns.sliceOffsets(i)+1 : columns.sliceOffsets(i+1)
+            sliceType = sliceCategories{columns.sliceType(j) + 1};
+            resourceWeight = columns.resourceWeight(j);
+            % TODO这里每一个用户最小的RB数为4，可以考虑是否修改
+            slices(sliceType) = nrSlice(sliceType, columns.qosLevel(j), resourceWeight, 4, ...
+                            ceil(numResourceBlocks * resourceWeight), tools.floorToDecimal(transmitPower * resourceWeight, 4));
+        end
+        gNBs{i} = nrGNBaseStation(columns.id(i), sprintf('gNB_%d', columns.id(i)), ...
+                        [columns.latitude(i), columns.longitude(i), columns.height(i)], columns.radius(i), ...
+                        columns.noiseFigure(i), columns.numTransmitAntennas(i), transmitPower, columns.carrierFrequency(i), ...
+                        columns.channelBandwidth(i), columns.subcarrierSpacing(i), numResourceBlocks, slices);
+        gNBsMapping(columns.id(i)) = gNBs{i};
+    end
+end
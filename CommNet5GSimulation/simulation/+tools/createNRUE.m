@@ -2,6 +2,11 @@ function [nUEs, nUEsMapping] = createNRUE(gUEConfig)
     % Create nrUserEquipment based on the given configuration
     
     fprintf('Creating new nrUEs object...\n');
+    if isstruct(gUEConfig) && isfield(gUEConfig, 'businessCategories')
+        % 列式数据 (struct of arrays)，由generate/mat_io.py导出
+        [nUEs, nUEsMapping] = createNRUEFromColumns(gUEConfig);
+        return;
+    end
     nUEs = cell(1, length(gUEConfig));
     nUEsMapping = containers.Map("KeyType", "double", "ValueType", "any");
     for i = 1:length(gUEConfig)
@@ -13,4 +18,21 @@ function [nUEs, nUEsMapping] = createNRUE(gUEConfig)
         nUEsMapping(ueInfo.id) = nUEs{i};
     end
 
+end
+
+function [nUEs, nUEsMapping] = createNRUEFromColumns(columns)
+    % 按列读取UE配置，sliceType / businessType 为类别中从0开始的编码
+    numUEs = numel(columns.id);
+    sliceCategories = cellstr(columns.sliceCategories);
+    businessCategories = cellstr(columns.businessCategories);
+    nUEs = cell(1, numUEs);
+    nUEsMapping = containers.Map("KeyType", "double", "ValueType", "any");
+    for i = 1:numUEs
+        mobilityModel = nrMobilityModel(columns.speed(i), columns.direction(i));
+        nUEs{i} = nrUserEquipment(columns.id(i), sprintf('UE_%d', columns.id(i)), ...
+                        [columns.latitude(i), columns.longitude(i), columns.height(i)], columns.noiseFigure(i), columns.numTransmitAntennas(i), ...
+                        columns.transmitPower(i), 0, NaN, businessCategories{columns.businessType(i) + 1}, columns.priority(i), ...
+                        sliceCategories{columns.sliceType(i) + 1}, mobilityModel, "QPSK", 490/1024);
+        nUEsMapping(columns.id(i)) = nUEs{i};
+    end
 end
\ No newline at end of file
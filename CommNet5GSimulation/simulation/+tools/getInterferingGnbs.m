@@ -0,0 +1,18 @@
+function [neighborIds, distances] = getInterferingGnbs(graph, gnbId)
+    % 从干扰图中取出指定基站的干扰基站，代价与该基站的邻居数成正比
+    % 输入:
+    %   graph - 由tools.indexInterferenceGraph建立了rowMap的干扰图结构体，
+    %           ID为gnbIds(i)的基站的邻居为 neighborIds(offsets(i)+1 : offsets(i+1))
+    %   gnbId - 基站ID
+    % 输出:
+    %   neighborIds - 干扰基站ID，按距离升序
+    %   distances   - 对应的距离 (米)
+
+    if ~isKey(graph.rowMap, gnbId)
+        error('gNB ID %d not found in interference graph', gnbId);
+    end
+    row = graph.rowMap(gnbId);
+    slots = graph.offsets(row)+1 : graph.offsets(row+1);
+    neighborIds = graph.neighborIds(slots);
+    distances = graph.distance(slots);
+end
@@ -0,0 +1,14 @@
+function graph = indexInterferenceGraph(graph)
+    % 为干扰图建立 基站ID -> 行号 的映射 (只需构造时调用一次)
+    % 输入:
+    %   graph - 干扰图结构体 (generate/mat_io.py的interference_graph_columns)
+    % 输出:
+    %   graph - 增加rowMap字段 (containers.Map)，getInterferingGnbs按ID直接取行号，不再线性查找gnbIds
+
+    gnbIds = double(graph.gnbIds(:))';
+    if isempty(gnbIds)
+        graph.rowMap = containers.Map('KeyType', 'double', 'ValueType', 'any');
+    else
+        graph.rowMap = containers.Map(gnbIds, num2cell(1:numel(gnbIds)));
+    end
+end
@@ -0,0 +1,27 @@
+function ueColumns = loadUEColumns(matFile, rowRange)
+    % 从MAT v7.3文件读取列式UE数据，组装为与tools.createNRUE兼容的UEs结构体
+    % UE列以顶层变量UEs_<列名>存储 (由generate/mat_io.py的save_network_mat73导出)
+    % 输入:
+    %   matFile  - MAT v7.3文件路径
+    %   rowRange - 可选，要读取的UE行范围 (如 1:100000)，需为等间隔索引；省略时读取全部
+    % 输出:
+    %   ueColumns - 列式UE结构体，如 ueColumns.latitude 为列向量
+
+    m = matfile(matFile);
+    names = who(m);
+    categoryFields = {'sliceCategories', 'businessCategories'};
+    ueColumns = struct();
+    for i = 1:numel(names)
+        name = names{i};
+        if ~startsWith(name, 'UEs_')
+            continue;
+        end
+        field = name(5:end);
+        if nargin < 2 || any(strcmp(field, categoryFields))
+            ueColumns.(field) = m.(name);
+        else
+            % matfile只从磁盘读取指定范围的行
+            ueColumns.(field) = m.(name)(rowRange, 1);
+        end
+    end
+end
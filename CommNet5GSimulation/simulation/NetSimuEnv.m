@@ -16,6 +16,7 @@ classdef NetSimuEnv < handle
 
         distanceMapping
         interferenceGroup
+        interferenceGraph        % 可选，CSR形式的干扰图，为空时按interferenceGroup计算干扰
 
         channelInfo
         pathLossModel
@@ -42,6 +43,12 @@ classdef NetSimuEnv < handle
 
             obj.distanceMapping = netSimuEnvConfig.distanceMapping;
             obj.interferenceGroup = nrGNBaseStation.groupByInterference(obj.gNBs);
+            if isfield(netSimuEnvConfig, 'interferenceGraph')
+                % 构造时建立一次 基站ID -> 行号 的映射，查询干扰基站时不再线性查找
+                obj.interferenceGraph = tools.indexInterferenceGraph(netSimuEnvConfig.interferenceGraph);
+            else
+                obj.interferenceGraph = [];
+            end
 
             obj.channelInfo = info(netSimuEnvConfig.channel);
             obj.pathLossModel = netSimuEnvConfig.pathLossModel;
@@ -287,6 +294,14 @@ classdef NetSimuEnv < handle
             % 遍历interferenceGroup，找到哪一组有干扰
             % 然后计算干扰
             inteference = 0;
+            if ~isempty(obj.interferenceGraph)
+                % 干扰图中服务基站的邻居即为干扰基站，不需要遍历干扰组
+                neighborIds = tools.getInterferingGnbs(obj.interferenceGraph, ueInfo.gnbNodeId);
+                for j = 1:numel(neighborIds)
+                    inteference = inteference + obj.calculateGNBTransmitSingal(obj.gNBsMapping(neighborIds(j)), ueInfo);
+                end
+                return;
+            end
             connectedGNB = obj.gNBsMapping(ueInfo.gnbNodeId);
             for i = 1:length(obj.interferenceGroup)
                 group = obj.interferenceGroup{i};
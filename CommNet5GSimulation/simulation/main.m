@@ -1,4 +1,6 @@
-function res = main()
+function res = main(scenario)
+    % scenario: 场景.mat文件路径，或由Python直接传入的列式场景结构体 (matlab_bridge.network_to_matlab)
+    % res:      各UE性能指标的列式结构体 (tools.collectUEResults)
     clc; close all;
     %% 导入tools
     current_dir = fileparts(mfilename('fullpath'));
@@ -6,8 +8,23 @@ function res = main()
 
     % 添加工具包所在的目录
     addpath(current_dir);
-    % 读取MAT文件
-    data = load('5g_nr_simulation_data.mat');
+    if nargin < 1
+        scenario = '5g_nr_simulation_data.mat';
+    end
+    if isstruct(scenario)
+        % 内存中的场景数据，不经过.mat文件
+        data = scenario;
+    else
+        % 读取MAT文件
+        matFile = scenario;
+        if any(startsWith(who('-file', matFile), 'UEs_'))
+            % MAT v7.3列式文件，UE列以UEs_<列名>顶层变量存储
+            data = load(matFile, '-regexp', '^(?!UEs_)');
+            data.UEs = tools.loadUEColumns(matFile);
+        else
+            data = load(matFile);
+        end
+    end
     disp(data)
 
     envConfig = struct();
@@ -34,6 +51,10 @@ function res = main()
     end
 
     envConfig.distanceMapping = tools.createUeGnbDistanceMap(UEs, gNBs);
+    if isfield(data, 'interferenceGraph')
+        % Python侧按空间距离构造的干扰图 (generate/interference.py)，只计算图中邻居的干扰
+        envConfig.interferenceGraph = data.interferenceGraph;
+    end
     envConfig.simulationTime = 1;
     envConfig.simulationStep = 1;
     envConfig.allocationStrategy = 'RR';
@@ -83,6 +104,5 @@ function res = main()
     env = NetSimuEnv(envConfig);
     env.run();
 
-
-    res = 'Hello World!';
+    res = tools.collectUEResults(env.UEs);
 end
@@ -0,0 +1,288 @@
+"""
+参数扫描运行器
+按网格规格 (UE速度 × 子载波间隔 × 信道带宽 × 随机种子) 逐个生成场景，
+在进程池中并行运行，每个工作进程启动一次仿真后端并在整个扫描期间复用:
+- python: Python版接入 / SINR / 移动引擎 (attachment / sinr_engine / mobility)，不需要MATLAB许可，
+          与NetSimuEnv.run一样逐时间步执行 接入 -> SINR统计 -> UE移动，共num_steps步
+- matlab: 每个工作进程连接一个常驻的MATLAB共享会话 (engine_pool)，场景数组直接在内存中传给main.m
+
+每完成一个场景即向结果CSV追加一行并落盘，进程崩溃后重新运行同一命令会跳过已成功的场景
+(场景标识包含完整场景参数的哈希，修改base参数后不会跳过)
+
+用法:
+    python sweep.py config/sweep_grid.yaml -o sweep_results.csv -j 4
+    python sweep.py config/sweep_grid.yaml --backend matlab -j 2
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+# 生成器与计算引擎位于generate目录
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, 'generate'))
+from yaml_io import load_yaml
+from generate import NRDataGenerator, NetworkTable
+from attachment import AttachmentEngine
+from interference import DEFAULT_INTERFERENCE_DISTANCE, table_interference_graph
+from mobility import MobilityConfig, MobilityEngine
+from sinr_engine import SINRConfig, SINREngine
+
+# 网格维度 (规格文件grid中的键) 及其单位: ue_speed为m/s，scs为kHz，bandwidth为MHz
+GRID_KEYS = ('ue_speed', 'scs', 'bandwidth', 'seed')
+
+# 未在规格文件base中给出时使用的场景参数
+DEFAULT_BASE = {
+    'num_gnbs': 20,
+    'num_ues': 200,
+    'carrier_frequency': 3.5e9,
+    'area_bounds': [39.9, 40.1, 116.3, 116.5],
+    'num_steps': 10,        # python后端的仿真时间步数 (matlab后端由main.m的simulationTime决定)
+    'step_duration': 1.0,   # 每步时长 (秒)
+}
+
+RESULT_COLUMNS = ['scenario_id', 'ue_speed', 'scs', 'bandwidth', 'seed', 'carrier_frequency',
+                  'num_gnbs', 'num_ues', 'num_resource_blocks', 'backend', 'status', 'elapsed',
+                  'connected', 'sinr_mean', 'sinr_p5', 'sinr_p50', 'sinr_p95', 'spectral_efficiency', 'error']
+
+# matlab后端的时间步数 (main.m中envConfig.simulationTime)
+MATLAB_NUM_STEPS = 1
+
+# 工作进程内的后端状态 (由_init_worker设置，整个扫描期间复用)
+_worker = {}
+
+
+def scenario_id(scenario: Dict[str, Any]) -> str:
+    """
+    场景唯一标识，用于断点续跑: 网格维度的取值加上完整场景参数 (base与网格合并后) 的哈希，
+    修改base中的参数 (如num_ues、num_steps) 后同一网格点的标识随之改变，不会误用旧结果
+    """
+    params = {key: value for key, value in scenario.items() if key != 'scenario_id'}
+    digest = hashlib.blake2b(json.dumps(params, sort_keys=True, default=str).encode('utf-8'),
+                             digest_size=4).hexdigest()
+    return ','.join(f"{key}={scenario[key]}" for key in GRID_KEYS) + f",{digest}"
+
+
+def expand_grid(spec: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """网格规格 -> 场景参数字典 (笛卡尔积，未给出的维度使用单值)"""
+    grid = spec.get('grid', {})
+    base = dict(DEFAULT_BASE)
+    base.update(spec.get('base', {}))
+    unknown = set(grid) - set(GRID_KEYS)
+    if unknown:
+        raise ValueError(f"未知的网格维度: {sorted(unknown)}，可选: {list(GRID_KEYS)}")
+
+    defaults = {'ue_speed': [10], 'scs': [30], 'bandwidth': [20], 'seed': [0]}
+    axes = [list(np.atleast_1d(grid.get(key, defaults[key]))) for key in GRID_KEYS]
+    for values in itertools.product(*axes):
+        scenario = dict(base)
+        scenario.update({key: value.item() if hasattr(value, 'item') else value
+                         for key, value in zip(GRID_KEYS, values)})
+        scenario['scenario_id'] = scenario_id(scenario)
+        yield scenario
+
+
+def build_scenario(scenario: Dict[str, Any]):
+    """
+    按场景参数生成网络
+    所有基站使用相同的载波/带宽/SCS (即同一干扰组)，UE速度固定为ue_speed
+    """
+    generator = NRDataGenerator(tuple(scenario['area_bounds']), seed=int(scenario['seed']))
+    bandwidth = float(scenario['bandwidth']) * 1e6
+    scs = float(scenario['scs']) * 1e3
+    force_params = {
+        'carrierFrequency': float(scenario['carrier_frequency']),
+        'channelBandwidth': bandwidth,
+        'subcarrierSpacing': scs,
+        'numResourceBlocks': generator.calculate_num_resource_blocks(bandwidth, scs),
+    }
+    gnbs = generator.generate_gnbs_array(int(scenario['num_gnbs']), force_params=force_params)
+    ues = generator.generate_ues_array(int(scenario['num_ues']), gnbs)
+    ues['speed'][:] = float(scenario['ue_speed'])
+    return generator, NetworkTable.from_arrays(gnbs, ues)
+
+
+def _init_worker(backend: str, worker_counter):
+    """
+    工作进程初始化: 连接一次后端，之后的所有场景复用
+    matlab后端的第k个工作进程使用共享会话 commnet5g_k，多次扫描之间会话保持常驻
+    """
+    _worker['backend'] = backend
+    if backend == 'matlab':
+        from engine_pool import EnginePool
+        with worker_counter.get_lock():
+            worker_counter.value += 1
+            index = worker_counter.value
+        _worker['pool'] = EnginePool(size=1, first_index=index)
+
+
+def sinr_kpis(sinr: np.ndarray, num_steps: int) -> Dict[str, Any]:
+    """
+    两个后端共用的KPI定义，sinr为所有时间步中已接入UE的SINR样本 (dB):
+    connected为每个时间步平均的已接入UE数；SINR统计和频谱效率 (log2(1 + SINR)的均值) 基于全部样本，
+    忽略NaN样本 (MATLAB侧未得到SINR的UE)
+    """
+    sinr = np.asarray(sinr, dtype=np.float64)
+    metrics = {'connected': len(sinr) / num_steps if num_steps else 0.0}
+    sinr = sinr[~np.isnan(sinr)]
+    if len(sinr) == 0:
+        return metrics
+    metrics.update({
+        'sinr_mean': float(np.mean(sinr)),
+        'sinr_p5': float(np.percentile(sinr, 5)),
+        'sinr_p50': float(np.percentile(sinr, 50)),
+        'sinr_p95': float(np.percentile(sinr, 95)),
+        'spectral_efficiency': float(np.mean(np.log2(1 + 10.0 ** (sinr / 10)))),
+    })
+    return metrics
+
+
+def _run_python(generator, table, num_steps: int, step_duration: float) -> Dict[str, Any]:
+    """
+    与NetSimuEnv.run的时间步循环一致: 每步先为所有UE求解接入 (lockResources)，再统计SINR，
+    最后UE按各自的速度和方向移动，移出服务基站覆盖范围的UE在下一步重新接入。
+    KPI见sinr_kpis
+    """
+    gnbs = table.gnbs
+    graph = table_interference_graph(table, DEFAULT_INTERFERENCE_DISTANCE)
+    attachment = AttachmentEngine(table, generator.area_bounds)
+    mobility = MobilityEngine.from_table(table, generator.area_bounds, MobilityConfig(dt=step_duration))
+    samples = []
+    for step in range(num_steps):
+        result = attachment.attach()
+        result.apply(table)
+        engine = SINREngine(table, generator.area_bounds, SINRConfig(), interference_graph=graph)
+        samples.append(engine.evaluate(result.serving).sinr[result.serving >= 0])
+        if step == num_steps - 1:
+            break
+        mobility.set_serving(result.serving, gnbs['latitude'], gnbs['longitude'], gnbs['radius'])
+        lost = mobility.step()
+        table.ues['latitude'][:] = mobility.lat
+        table.ues['longitude'][:] = mobility.lon
+        table.ues['connectionState'][lost] = 0
+
+    return sinr_kpis(np.concatenate(samples) if samples else np.zeros(0), num_steps)
+
+
+def _run_matlab(generator, table) -> Dict[str, Any]:
+    from matlab_bridge import run_simulation
+    # 场景与结果均在内存中传递，不写.mat文件
+    graph = table_interference_graph(table, DEFAULT_INTERFERENCE_DISTANCE)
+    with _worker['pool'].acquire() as eng:
+        res = run_simulation(eng, table, area_bounds=generator.area_bounds, interference_graph=graph)
+    connected = res['connectionState'] == 1
+    return sinr_kpis(res['sinr'][connected], MATLAB_NUM_STEPS)
+
+
+def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """在工作进程中运行单个场景，异常记录在结果中而不是向上抛出"""
+    row = {key: scenario.get(key) for key in RESULT_COLUMNS}
+    row['backend'] = _worker['backend']
+    start = time.perf_counter()
+    try:
+        generator, table = build_scenario(scenario)
+        row['num_resource_blocks'] = int(table.gnbs['numResourceBlocks'][0]) if table.num_gnbs else 0
+        if _worker['backend'] == 'matlab':
+            row.update(_run_matlab(generator, table))
+        else:
+            row.update(_run_python(generator, table, int(scenario['num_steps']), float(scenario['step_duration'])))
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    row['elapsed'] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def load_completed(result_file: str) -> set:
+    """读取已有结果文件中成功完成的场景 (断点续跑)"""
+    if not os.path.exists(result_file):
+        return set()
+    with open(result_file, 'r', encoding='utf-8', newline='') as f:
+        return {row['scenario_id'] for row in csv.DictReader(f) if row.get('status') == 'ok'}
+
+
+def _truncate_partial_row(result_file: str):
+    """进程在写入中途被杀时，文件末尾可能残留不完整的一行，续跑前将其截掉"""
+    if not os.path.exists(result_file):
+        return
+    with open(result_file, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def run_sweep(spec: Dict[str, Any], result_file: str, backend: str = 'python',
+              workers: int = None) -> List[Dict[str, Any]]:
+    """
+    运行参数扫描，结果逐行追加到result_file (CSV)
+    已成功的场景会被跳过；失败的场景在下次运行时重试
+    """
+    scenarios = list(expand_grid(spec))
+    completed = load_completed(result_file)
+    pending = [s for s in scenarios if s['scenario_id'] not in completed]
+    print(f"场景总数: {len(scenarios)}, 已完成: {len(scenarios) - len(pending)}, 待运行: {len(pending)}")
+    if not pending:
+        return []
+
+    if workers is None:
+        workers = os.cpu_count() if backend == 'python' else 1
+
+    _truncate_partial_row(result_file)
+    new_file = not os.path.exists(result_file) or os.path.getsize(result_file) == 0
+    rows = []
+    with open(result_file, 'a', encoding='utf-8', newline='') as f, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(backend, multiprocessing.Value('i', 0))) as pool:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        futures = [pool.submit(run_scenario, s) for s in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                row = future.result()
+            except BrokenProcessPool:
+                # 工作进程崩溃 (例如MATLAB引擎异常退出)，已完成的结果已落盘，重新运行即可续跑
+                print("工作进程异常退出，扫描中止，重新运行同一命令将从中断处继续")
+                raise
+            writer.writerow(row)
+            # 每个场景完成后立即落盘，崩溃时最多丢失正在运行的场景
+            f.flush()
+            os.fsync(f.fileno())
+            rows.append(row)
+            status = '✓' if row['status'] == 'ok' else f"✗ {row['error']}"
+            print(f"[{done}/{len(pending)}] {row['scenario_id']} ({row['elapsed']:.2f}s) {status}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='5G NR仿真参数扫描')
+    parser.add_argument('spec', help='网格规格YAML文件 (grid / base)')
+    parser.add_argument('-o', '--output', default='sweep_results.csv', help='结果CSV文件 (同时用于断点续跑)')
+    parser.add_argument('-b', '--backend', choices=['python', 'matlab'], default=None,
+                        help='仿真后端，默认使用规格文件中的backend，否则为python')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='工作进程数')
+    args = parser.parse_args()
+
+    spec = load_yaml(args.spec, use_cache=False) or {}
+    backend = args.backend or spec.get('backend', 'python')
+    rows = run_sweep(spec, args.output, backend, args.workers)
+
+    failed = [row for row in rows if row['status'] != 'ok']
+    print(f"\n完成 {len(rows) - len(failed)} 个场景，失败 {len(failed)} 个，结果保存在 '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,8 @@
-import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'generate'))
+from geo import meters_to_degrees
 
 # 移动距离（米）
 distance = 2  
@@ -6,10 +10,11 @@ distance = 2
 # 纬度（假设为北京的纬度，39.9 度）
 latitude = 39.9  
 
+# 与MATLAB侧nrMobilityModel相同的球面换算
+delta_lat, delta_lon = meters_to_degrees(distance, distance, latitude)
+
 # 计算纬度变化
-delta_lat = distance / 111139
 print(f"移动 {distance} 米时，纬度变化约为 {delta_lat:.8f} 度")
 
 # 计算经度变化
-delta_lon = distance / (111320 * math.cos(math.radians(latitude)))
 print(f"移动 {distance} 米时，经度变化约为 {delta_lon:.8f} 度")
\ No newline at end of file
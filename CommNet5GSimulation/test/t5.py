@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'generate'))
+from coverage_map import CoverageMap, DEFAULT_CELL_SIZE
+from geo import haversine
+from mobility import MobilityConfig, MobilityEngine
+
+# 多步移动后，CoverageMap.update增量维护的距离表与逐对暴力重算比较
+num_ues, num_gnbs, num_steps = 2000, 60, 10
+area_bounds = (39.9, 39.95, 116.3, 116.35)
+lat_min, lat_max, lon_min, lon_max = area_bounds
+rng = np.random.default_rng(7)
+gnb_lat = rng.uniform(lat_min, lat_max, num_gnbs)
+gnb_lon = rng.uniform(lon_min, lon_max, num_gnbs)
+gnb_radius = rng.uniform(300, 1000, num_gnbs)
+engine = MobilityEngine(rng.uniform(lat_min, lat_max, num_ues), rng.uniform(lon_min, lon_max, num_ues),
+                        rng.uniform(0, 120 / 3.6, num_ues), rng.uniform(0, 360, num_ues), area_bounds,
+                        MobilityConfig(seed=7))
+coverage = CoverageMap(gnb_lat, gnb_lon, gnb_radius, area_bounds)
+
+# 按返回的变化条目维护一份 (UE行号, 基站行号) -> 距离 的副本，检查导出的增量是否完整
+initial = coverage.reset(engine.lat, engine.lon)
+exported = dict(zip(zip(initial.ue.tolist(), initial.gnb.tolist()), initial.distance.tolist()))
+
+for step in range(1, num_steps + 1):
+    engine.step()
+    delta = coverage.update(engine.lat, engine.lon)
+    for key, distance in zip(zip(delta.ue.tolist(), delta.gnb.tolist()), delta.distance.tolist()):
+        if np.isinf(distance):
+            exported.pop(key, None)
+        else:
+            exported[key] = distance
+
+    # 暴力重算: 每个UE×基站一次Haversine
+    brute = haversine(engine.lat[:, None], engine.lon[:, None], gnb_lat[None, :], gnb_lon[None, :])
+    covered = brute <= gnb_radius[None, :]
+    current = coverage.matrix().tocoo()
+    incremental = np.zeros((num_ues, num_gnbs), dtype=bool)
+    incremental[current.row, current.col] = True
+
+    # 覆盖关系与逐对计算完全一致，距离误差不超过网格单元对角线
+    assert np.array_equal(incremental, covered), f"第{step}步覆盖关系不一致"
+    error = np.abs(current.data - brute[current.row, current.col])
+    assert error.max(initial=0) <= DEFAULT_CELL_SIZE * np.sqrt(2), f"第{step}步距离误差 {error.max():.2f} m"
+    stored = dict(zip(zip(current.row.tolist(), current.col.tolist()), current.data.tolist()))
+    assert exported == stored, f"第{step}步导出的变化条目与距离表不一致"
+    print(f"第{step}步: 覆盖条目 {len(stored)}，重新查询 {coverage.requeried} 个UE，"
+          f"最大距离误差 {error.max(initial=0):.2f} m")
+
+print("CoverageMap.update与暴力重算一致")
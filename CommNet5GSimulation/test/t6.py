@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'generate'))
+from attachment import AttachmentConfig, AttachmentEngine
+from generate import NetworkTable, NRDataGenerator
+
+# 批量接入 (延迟接受) 与逐个贪心接入 (lockResources的直接移植) 的结果比较
+area_bounds = (39.9, 39.95, 116.3, 116.35)
+generator = NRDataGenerator(area_bounds=area_bounds, seed=11)
+gnbs = generator.generate_gnbs_array(40)
+table = NetworkTable.from_arrays(gnbs, generator.generate_ues_array(5000, gnbs))
+rng = np.random.default_rng(11)
+
+for rank_by in ('distance', 'rsrp'):
+    engine = AttachmentEngine(table, area_bounds, AttachmentConfig(rank_by=rank_by))
+
+    batched = engine.attach()
+    greedy = engine.attach_greedy()
+    assert np.array_equal(batched.serving, greedy.serving), f"{rank_by}: 服务基站不一致"
+    assert np.array_equal(batched.slice_rows, greedy.slice_rows), f"{rank_by}: 切片不一致"
+    assert np.array_equal(batched.load, greedy.load), f"{rank_by}: 切片负载不一致"
+    print(f"{rank_by}: 全部UE一致，接入 {batched.num_attached} 个UE，{batched.rounds}轮")
+
+    # 重新接入: 一半UE保留已有负载，其余UE在此基础上重新接入 (已连接的先尝试当前基站)
+    batched.apply(table)
+    kept = rng.random(table.num_ues) < 0.5
+    load = np.bincount(batched.slice_rows[kept & (batched.slice_rows >= 0)], minlength=len(engine.capacity))
+    subset = np.flatnonzero(~kept)
+    batched = engine.attach(subset, load)
+    greedy = engine.attach_greedy(subset, load)
+    assert np.array_equal(batched.serving, greedy.serving), f"{rank_by}: 重新接入的服务基站不一致"
+    assert np.array_equal(batched.load, greedy.load), f"{rank_by}: 重新接入的切片负载不一致"
+    print(f"{rank_by}: 重新接入 {len(subset)} 个UE一致，接入 {batched.num_attached} 个")
+
+print("attach与attach_greedy一致")
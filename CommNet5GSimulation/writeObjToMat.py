@@ -1,6 +1,12 @@
-import yaml
+import os
+import sys
 import scipy.io as sio
 
+# 共享的YAML读取工具位于generate目录
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate'))
+from yaml_io import load_yaml
+from mat_io import savemat73
+
 from models.Client import Client
 from models.AntennaArray import AntennaArray
 from models.BaseStation import BaseStation
@@ -26,8 +32,7 @@ def load_network_from_yaml(yaml_file):
         dict: 包含创建的网络对象的字典
     """
     # 加载YAML配置
-    with open(yaml_file, 'r', encoding='utf-8') as file:
-        config = yaml.safe_load(file)
+    config = load_yaml(yaml_file)
     
     # 创建各种模型和对象
     network = {}
@@ -166,13 +171,14 @@ def load_network_from_yaml(yaml_file):
     
     return network
 
-def save_network_to_mat(network, output_file='wireless_network_model.mat'):
+def save_network_to_mat(network, output_file='wireless_network_model.mat', mat_format='5'):
     """
     将网络配置保存到MAT文件
     
     参数:
         network (dict): 网络对象字典
         output_file (str): 输出MAT文件路径
+        mat_format (str): '5' 使用MAT v5格式；'7.3' 使用基于HDF5的格式，不受单变量2GB限制
     """
     data_to_save = {
         'simulation_time': network['simulation_time'],
@@ -184,7 +190,10 @@ def save_network_to_mat(network, output_file='wireless_network_model.mat'):
         'slice_business_generators': [gen.to_dict() for gen in network['slice_business_generators']],
         'area': network['area']
     }
-    sio.savemat(output_file, data_to_save)
+    if mat_format == '7.3':
+        savemat73(output_file, data_to_save)
+    else:
+        sio.savemat(output_file, data_to_save)
     print(f"数据已成功保存到 {output_file} 文件中")
 
 def print_network_stats(network):
@@ -1,25 +1,33 @@
 import yaml
 import scipy.io as sio
 import os
+import sys
 import numpy as np
 
+# 共享的YAML读取工具位于CommNet5GSimulation/generate目录
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CommNet5GSimulation', 'generate'))
+from yaml_io import load_yaml
+from mat_io import savemat73
+
 # 指定文件路径
 yaml_file = 'gNB_UAV.yaml'
 mat_file = 'gNB_UAV.mat'
 
+# 使用 --v73 参数时写出基于HDF5的MAT v7.3文件，不受单变量2GB限制
+use_v73 = '--v73' in sys.argv
+
 # 检查输入文件是否存在
 if not os.path.exists(yaml_file):
     print(f"错误: 找不到文件 {yaml_file}")
     exit(1)
 
 # 读取YAML文件
-with open(yaml_file, 'r', encoding='utf-8') as f:
-    try:
-        yaml_data = yaml.safe_load(f)
-        print("YAML文件读取成功")
-    except yaml.YAMLError as e:
-        print(f"YAML解析错误: {e}")
-        exit(1)
+try:
+    yaml_data = load_yaml(yaml_file)
+    print("YAML文件读取成功")
+except yaml.YAMLError as e:
+    print(f"YAML解析错误: {e}")
+    exit(1)
 
 # 递归处理数据，确保所有数据类型都兼容MATLAB
 def process_for_matlab(data):
@@ -37,7 +45,10 @@ matlab_data = process_for_matlab(yaml_data)
 
 # 保存为MAT文件
 try:
-    sio.savemat(mat_file, {'config': matlab_data})
+    if use_v73:
+        savemat73(mat_file, {'config': matlab_data})
+    else:
+        sio.savemat(mat_file, {'config': matlab_data})
     print(f"转换完成: {yaml_file} -> {mat_file}")
 except Exception as e:
     print(f"MAT文件写入错误: {e}")